@@ -4,3 +4,9 @@ from gymnasium.envs.registration import register
 register(
     id='Cruising-v0',
     entry_point='gym_cruising.envs.cruise_uav:CruiseUAV')
+
+# observations are torch tensors, which the gymnasium environment checker does not accept
+register(
+    id='CruisingTorch-v0',
+    entry_point='gym_cruising.envs.torch_cruise_uav:TorchCruiseUAV',
+    disable_env_checker=True)
@@ -3,16 +3,39 @@ from gym_cruising.geometry.point import Point
 
 
 class GU:
-    position: Point
-    covered: bool
-    channels_state = []
-    previous_position: Point
+    """ View over one row of the ground users arrays of a CruiseUAV environment. """
 
-    def __init__(self, position: Point) -> None:
-        self.position = position
-        self.covered = False
-        self.channels_state = []
-        self.previous_position = position
+    index: int
+
+    def __init__(self, env, index: int) -> None:
+        self.env = env
+        self.index = index
+
+    @property
+    def position(self) -> Point:
+        x_coordinate, y_coordinate = self.env.gu_positions[self.index]
+        return Point(float(x_coordinate), float(y_coordinate))
+
+    @position.setter
+    def position(self, position: Point) -> None:
+        self.env.gu_positions[self.index] = (position.x_coordinate, position.y_coordinate)
+
+    @property
+    def previous_position(self) -> Point:
+        x_coordinate, y_coordinate = self.env.gu_previous_positions[self.index]
+        return Point(float(x_coordinate), float(y_coordinate))
+
+    @previous_position.setter
+    def previous_position(self, position: Point) -> None:
+        self.env.gu_previous_positions[self.index] = (position.x_coordinate, position.y_coordinate)
+
+    @property
+    def covered(self) -> bool:
+        return bool(self.env.gu_covered_flags[self.index])
+
+    @property
+    def channels_state(self):
+        return self.env.gu_channels_state[self.index]
 
     def getColor(self):
         if self.covered:
@@ -25,7 +48,7 @@ class GU:
         return './gym_cruising/images/white30.png'
 
     def setCovered(self, covered: bool):
-        self.covered = covered
+        self.env.gu_covered_flags[self.index] = covered
 
     def setChannelsState(self, channels_state: [int]):
-        self.channels_state = channels_state
+        self.env.gu_channels_state[self.index] = channels_state
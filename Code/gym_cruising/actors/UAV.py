@@ -2,13 +2,44 @@ from gym_cruising.geometry.point import Point
 
 
 class UAV:
-    position: Point
-    previous_position: Point
-    last_shift_x: float
-    last_shift_y: float
-
-    def __init__(self, position: Point) -> None:
-        self.position = position
-        self.previous_position = position
-        self.last_shift_x = 0.0
-        self.last_shift_y = 0.0
+    """ View over one row of the UAV arrays of a CruiseUAV environment. """
+
+    index: int
+
+    def __init__(self, env, index: int) -> None:
+        self.env = env
+        self.index = index
+
+    @property
+    def position(self) -> Point:
+        x_coordinate, y_coordinate = self.env.uav_positions[self.index]
+        return Point(float(x_coordinate), float(y_coordinate))
+
+    @position.setter
+    def position(self, position: Point) -> None:
+        self.env.uav_positions[self.index] = (position.x_coordinate, position.y_coordinate)
+
+    @property
+    def previous_position(self) -> Point:
+        x_coordinate, y_coordinate = self.env.uav_previous_positions[self.index]
+        return Point(float(x_coordinate), float(y_coordinate))
+
+    @previous_position.setter
+    def previous_position(self, position: Point) -> None:
+        self.env.uav_previous_positions[self.index] = (position.x_coordinate, position.y_coordinate)
+
+    @property
+    def last_shift_x(self) -> float:
+        return float(self.env.uav_last_shifts[self.index, 0])
+
+    @last_shift_x.setter
+    def last_shift_x(self, shift: float) -> None:
+        self.env.uav_last_shifts[self.index, 0] = shift
+
+    @property
+    def last_shift_y(self) -> float:
+        return float(self.env.uav_last_shifts[self.index, 1])
+
+    @last_shift_y.setter
+    def last_shift_y(self, shift: float) -> None:
+        self.env.uav_last_shifts[self.index, 1] = shift
@@ -0,0 +1,420 @@
+""" This module contains the batched Cruising environment class """
+from typing import Optional, Sequence, Tuple, Union
+
+import numpy as np
+from gymnasium.spaces import Box
+from gymnasium.utils import seeding
+
+from gym_cruising.enums.track import Track
+from gym_cruising.envs.cruise_uav import CruiseUAV, normalizeActions, normalized_observation_bounds, \
+    normalizePositions, sample_clustered_positions
+from gym_cruising.geometry.spacing import positions_in_area, sample_separated_positions
+from gym_cruising.utils import channels_utils
+from gym_cruising.utils.mobility import GU_DIRECTIONS, RandomWalk, make_mobility_model
+
+
+class BatchedCruiseUAV:
+    """
+    This class advances B independent CruiseUAV scenarios with one vectorized step.
+    UAVs and GUs of every scenario are stored in padded (B, max_uav, ...) and (B, max_gu, ...)
+    arrays with boolean masks for the variable number of actors, and every scenario is
+    reset automatically when it terminates or is truncated.
+    The padded GU axis of the arrays grows when GUs spawn, the observations keep the fixed
+    shape (B, max_uav * 2 + max_gu, 2) of observation_space, with max_gu declared at creation.
+    """
+
+    MINIMUM_STARTING_DISTANCE_BETWEEN_UAV = CruiseUAV.MINIMUM_STARTING_DISTANCE_BETWEEN_UAV
+    COLLISION_DISTANCE = CruiseUAV.COLLISION_DISTANCE
+    SPAWN_GU_PROB = CruiseUAV.SPAWN_GU_PROB
+    SPAWN_GU_ATTEMPTS = CruiseUAV.SPAWN_GU_ATTEMPTS
+    GU_MEAN_SPEED = CruiseUAV.GU_MEAN_SPEED
+    GU_STANDARD_DEVIATION = CruiseUAV.GU_STANDARD_DEVIATION
+    COVERED_TRESHOLD = CruiseUAV.COVERED_TRESHOLD
+    SINR_MODELS = CruiseUAV.SINR_MODELS
+    reward_gamma = CruiseUAV.reward_gamma
+    MAX_SPEED_UAV = CruiseUAV.MAX_SPEED_UAV
+
+    GU_CAPACITY_MARGIN = 32  # padded GU slots kept free for spawning GUs
+
+    options: list
+    steps: np.ndarray  # (B,)
+    max_gu: int  # GU rows of the observations
+    observation_space: Box
+    action_space: Box
+
+    uav_number: np.ndarray  # (B,)
+    uav_mask: np.ndarray  # (B, max_uav) bool
+    uav_positions: np.ndarray  # (B, max_uav, 2)
+    uav_previous_positions: np.ndarray  # (B, max_uav, 2)
+    uav_last_shifts: np.ndarray  # (B, max_uav, 2)
+
+    gu_number: np.ndarray  # (B,)
+    gu_mask: np.ndarray  # (B, max_gu) bool
+    gu_positions: np.ndarray  # (B, max_gu, 2)
+    gu_previous_positions: np.ndarray  # (B, max_gu, 2)
+    gu_covered_flags: np.ndarray  # (B, max_gu) bool
+    gu_channels_state: np.ndarray  # (B, max_gu, max_uav) 0 = LoS, 1 = NLoS
+    disappear_gu_prob: np.ndarray  # (B,)
+
+    distances: np.ndarray  # (B, max_gu, max_uav)
+    pathLoss: np.ndarray  # (B, max_gu, max_uav)
+    _SINR: Optional[np.ndarray]  # (B, max_gu, max_uav), see SINR
+    connectivity_matrix: np.ndarray  # (B, max_gu, max_uav) bool
+    gu_covered: np.ndarray  # (B,)
+    last_RCR: np.ndarray  # (B, max_uav)
+    has_last_RCR: np.ndarray  # (B,) bool
+
+    def __init__(self, batch_size: int, track_id: int = 1, max_episode_steps: Optional[int] = None,
+                 sinr_model: str = "noise", max_gu: int = 256) -> None:
+        """ max_gu is the number of GU rows of the observations, the largest number of covered GUs of a scenario. """
+        assert sinr_model in self.SINR_MODELS
+        self.sinr_model = sinr_model
+        self.batch_size = batch_size
+        self.track = Track(track_id)
+        self.area = np.array(self.track.spawn_area[0], dtype=np.float64)
+        self.max_episode_steps = max_episode_steps
+        self.max_gu = max_gu
+        self.coverage_distances = channels_utils.get_coverage_distances(self.COVERED_TRESHOLD)
+        self.np_random, _ = seeding.np_random()
+
+    def reset(self, seed=None, options: Union[dict, Sequence[dict]] = None) -> Tuple[np.ndarray, dict]:
+        """ Reset every scenario, options is one dict for the whole batch or one dict per scenario. """
+        if seed is not None:
+            self.np_random, _ = seeding.np_random(seed)
+        if isinstance(options, dict):
+            options = [options] * self.batch_size
+        assert len(options) == self.batch_size
+        self.options = list(options)
+        default_mobility = RandomWalk(self.GU_MEAN_SPEED, self.GU_STANDARD_DEVIATION).spec
+        for scenario_options in self.options:
+            mobility = make_mobility_model(scenario_options.get("mobility"), mean_speed=self.GU_MEAN_SPEED,
+                                           speed_standard_deviation=self.GU_STANDARD_DEVIATION)
+            if mobility.spec != default_mobility:
+                raise ValueError(f"the batched environment moves the GUs with the default random walk only, "
+                                 f"not with {mobility.spec}")
+
+        max_uav = max(scenario_options["uav"] for scenario_options in self.options)
+        max_gu = max(scenario_options["gu"] for scenario_options in self.options) + self.GU_CAPACITY_MARGIN
+        self.allocate(max_uav, max_gu)
+        low_observation, high_observation = normalized_observation_bounds(self.track)
+        self.observation_space = Box(low=low_observation, high=high_observation,
+                                     shape=(self.batch_size, max_uav * 2 + self.max_gu, 2), dtype=np.float64)
+        self.action_space = Box(low=(-1) * self.MAX_SPEED_UAV, high=self.MAX_SPEED_UAV,
+                                shape=(self.batch_size, max_uav, 2), dtype=np.float64)
+        self.reset_scenarios(np.arange(self.batch_size))
+
+        observation, observation_mask = self.get_observation()
+        terminated_matrix = self.check_if_terminated()
+        info = self.create_info(terminated_matrix)
+        info["observation_mask"] = observation_mask
+        return observation, info
+
+    def allocate(self, max_uav: int, max_gu: int) -> None:
+        shape = (self.batch_size,)
+        self.steps = np.zeros(shape, dtype=np.int64)
+        self.uav_number = np.zeros(shape, dtype=np.int64)
+        self.uav_mask = np.zeros(shape + (max_uav,), dtype=bool)
+        self.uav_positions = np.zeros(shape + (max_uav, 2), dtype=np.float64)
+        self.uav_previous_positions = np.zeros(shape + (max_uav, 2), dtype=np.float64)
+        self.uav_last_shifts = np.zeros(shape + (max_uav, 2), dtype=np.float64)
+        self.gu_number = np.zeros(shape, dtype=np.int64)
+        self.gu_mask = np.zeros(shape + (max_gu,), dtype=bool)
+        self.gu_positions = np.zeros(shape + (max_gu, 2), dtype=np.float64)
+        self.gu_previous_positions = np.zeros(shape + (max_gu, 2), dtype=np.float64)
+        self.gu_covered_flags = np.zeros(shape + (max_gu,), dtype=bool)
+        self.gu_channels_state = np.zeros(shape + (max_gu, max_uav), dtype=np.int64)
+        self.disappear_gu_prob = np.zeros(shape, dtype=np.float64)
+        self.distances = np.zeros(shape + (max_gu, max_uav), dtype=np.float64)
+        self.pathLoss = np.zeros(shape + (max_gu, max_uav), dtype=np.float64)
+        self._SINR = None
+        self.connectivity_matrix = np.zeros(shape + (max_gu, max_uav), dtype=bool)
+        self.gu_covered = np.zeros(shape, dtype=np.int64)
+        self.last_RCR = np.zeros(shape + (max_uav,), dtype=np.float64)
+        self.has_last_RCR = np.zeros(shape, dtype=bool)
+
+    def ensure_gu_capacity(self, gu_number: int) -> None:
+        """ Grow the padded GU axis so that a scenario can hold gu_number GUs. """
+        capacity = self.gu_positions.shape[1]
+        if gu_number <= capacity:
+            return
+        extra = max(gu_number - capacity, capacity // 2, self.GU_CAPACITY_MARGIN)
+
+        def pad(array: np.ndarray) -> np.ndarray:
+            padding = [(0, 0)] * array.ndim
+            padding[1] = (0, extra)
+            return np.pad(array, padding)
+
+        self.gu_mask = pad(self.gu_mask)
+        self.gu_positions = pad(self.gu_positions)
+        self.gu_previous_positions = pad(self.gu_previous_positions)
+        self.gu_covered_flags = pad(self.gu_covered_flags)
+        self.gu_channels_state = pad(self.gu_channels_state)
+        self.distances = pad(self.distances)
+        self.pathLoss = pad(self.pathLoss)
+        self._SINR = None
+        self.connectivity_matrix = pad(self.connectivity_matrix)
+
+    def reset_scenarios(self, indices: np.ndarray) -> None:
+        for b in indices:
+            scenario_options = self.options[b]
+            uav_number = scenario_options["uav"]
+            uav_positions = self.init_uav(uav_number)
+            self.uav_number[b] = uav_number
+            self.uav_mask[b] = np.arange(self.uav_mask.shape[1]) < uav_number
+            self.uav_positions[b] = 0.0
+            self.uav_positions[b, :uav_number] = uav_positions
+            self.uav_previous_positions[b] = self.uav_positions[b]
+            self.uav_last_shifts[b] = 0.0
+
+            if scenario_options['clustered'] == 0:
+                gu_positions = self.init_gu(scenario_options["gu"])
+            else:
+                gu_positions = self.init_gu_clustered(scenario_options)
+            gu_number = len(gu_positions)
+            self.ensure_gu_capacity(gu_number)
+            self.gu_number[b] = gu_number
+            self.gu_mask[b] = np.arange(self.gu_mask.shape[1]) < gu_number
+            self.gu_positions[b] = 0.0
+            self.gu_positions[b, :gu_number] = gu_positions
+            self.gu_previous_positions[b] = self.gu_positions[b]
+            self.gu_covered_flags[b] = False
+            self.gu_channels_state[b] = 0
+            self.gu_channels_state[b, :gu_number, :uav_number] = self.initialize_channel(uav_positions, gu_positions)
+            self.disappear_gu_prob[b] = min(self.SPAWN_GU_PROB * self.SPAWN_GU_ATTEMPTS / max(scenario_options["gu"], 1),
+                                            1.0)
+
+            self.steps[b] = 0
+            self.last_RCR[b] = 0.0
+            self.has_last_RCR[b] = False
+
+        # the first Markov chain step of a scenario does not move any actor and keeps the channels state
+        self.distances[indices] = channels_utils.calculate_distances_uav_gu(self.uav_positions[indices],
+                                                                            self.gu_positions[indices])
+        self.pathLoss[indices] = channels_utils.get_PathLoss(self.distances[indices], self.gu_channels_state[indices])
+        if self._SINR is not None:
+            self._SINR[indices] = self.get_SINR(self.pathLoss[indices], self.uav_mask[indices])
+        self.update_coverage(indices)
+
+    def init_uav(self, uav_number: int) -> np.ndarray:
+        return sample_separated_positions(self.np_random, self.area, uav_number,
+                                          self.MINIMUM_STARTING_DISTANCE_BETWEEN_UAV)
+
+    def init_gu(self, gu_number: int) -> np.ndarray:
+        return self.np_random.uniform(self.area[:, 0], self.area[:, 1], size=(gu_number, 2))
+
+    def init_gu_clustered(self, options: dict) -> np.ndarray:
+        std_dev = np.sqrt(options['variance'])
+        number_of_clusters = options['clusters_number']
+        gu_for_cluster = int(options['gu'] / number_of_clusters)
+        means = self.np_random.uniform(self.area[0][0] + 250, self.area[0][1] - 250, size=(number_of_clusters, 2))
+        return sample_clustered_positions(self.np_random, means, std_dev, gu_for_cluster, self.area)
+
+    def initialize_channel(self, uav_positions: np.ndarray, gu_positions: np.ndarray) -> np.ndarray:
+        # 0 = LoS, 1 = NLoS
+        return channels_utils.get_initial_channels_state(uav_positions, gu_positions, self.np_random.random)
+
+    def step(self, actions) -> Tuple[np.ndarray, np.ndarray, np.ndarray, np.ndarray, dict]:
+        """
+        Advance every scenario by one step, actions has shape (B, max_uav, 2) and padded UAVs are ignored.
+        Scenarios that terminate or are truncated are reset, their last observation and info are
+        returned under the "final_observation" and "final_info" keys of info.
+        """
+        self.perform_action(actions)
+        self.steps += 1
+
+        observation, observation_mask = self.get_observation()
+        terminated_matrix = self.check_if_terminated()
+        info = self.create_info(terminated_matrix)
+        reward = self.calculate_reward(terminated_matrix)
+        terminated = np.any(terminated_matrix, axis=1)
+        truncated = self.check_if_truncated()
+
+        done = terminated | truncated
+        if np.any(done):
+            info["final_info"] = info.copy()
+            info["final_observation"] = observation
+            info["final_observation_mask"] = observation_mask
+            self.reset_scenarios(np.flatnonzero(done))
+            observation, observation_mask = self.get_observation()
+        info["observation_mask"] = observation_mask
+        info["done"] = done
+        return observation, reward, terminated, truncated, info
+
+    def perform_action(self, actions) -> None:
+        self.move_UAV(actions)
+        self.update_GU()
+        self.calculate_PathLoss_with_Markov_Chain()
+        self.calculate_SINR()
+        self.check_connection_and_coverage_UAV_GU()
+
+    def update_GU(self):
+        self.move_GU()
+        self.check_if_disappear_GU()
+        self.check_if_spawn_new_GU()
+
+    def move_UAV(self, actions):
+        actions = np.asarray(actions, dtype=np.float64).reshape(self.uav_positions.shape)
+        actions = np.where(self.uav_mask[:, :, np.newaxis], actions, 0.0)
+        self.uav_previous_positions = self.uav_positions
+        self.uav_positions = self.uav_positions + actions
+        self.uav_last_shifts = actions
+
+    # Random walk the GU
+    def move_GU(self):
+        previous_positions = self.gu_positions
+        new_positions = previous_positions.copy()
+        flat_previous_positions = previous_positions.reshape(-1, 2)
+        flat_new_positions = new_positions.reshape(-1, 2)
+        # GUs whose move would exit from environment draw a new move
+        pending = np.flatnonzero(self.gu_mask)
+        while pending.size > 0:
+            distance = self.np_random.normal(self.GU_MEAN_SPEED, self.GU_STANDARD_DEVIATION, size=pending.size)
+            distance = np.maximum(distance, 0.0)
+            direction = self.np_random.integers(len(GU_DIRECTIONS), size=pending.size)
+            candidate_positions = flat_previous_positions[pending] + GU_DIRECTIONS[direction] * distance[:, np.newaxis]
+            inside = positions_in_area(candidate_positions, self.area)
+            flat_new_positions[pending[inside]] = candidate_positions[inside]
+            pending = pending[~inside]
+        self.gu_positions = new_positions
+        self.gu_previous_positions = previous_positions
+
+    def check_if_disappear_GU(self):
+        # each GU disappears with disappear_gu_prob: draw how many do in every scenario, then which ones
+        disappearing = self.np_random.binomial(self.gu_number, self.disappear_gu_prob)
+        scenarios = np.flatnonzero(disappearing)
+        if scenarios.size == 0:
+            return
+        remaining = self.gu_mask[scenarios]
+        for row, b in enumerate(scenarios):
+            remaining[row, self.np_random.choice(self.gu_number[b], size=disappearing[b], replace=False)] = False
+        # move the remaining GUs of these scenarios to the front of the padded axis
+        order = np.argsort(~remaining, axis=1, kind='stable')
+        self.gu_positions[scenarios] = np.take_along_axis(self.gu_positions[scenarios],
+                                                          order[:, :, np.newaxis], axis=1)
+        self.gu_previous_positions[scenarios] = np.take_along_axis(self.gu_previous_positions[scenarios],
+                                                                   order[:, :, np.newaxis], axis=1)
+        self.gu_covered_flags[scenarios] = np.take_along_axis(self.gu_covered_flags[scenarios], order, axis=1)
+        self.gu_channels_state[scenarios] = np.take_along_axis(self.gu_channels_state[scenarios],
+                                                               order[:, :, np.newaxis], axis=1)
+        self.gu_number[scenarios] -= disappearing[scenarios]
+        self.gu_mask[scenarios] = np.arange(self.gu_mask.shape[1]) < self.gu_number[scenarios, np.newaxis]
+
+    def check_if_spawn_new_GU(self):
+        spawning = self.np_random.binomial(self.SPAWN_GU_ATTEMPTS, self.SPAWN_GU_PROB, size=self.batch_size)
+        scenarios = np.flatnonzero(spawning)
+        if scenarios.size > 0:
+            self.ensure_gu_capacity(int(np.max(self.gu_number[scenarios] + spawning[scenarios])))
+            all_positions = self.np_random.uniform(self.area[:, 0], self.area[:, 1], size=(spawning.sum(), 2))
+            for b, positions in zip(scenarios, np.split(all_positions, np.cumsum(spawning[scenarios])[:-1])):
+                new_gu = slice(self.gu_number[b], self.gu_number[b] + spawning[b])
+                self.gu_positions[b, new_gu] = positions
+                self.gu_previous_positions[b, new_gu] = positions
+                self.gu_covered_flags[b, new_gu] = False
+                self.gu_channels_state[b, new_gu] = 0
+                self.gu_channels_state[b, new_gu, :self.uav_number[b]] = \
+                    self.initialize_channel(self.uav_positions[b, :self.uav_number[b]], positions)
+                self.gu_mask[b, new_gu] = True
+                self.gu_number[b] += spawning[b]
+        # update disappear gu probability, clipped to 1 when there are fewer GUs than expected spawns
+        self.disappear_gu_prob = np.minimum(self.SPAWN_GU_PROB * self.SPAWN_GU_ATTEMPTS / np.maximum(self.gu_number, 1),
+                                            1.0)
+
+    def calculate_PathLoss_with_Markov_Chain(self):
+        # gu_channels_state 0 = LoS, 1 = NLoS
+        self.distances, self.gu_channels_state, self.pathLoss = channels_utils.step_channels(
+            self.uav_positions, self.uav_previous_positions, self.gu_positions, self.gu_previous_positions,
+            self.gu_channels_state, self.np_random.random)
+
+    def calculate_SINR(self):
+        # the noise-only coverage is decided by the coverage distances, its SINR is computed on the first read
+        self._SINR = None
+        if self.sinr_model == "interference":
+            self._SINR = self.get_SINR(self.pathLoss, self.uav_mask)
+
+    @property
+    def SINR(self) -> np.ndarray:
+        """ SINR in dB of every link of the last step, shape (B, max_gu, max_uav). """
+        if self._SINR is None:
+            self._SINR = self.get_SINR(self.pathLoss, self.uav_mask)
+        return self._SINR
+
+    def get_SINR(self, path_loss: np.ndarray, uav_mask: np.ndarray) -> np.ndarray:
+        if self.sinr_model == "interference":
+            # padded UAV slots do not transmit
+            path_loss = np.where(uav_mask[:, np.newaxis, :], path_loss, np.inf)
+        return channels_utils.calculate_SINR(path_loss, self.sinr_model)
+
+    def check_connection_and_coverage_UAV_GU(self):
+        self.update_coverage(slice(None))
+
+    def update_coverage(self, indices) -> None:
+        links_mask = self.gu_mask[indices][:, :, np.newaxis] & self.uav_mask[indices][:, np.newaxis, :]
+        connected = channels_utils.get_connected_links(self.distances[indices], self.gu_channels_state[indices],
+                                                       self.coverage_distances,
+                                                       self.SINR[indices] if self.sinr_model == "interference"
+                                                       else None, self.COVERED_TRESHOLD)
+        self.connectivity_matrix[indices] = connected & links_mask
+        self.gu_covered_flags[indices] = np.any(self.connectivity_matrix[indices], axis=2)
+        self.gu_covered[indices] = np.count_nonzero(self.gu_covered_flags[indices], axis=1)
+
+    def get_observation(self) -> Tuple[np.ndarray, np.ndarray]:
+        """
+        Return the padded observations of shape (B, max_uav * 2 + max_gu, 2) and their mask.
+        Every scenario has the CruiseUAV layout: position and last shift of each UAV slot,
+        then the positions of the covered GUs packed at the front of the GU rows.
+        """
+        if np.any(self.gu_covered > self.max_gu):
+            raise ValueError(f"{np.max(self.gu_covered)} covered GUs do not fit in the max_gu={self.max_gu} "
+                             f"observation rows")
+        max_uav = self.uav_mask.shape[1]
+        observation = np.zeros((self.batch_size, max_uav * 2 + self.max_gu, 2), dtype=np.float64)
+        observation_mask = np.zeros((self.batch_size, max_uav * 2 + self.max_gu), dtype=bool)
+        observation[:, 0:max_uav * 2:2] = normalizePositions(self.uav_positions)
+        observation[:, 1:max_uav * 2:2] = normalizeActions(self.uav_last_shifts)
+        observation[:, :max_uav * 2] *= np.repeat(self.uav_mask, 2, axis=1)[:, :, np.newaxis]
+        observation_mask[:, :max_uav * 2] = np.repeat(self.uav_mask, 2, axis=1)
+
+        # the GU arrays can have less or more slots than the GU rows
+        covered_rows = min(self.max_gu, self.gu_mask.shape[1])
+        order = np.argsort(~self.gu_covered_flags, axis=1, kind='stable')[:, :covered_rows]
+        covered_positions = np.take_along_axis(self.gu_positions, order[:, :, np.newaxis], axis=1)
+        covered_mask = np.arange(covered_rows) < self.gu_covered[:, np.newaxis]
+        observation[:, max_uav * 2:max_uav * 2 + covered_rows] = np.where(covered_mask[:, :, np.newaxis],
+                                                                          normalizePositions(covered_positions), 0.0)
+        observation_mask[:, max_uav * 2:max_uav * 2 + covered_rows] = covered_mask
+        return observation, observation_mask
+
+    def check_if_terminated(self) -> np.ndarray:
+        in_area = positions_in_area(self.uav_positions.reshape(-1, 2), self.area).reshape(self.uav_mask.shape)
+        differences = self.uav_positions[:, :, np.newaxis, :] - self.uav_positions[:, np.newaxis, :, :]
+        distances = np.linalg.norm(differences, axis=-1)
+        pairs_mask = self.uav_mask[:, :, np.newaxis] & self.uav_mask[:, np.newaxis, :]
+        pairs_mask &= ~np.eye(self.uav_mask.shape[1], dtype=bool)
+        collision = np.any((distances <= self.COLLISION_DISTANCE) & pairs_mask, axis=2)
+        return (~in_area | collision) & self.uav_mask
+
+    def check_if_truncated(self) -> np.ndarray:
+        if self.max_episode_steps is None:
+            return np.zeros(self.batch_size, dtype=bool)
+        return self.steps >= self.max_episode_steps
+
+    def calculate_reward(self, terminated_matrix: np.ndarray) -> np.ndarray:
+        # GUs covered by UAV i alone are lost without UAV i
+        _, covered_alone = channels_utils.count_coverage(self.connectivity_matrix)
+        current_rewards = covered_alone / np.maximum(self.gu_number, 1)[:, np.newaxis]
+        current_rewards = np.where(terminated_matrix, -2.0, current_rewards)
+        current_rewards = np.where(self.uav_mask, current_rewards, 0.0)
+        delta_RCR_smorzato = np.where(terminated_matrix | ~self.has_last_RCR[:, np.newaxis], 0.0,
+                                      self.reward_gamma * (current_rewards - self.last_RCR))
+        self.last_RCR = current_rewards
+        self.has_last_RCR[:] = True
+        return (current_rewards + delta_RCR_smorzato) * 100.0
+
+    def create_info(self, terminated_matrix: np.ndarray) -> dict:
+        terminated = np.count_nonzero(terminated_matrix, axis=1)
+        RCR = np.where(terminated >= 2, 0.0, self.gu_covered / np.maximum(self.gu_number, 1))
+        return {"GU coperti": self.gu_covered.copy(), "Ground Users": self.gu_number.copy(), "RCR": RCR,
+                "terminated": terminated}
+
+    def close(self) -> None:
+        pass
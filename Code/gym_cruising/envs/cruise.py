@@ -1,17 +1,19 @@
 """ This module contains the general cruise class. """
 
 from abc import abstractmethod
-from copy import deepcopy
-from typing import Tuple, List
+from typing import TYPE_CHECKING, List, Optional, Tuple
 
 import numpy as np
-import pygame
 from gymnasium import Env
-from pygame import Surface
 
 from gym_cruising.enums.track import Track
 from gym_cruising.geometry.line import Line
 
+if TYPE_CHECKING:
+    from pygame import Surface
+
+    from gym_cruising.envs.render import Renderer
+
 
 class Cruise(Env):
     """
@@ -28,20 +30,22 @@ class Cruise(Env):
     track: Track
     world: Tuple[Line, ...]
 
+    renderer: Optional["Renderer"]  # created at the first rendered frame, pygame is imported only then
+
     metadata = {"render_modes": ["human", "rgb_array"], "render_fps": 8}
 
-    def __init__(self, render_mode=None, track_id: int = 1) -> None:
+    def __init__(self, render_mode=None, track_id: int = 1, render_frame_view: bool = False) -> None:
         self.window_size = 1000  # The size of the PyGame window
         self.track = Track(track_id)
 
         assert render_mode is None or render_mode in self.metadata["render_modes"]
         self.render_mode = render_mode
-        self.window = None
-        self.clock = None
+        self.render_frame_view = render_frame_view
+        self.renderer = None
 
     def step(self, actions) -> Tuple[np.ndarray, List, bool, bool, dict]:
 
-        assert self.action_space.contains(actions)
+        assert self.contains_action(actions)
 
         self.perform_action(actions)
 
@@ -56,6 +60,9 @@ class Cruise(Env):
 
         return state, reward, any(terminated), truncated, info
 
+    def contains_action(self, actions) -> bool:
+        return self.action_space.contains(actions)
+
     @abstractmethod
     def perform_action(self, actions) -> None:
         pass
@@ -83,7 +90,7 @@ class Cruise(Env):
     def reset(self, seed=None, options=None) -> Tuple[np.ndarray, dict]:
 
         super().reset(seed=seed)
-        self.world = deepcopy(self.track.walls)
+        self.world = self.track.walls  # the walls are never modified, they are shared with the track
 
         self.init_environment(options)
 
@@ -100,37 +107,22 @@ class Cruise(Env):
     def init_environment(self, options=None) -> None:
         pass
 
-    def render(self):
+    def render(self) -> Optional[np.ndarray]:
+        if self.render_mode == "rgb_array":
+            return self.render_frame()
         return None
 
-    def render_frame(self) -> None:
-        if self.window is None and self.render_mode == "human":
-            pygame.init()
-            pygame.display.init()
-            self.window = pygame.display.set_mode((self.window_size, self.window_size))
-        if self.clock is None and self.render_mode == "human":
-            self.clock = pygame.time.Clock()
-
-        if self.window is None or self.clock is None:
-            return
-
-        canvas = Surface((self.window_size, self.window_size))
-        # Draw the canvas
-        self.draw(canvas)
-
-        if self.render_mode == "human":
-            # The following line copies our drawings from canvas to the visible window
-            self.window.blit(canvas, canvas.get_rect())
-            pygame.event.pump()
-            pygame.display.update()
-            # We need to ensure that human-rendering occurs at the predefined framerate.
-            self.clock.tick(self.metadata["render_fps"])
+    def render_frame(self) -> Optional[np.ndarray]:
+        if self.renderer is None:
+            from gym_cruising.envs.render import Renderer  # pylint: disable=import-outside-toplevel
+            self.renderer = Renderer(self.render_mode, self.window_size, self.metadata["render_fps"],
+                                     self.render_frame_view)
+        return self.renderer.render_frame(self.draw)
 
     @abstractmethod
-    def draw(self, canvas: Surface) -> None:
+    def draw(self, canvas: "Surface") -> None:
         pass
 
     def close(self) -> None:
-        if self.window is not None:
-            pygame.display.quit()
-            pygame.quit()
+        if self.renderer is not None:
+            self.renderer.close()
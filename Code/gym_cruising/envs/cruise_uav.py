@@ -1,41 +1,89 @@
 """ This module contains the Cruising environment class """
-import random
-from typing import Optional, Tuple
+from typing import TYPE_CHECKING, List, Optional, Tuple
 
 import numpy as np
-import pygame
 from gymnasium.spaces import Box
-from pygame import Surface
 
 from gym_cruising.actors.GU import GU
 from gym_cruising.actors.UAV import UAV
 from gym_cruising.enums.color import Color
+from gym_cruising.enums.track import Track
 from gym_cruising.envs.cruise import Cruise
 from gym_cruising.geometry.point import Point
+from gym_cruising.geometry.spacing import find_close_positions, positions_in_area, sample_separated_positions
 from gym_cruising.utils import channels_utils
+from gym_cruising.utils.mobility import MobilityModel, make_mobility_model
+from gym_cruising.utils.profiling import PhaseProfiler
+from gym_cruising.utils.scenario_bank import ScenarioBank
+
+if TYPE_CHECKING:
+    from pygame import Surface
 
 MAX_SPEED_UAV = 55.6  # m/s - about 20 Km/h x 10 steps
 MAX_POSITION = 4000.0
 
 
-def normalizePositions(positions: np.ndarray) -> np.ndarray:  # Normalize in [-1,1]
-    nornmalized_positions = np.ndarray(shape=positions.shape, dtype=np.float64)
-    nornmalized_positions = (positions / MAX_POSITION) * 2 - 1
+def normalizePositions(positions: np.ndarray, out: Optional[np.ndarray] = None) -> np.ndarray:  # Normalize in [-1,1]
+    nornmalized_positions = np.divide(positions, MAX_POSITION, out=out)
+    nornmalized_positions *= 2
+    nornmalized_positions -= 1
     return nornmalized_positions
 
 
-def normalizeActions(actions: np.ndarray) -> np.ndarray:  # Normalize in [-1,1]
-    nornmalized_actions = np.ndarray(shape=actions.shape, dtype=np.float64)
-    nornmalized_actions = ((actions + MAX_SPEED_UAV) / (2 * MAX_SPEED_UAV)) * 2 - 1
+def normalizeActions(actions: np.ndarray, out: Optional[np.ndarray] = None) -> np.ndarray:  # Normalize in [-1,1]
+    nornmalized_actions = np.add(actions, MAX_SPEED_UAV, out=out)
+    nornmalized_actions /= 2 * MAX_SPEED_UAV
+    nornmalized_actions *= 2
+    nornmalized_actions -= 1
     return nornmalized_actions
 
 
+def normalized_observation_bounds(track: Track) -> Tuple[float, float]:
+    """
+    Bounds of the normalized observations on track: GU positions in the spawn areas, UAV positions up to
+    one MAX_SPEED_UAV step out of them, shifts in [-1, 1] and the zero rows of the padded observations.
+    """
+    spawn_areas = np.array(track.spawn_area, dtype=np.float64)  # (areas, x/y, low/high)
+    low = normalizePositions(np.min(spawn_areas[..., 0]) - MAX_SPEED_UAV)
+    high = normalizePositions(np.max(spawn_areas[..., 1]) + MAX_SPEED_UAV)
+    return min(float(low), -1.0), max(float(high), 1.0)
+
+
+def sample_clustered_positions(np_random: np.random.Generator, means: np.ndarray, std_dev: float,
+                               gu_for_cluster: int, area: np.ndarray) -> np.ndarray:
+    """
+    Draw gu_for_cluster Gaussian positions around each of the (clusters, 2) means in one block,
+    the positions out of area are drawn again until every position is inside.
+    """
+    centers = np.repeat(means, gu_for_cluster, axis=0)
+    positions = np_random.normal(centers, std_dev)
+    pending = np.flatnonzero(~positions_in_area(positions, area))
+    while pending.size > 0:
+        candidate_positions = np_random.normal(centers[pending], std_dev)
+        inside = positions_in_area(candidate_positions, area)
+        positions[pending[inside]] = candidate_positions[inside]
+        pending = pending[~inside]
+    return positions
+
+
 class CruiseUAV(Cruise):
-    uav = []
-    gu = []
+    xp = np  # array namespace of the actors arrays, see channels_utils
+
+    # Columnar state store: one row per actor, the UAV and GU objects are views over these rows
+    uav_positions: np.ndarray  # (UAV_NUMBER, 2)
+    uav_previous_positions: np.ndarray  # (UAV_NUMBER, 2)
+    uav_last_shifts: np.ndarray  # (UAV_NUMBER, 2)
+    gu_positions: np.ndarray  # (gu_number, 2)
+    gu_previous_positions: np.ndarray  # (gu_number, 2)
+    gu_covered_flags: np.ndarray  # (gu_number,) bool
+    gu_channels_state: np.ndarray  # (gu_number, UAV_NUMBER) 0 = LoS, 1 = NLoS
+
+    distances = []
     pathLoss = []
-    SINR = []
+    _SINR = None  # see SINR
     connectivity_matrix = []
+    gu_cover_count: np.ndarray  # (gu_number,) number of UAVs covering each GU
+    uav_covered_alone: np.ndarray  # (UAV_NUMBER,) number of GUs covered only by each UAV
 
     UAV_NUMBER = 2
     STARTING_GU_NUMBER = 60
@@ -43,37 +91,145 @@ class CruiseUAV(Cruise):
     MINIMUM_STARTING_DISTANCE_BETWEEN_UAV = 200  # meters
     COLLISION_DISTANCE = 10  # meters
 
-    SPAWN_GU_PROB = 0.0005
-    disappear_gu_prob: float
+    SPAWN_GU_PROB = 0.0005  # probability of each spawn attempt
+    SPAWN_GU_ATTEMPTS = 4  # independent spawn attempts per step
+    disappear_gu_prob: float  # keeps the expected births and deaths of a step equal
 
     GU_MEAN_SPEED = 5.56  # 5.56 m/s or 27.7 m/s
     GU_STANDARD_DEVIATION = 1.97  # Gaussian goes to 0 at approximately 3 times the standard deviation
+    gu_mobility: MobilityModel  # moves the GUs, selected by options["mobility"] of reset
     MAX_SPEED_UAV = 55.6  # m/s - about 20 Km/h x 10 steps
 
     COVERED_TRESHOLD = 10.0  # dB
+    coverage_distances: np.ndarray  # largest LoS and NLoS distance with SINR >= COVERED_TRESHOLD
 
-    low_observation: float
+    SINR_MODELS = ("noise", "interference")  # noise-only or co-channel interference among the UAVs
+    sinr_model: str
+
+    low_observation: float  # normalized bounds of every observation value, see normalized_observation_bounds
     high_observation: float
 
     gu_covered = 0
     last_RCR = None
     reward_gamma = 0.7
 
-    def __init__(self,
-                 render_mode=None, track_id: int = 1) -> None:
-        super().__init__(render_mode, track_id)
+    padded_observation: bool
+    max_uav: int
+    max_gu: int
+
+    # methods timed by the profiler, update_GU includes move_GU, check_if_disappear_GU and check_if_spawn_new_GU
+    PROFILED_PHASES = ("step", "reset", "move_UAV", "update_GU", "move_GU", "check_if_disappear_GU",
+                       "check_if_spawn_new_GU", "calculate_PathLoss_with_Markov_Chain", "calculate_SINR",
+                       "check_connection_and_coverage_UAV_GU", "get_observation", "check_if_terminated",
+                       "create_info", "calculate_reward", "render_frame")
+    profiler: Optional[PhaseProfiler]
+    profile_in_info: bool
 
-        spawn_area = self.np_random.choice(self.track.spawn_area)
-        self.low_observation = float(spawn_area[0][0] - self.MAX_SPEED_UAV)
-        self.high_observation = float(spawn_area[0][1] + self.MAX_SPEED_UAV)
+    scenario_bank: Optional[ScenarioBank]  # precomputed initial states restored by reset with a scenario_id
+
+    def __init__(self,
+                 render_mode=None, track_id: int = 1, render_frame_view: bool = False,
+                 padded_observation: bool = False, max_uav: int = 3, max_gu: int = 256,
+                 sinr_model: str = "noise",
+                 profile: bool = False, profile_in_info: bool = False,
+                 scenario_bank: Optional[str] = None) -> None:
+        """
+        render of the rgb_array mode returns a new (window_size, window_size, 3) frame, with
+        render_frame_view it returns a view of the frame buffer instead, without the copy but
+        overwritten by the next render.
+
+        sinr_model selects the noise-only SINR or the SINR with the co-channel interference of
+        the other UAVs, see SINR_MODELS.
+
+        With padded_observation the observation has the fixed shape (max_uav * 2 + max_gu, 2):
+        position and last shift of each UAV slot, then the covered GUs packed at the front of
+        the GU rows, and info["observation_mask"] marks the valid rows. The observation is
+        filled in place into one of two preallocated buffers, so it stays valid until the
+        second following step or reset.
+
+        With profile the wall time and call count of each of PROFILED_PHASES are accumulated,
+        see get_profile, and with profile_in_info they are also returned in info["profile"].
+        Without profile the methods are not wrapped and there is no overhead.
+
+        scenario_bank is the directory of a bank written by build_scenario_bank, then
+        reset(options={"scenario_id": k}) restores the state of scenario k of the bank instead of
+        generating one, with the options the scenario was built with.
+
+        options["mobility"] of reset selects the GU mobility model, a name of MOBILITY_MODELS or
+        {"model": name, **parameters}, see make_mobility_model. The default is the random walk
+        with GU_MEAN_SPEED and GU_STANDARD_DEVIATION.
+        """
+        super().__init__(render_mode, track_id, render_frame_view)
+
+        self.low_observation, self.high_observation = normalized_observation_bounds(self.track)
+
+        assert sinr_model in self.SINR_MODELS
+        self.sinr_model = sinr_model
+        self.coverage_distances = channels_utils.get_coverage_distances(self.COVERED_TRESHOLD)
+
+        self.padded_observation = padded_observation
+        self.max_uav = max_uav
+        self.max_gu = max_gu
+        if self.padded_observation:
+            rows = self.max_uav * 2 + self.max_gu
+            self.observation_space = Box(low=self.low_observation,
+                                         high=self.high_observation,
+                                         shape=(rows, 2),
+                                         dtype=np.float64)
+            self.observation_buffers = np.zeros((2, rows, 2), dtype=np.float64)
+            self.observation_masks = np.zeros((2, rows), dtype=bool)
+            self.observation_index = 0
 
         self.reset_observation_action_space()
+        self.reset_actors_state()
+        self.gu_mobility = self.make_gu_mobility(None)
+
+        self.profiler = None
+        self.profile_in_info = profile_in_info
+        if profile or profile_in_info:
+            self.profiler = PhaseProfiler()
+            self.profiler.instrument(self, self.PROFILED_PHASES)
+
+        self.scenario_bank = None
+        if scenario_bank is not None:
+            self.scenario_bank = ScenarioBank(scenario_bank)
+            if self.scenario_bank.track_id != self.track.value:
+                raise ValueError(f"the scenario bank of track {self.scenario_bank.track_id} "
+                                 f"cannot be used on track {self.track.value}")
+
+    def get_profile(self) -> dict:
+        """ Return {phase: {"calls", "total_s", "mean_ms"}} accumulated since creation or reset_profile. """
+        if self.profiler is None:
+            return {}
+        return self.profiler.get_profile()
+
+    def reset_profile(self) -> None:
+        if self.profiler is not None:
+            self.profiler.reset()
+
+    @property
+    def uav(self) -> List[UAV]:
+        return [UAV(self, i) for i in range(len(self.uav_positions))]
+
+    @property
+    def gu(self) -> List[GU]:
+        return [GU(self, i) for i in range(len(self.gu_positions))]
+
+    def reset_actors_state(self):
+        self.uav_positions = np.zeros((self.UAV_NUMBER, 2), dtype=np.float64)
+        self.uav_previous_positions = np.zeros((self.UAV_NUMBER, 2), dtype=np.float64)
+        self.uav_last_shifts = np.zeros((self.UAV_NUMBER, 2), dtype=np.float64)
+        self.gu_positions = np.zeros((0, 2), dtype=np.float64)
+        self.gu_previous_positions = np.zeros((0, 2), dtype=np.float64)
+        self.gu_covered_flags = np.zeros(0, dtype=bool)
+        self.gu_channels_state = np.zeros((0, self.UAV_NUMBER), dtype=np.int64)
 
     def reset_observation_action_space(self):
-        self.observation_space = Box(low=self.low_observation,
-                                     high=self.high_observation,
-                                     shape=((self.UAV_NUMBER * 2) + self.gu_covered, 2),
-                                     dtype=np.float64)
+        if not self.padded_observation:
+            self.observation_space = Box(low=self.low_observation,
+                                         high=self.high_observation,
+                                         shape=((self.UAV_NUMBER * 2) + self.gu_covered, 2),
+                                         dtype=np.float64)
 
         self.action_space = Box(low=(-1) * self.MAX_SPEED_UAV,
                                 high=self.MAX_SPEED_UAV,
@@ -81,17 +237,109 @@ class CruiseUAV(Cruise):
                                 dtype=np.float64)
 
     def reset(self, seed=None, options: Optional[dict] = None) -> Tuple[np.ndarray, dict]:
-        self.uav = []
-        self.gu = []
+        if "scenario_id" in options:
+            if self.scenario_bank is None:
+                raise ValueError("a reset with a scenario_id needs an environment made with a scenario_bank")
+            if seed is not None:
+                raise ValueError("the state of np_random is restored from the scenario bank, seed must be None")
+            scenario_id = options["scenario_id"]
+            options = {**self.scenario_bank.get_options(scenario_id), "scenario_id": scenario_id}
         self.UAV_NUMBER = options["uav"]
         self.STARTING_GU_NUMBER = options["gu"]
+        if self.padded_observation and self.UAV_NUMBER > self.max_uav:
+            raise ValueError(f"{self.UAV_NUMBER} UAVs do not fit in the max_uav={self.max_uav} observation rows")
         self.reset_observation_action_space()
+        self.reset_actors_state()
+        self.gu_mobility = self.make_gu_mobility(options.get("mobility"))
         self.gu_number = self.STARTING_GU_NUMBER
-        self.disappear_gu_prob = self.SPAWN_GU_PROB * 4 / self.gu_number
+        self.update_disappear_gu_prob()
         self.gu_covered = 0
         self.last_RCR = None
         return super().reset(seed=seed, options=options)
 
+    def make_gu_mobility(self, spec) -> MobilityModel:
+        return make_mobility_model(spec, mean_speed=self.GU_MEAN_SPEED,
+                                   speed_standard_deviation=self.GU_STANDARD_DEVIATION)
+
+    def get_state(self) -> dict:
+        """
+        Return a picklable copy of the episode state: the UAV and GU arrays, the counters, last_RCR,
+        the GU mobility model with its state and the state of np_random. After set_state with it, on
+        this environment or on another one of the same track, the following steps are the same as
+        the steps of this environment.
+        The channel quantities recomputed by every step are not part of the state, restoring it
+        recomputes them from the restored channels state.
+        """
+        return {
+            "track_id": self.track.value,
+            "uav_number": self.UAV_NUMBER,
+            "starting_gu_number": self.STARTING_GU_NUMBER,
+            "gu_number": self.gu_number,
+            "gu_covered": self.gu_covered,
+            "disappear_gu_prob": self.disappear_gu_prob,
+            "last_RCR": None if self.last_RCR is None else self.last_RCR.copy(),
+            "uav_positions": self.to_numpy(self.uav_positions),
+            "uav_previous_positions": self.to_numpy(self.uav_previous_positions),
+            "uav_last_shifts": self.to_numpy(self.uav_last_shifts),
+            "gu_positions": self.to_numpy(self.gu_positions),
+            "gu_previous_positions": self.to_numpy(self.gu_previous_positions),
+            "gu_covered_flags": self.to_numpy(self.gu_covered_flags),
+            "gu_channels_state": self.to_numpy(self.gu_channels_state).astype(np.uint8),  # 0 = LoS, 1 = NLoS
+            "mobility": self.gu_mobility.spec,
+            "gu_mobility_state": {name: self.to_numpy(array) for name, array in self.gu_mobility.get_state().items()},
+            "np_random_state": self.np_random.bit_generator.state,
+        }
+
+    def set_state(self, state: dict) -> None:
+        """ Restore a state returned by get_state, the state is copied and can be restored again. """
+        if state["track_id"] != self.track.value:
+            raise ValueError(f"a state of track {state['track_id']} cannot be restored on track {self.track.value}")
+        if self.padded_observation and state["uav_number"] > self.max_uav:
+            raise ValueError(f"{state['uav_number']} UAVs do not fit in the max_uav={self.max_uav} observation rows")
+        self._load_state(state)
+        self.reset_observation_action_space()
+
+    def _load_state(self, state: dict) -> None:
+        """ Copy state into the environment, reset rebuilds the observation and action spaces itself. """
+        self.UAV_NUMBER = state["uav_number"]
+        self.STARTING_GU_NUMBER = state["starting_gu_number"]
+        self.gu_number = state["gu_number"]
+        self.gu_covered = state["gu_covered"]
+        self.disappear_gu_prob = state["disappear_gu_prob"]
+        self.last_RCR = None if state["last_RCR"] is None else state["last_RCR"].copy()
+        self.uav_positions = self.from_numpy(state["uav_positions"])
+        self.uav_previous_positions = self.from_numpy(state["uav_previous_positions"])
+        self.uav_last_shifts = self.from_numpy(state["uav_last_shifts"])
+        self.gu_positions = self.from_numpy(state["gu_positions"])
+        self.gu_previous_positions = self.from_numpy(state["gu_previous_positions"])
+        self.gu_covered_flags = self.from_numpy(state["gu_covered_flags"])
+        self.gu_channels_state = self.from_numpy(state["gu_channels_state"], np.int64)
+        self.gu_mobility = self.make_gu_mobility(state["mobility"])
+        self.gu_mobility.set_state({name: self.from_numpy(array)
+                                    for name, array in state["gu_mobility_state"].items()})
+        self.np_random.bit_generator.state = state["np_random_state"]
+        self.world = self.track.walls
+        self.calculate_channels_of_state()
+
+    def calculate_channels_of_state(self):
+        """ Distances, PathLoss, SINR and coverage of the channels state, without a step of the Markov chain. """
+        self.distances = channels_utils.calculate_distances_uav_gu(self.uav_positions, self.gu_positions, self.xp)
+        self.pathLoss = channels_utils.get_PathLoss(self.distances, self.gu_channels_state, self.xp)
+        self.calculate_SINR()
+        self.check_connection_and_coverage_UAV_GU()
+
+    def to_numpy(self, array: np.ndarray) -> np.ndarray:
+        """ Return a copy of one of the actors arrays, the torch backend stores them as tensors. """
+        return np.array(array)
+
+    def from_numpy(self, array: np.ndarray, dtype=None) -> np.ndarray:
+        """ Return a copy of array in the storage of the actors arrays. """
+        return np.array(array, dtype=dtype)
+
+    def random_uniform(self, shape: Tuple[int, ...]) -> np.ndarray:
+        """ Uniform samples in [0, 1) drawn from np_random, in the storage of the actors arrays. """
+        return self.np_random.random(shape)
+
     def perform_action(self, actions) -> None:
         self.move_UAV(actions)
         self.update_GU()
@@ -105,189 +353,138 @@ class CruiseUAV(Cruise):
         self.check_if_spawn_new_GU()
 
     def move_UAV(self, actions):
-        for i, uav in enumerate(self.uav):
-            previous_position = uav.position
-            new_position = Point(previous_position.x_coordinate + actions[i][0],
-                                 previous_position.y_coordinate + actions[i][1])
-            uav.position = new_position
-            uav.previous_position = previous_position
-            uav.last_shift_x = actions[i][0]
-            uav.last_shift_y = actions[i][1]
-
-    # Random walk the GU
+        actions = np.asarray(actions, dtype=np.float64).reshape(self.UAV_NUMBER, 2)
+        self.uav_previous_positions = self.uav_positions
+        self.uav_positions = self.uav_positions + actions
+        self.uav_last_shifts = actions.copy()
+
     def move_GU(self):
         area = self.np_random.choice(self.track.spawn_area)
-        for gu in self.gu:
-            repeat = True
-            while repeat:
-                previous_position = gu.position
-                distance = self.np_random.normal(self.GU_MEAN_SPEED, self.GU_STANDARD_DEVIATION)
-                if distance < 0.0:
-                    distance = 0.0
-                direction = np.random.choice(['up', 'down', 'left', 'right'])
-
-                if direction == 'up':
-                    new_position = Point(previous_position.x_coordinate, previous_position.y_coordinate + distance)
-                elif direction == 'down':
-                    new_position = Point(previous_position.x_coordinate, previous_position.y_coordinate - distance)
-                elif direction == 'left':
-                    new_position = Point(previous_position.x_coordinate - distance, previous_position.y_coordinate)
-                elif direction == 'right':
-                    new_position = Point(previous_position.x_coordinate + distance, previous_position.y_coordinate)
-
-                # check if GU exit from environment
-                if new_position.is_in_area(area):
-                    repeat = False
-                    gu.position = new_position
-                    gu.previous_position = previous_position
-                else:
-                    repeat = True
+        previous_positions = self.gu_positions
+        self.gu_positions = self.gu_mobility.move(self.np_random, previous_positions, area)
+        self.gu_previous_positions = previous_positions
 
     def calculate_PathLoss_with_Markov_Chain(self):
-        self.pathLoss = []
-        for gu in self.gu:
-            current_GU_PathLoss = []
-            new_channels_state = []
-            gu_shift = gu.position.calculate_distance(gu.previous_position)
-            for index, uav in enumerate(self.uav):
-                distance = channels_utils.calculate_distance_uav_gu(uav.position, gu.position)
-                channel_PLoS = channels_utils.get_PLoS(distance)
-                relative_shift = uav.position.calculate_distance(uav.previous_position) + gu_shift
-                transition_matrix = channels_utils.get_transition_matrix(relative_shift, channel_PLoS)
-                current_state = np.random.choice(range(len(transition_matrix)),
-                                                 p=transition_matrix[gu.channels_state[index]])
-                new_channels_state.append(current_state)
-                path_loss = channels_utils.get_PathLoss(distance, current_state)
-                current_GU_PathLoss.append(path_loss)
-            self.pathLoss.append(current_GU_PathLoss)
-            gu.setChannelsState(new_channels_state)
+        # gu_channels_state 0 = LoS, 1 = NLoS
+        self.distances, self.gu_channels_state, self.pathLoss = channels_utils.step_channels(
+            self.uav_positions, self.uav_previous_positions, self.gu_positions, self.gu_previous_positions,
+            self.gu_channels_state, self.random_uniform, self.xp)
 
     def calculate_SINR(self):
-        self.SINR = []
-        for i in range(len(self.gu)):
-            current_GU_SINR = []
-            current_pathLoss = self.pathLoss[i]
-            for j in range(len(self.uav)):
-                copy_list = current_pathLoss.copy()
-                del copy_list[j]
-                current_GU_SINR.append(channels_utils.getSINR(current_pathLoss[j], copy_list))
-            self.SINR.append(current_GU_SINR)
+        # the noise-only coverage is decided by the coverage distances, its SINR is computed on the first read
+        self._SINR = None
+        if self.sinr_model == "interference":
+            self._SINR = channels_utils.calculate_SINR(self.pathLoss, self.sinr_model, self.xp)
+
+    @property
+    def SINR(self):
+        """ SINR in dB of every link of the last step, shape (gu_number, UAV_NUMBER). """
+        if self._SINR is None:
+            self._SINR = channels_utils.calculate_SINR(self.pathLoss, self.sinr_model, self.xp)
+        return self._SINR
 
     def check_if_disappear_GU(self):
-        disappeared_GU = 0
-        index_to_remove = []
-        for i in range(self.gu_number):
-            sample = random.random()
-            if sample <= self.disappear_gu_prob:
-                index_to_remove.append(i)
-                disappeared_GU += 1
-        index_to_remove = sorted(index_to_remove, reverse=True)
-        for index in index_to_remove:
-            del self.gu[index]
-        self.gu_number -= disappeared_GU
+        # each GU disappears with disappear_gu_prob: draw how many do, then which ones
+        disappearing = self.np_random.binomial(self.gu_number, self.disappear_gu_prob)
+        if disappearing == 0:
+            return
+        remaining = np.ones(self.gu_number, dtype=bool)
+        remaining[self.np_random.choice(self.gu_number, size=disappearing, replace=False)] = False
+        self.gu_positions = self.gu_positions[remaining]
+        self.gu_previous_positions = self.gu_previous_positions[remaining]
+        self.gu_covered_flags = self.gu_covered_flags[remaining]
+        self.gu_channels_state = self.gu_channels_state[remaining]
+        self.gu_mobility.remove(remaining)
+        self.gu_number = len(self.gu_positions)
 
     def check_if_spawn_new_GU(self):
-        sample = random.random()
-        for _ in range(4):
-            if sample <= self.SPAWN_GU_PROB:
-                area = self.np_random.choice(self.track.spawn_area)
-                x_coordinate = self.np_random.uniform(area[0][0], area[0][1])
-                y_coordinate = self.np_random.uniform(area[1][0], area[1][1])
-                gu = GU(Point(x_coordinate, y_coordinate))
-                self.initialize_channel(gu)
-                self.gu.append(gu)
-                self.gu_number += 1
-        # update disappear gu probability
-        self.disappear_gu_prob = self.SPAWN_GU_PROB * 4 / self.gu_number
+        spawning = self.np_random.binomial(self.SPAWN_GU_ATTEMPTS, self.SPAWN_GU_PROB)
+        if spawning > 0:
+            area = self.np_random.choice(self.track.spawn_area)
+            self.add_GU(self.np_random.uniform(area[:, 0], area[:, 1], size=(spawning, 2)), area)
+        self.update_disappear_gu_prob()
+
+    def update_disappear_gu_prob(self):
+        # expected disappearances equal the expected spawns, clipped to 1 for the binomial draw
+        # when there are fewer GUs than expected spawns
+        self.disappear_gu_prob = min(self.SPAWN_GU_PROB * self.SPAWN_GU_ATTEMPTS / max(self.gu_number, 1), 1.0)
+
+    def add_GU(self, positions: np.ndarray, area: np.ndarray):
+        self.gu_positions = np.concatenate((self.gu_positions, positions))
+        self.gu_previous_positions = np.concatenate((self.gu_previous_positions, positions))
+        self.gu_covered_flags = np.concatenate((self.gu_covered_flags, np.zeros(len(positions), dtype=bool)))
+        self.gu_channels_state = np.concatenate((self.gu_channels_state, self.initialize_channel(positions)))
+        self.gu_mobility.add(self.np_random, positions, area)
+        self.gu_number = len(self.gu_positions)
 
     def check_connection_and_coverage_UAV_GU(self):
-        covered = 0
-        self.connectivity_matrix = np.zeros((self.gu_number, self.UAV_NUMBER), dtype=int)
-        for i, gu in enumerate(self.gu):
-            gu.setCovered(False)
-            current_SINR = self.SINR[i]
-            for j in range(len(self.uav)):
-                if current_SINR[j] >= self.COVERED_TRESHOLD:
-                    self.connectivity_matrix[i, j] = 1
-            if any(SINR >= self.COVERED_TRESHOLD for SINR in current_SINR):
-                gu.setCovered(True)
-                covered += 1
-        self.gu_covered = covered
+        connected = channels_utils.get_connected_links(self.distances, self.gu_channels_state, self.coverage_distances,
+                                                       self.SINR if self.sinr_model == "interference" else None,
+                                                       self.COVERED_TRESHOLD)
+        self.connectivity_matrix = self.xp.where(connected, 1, 0)
+        # the GUs covered by one UAV only are the marginal coverage of that UAV, the rewards are NumPy
+        self.gu_cover_count, uav_covered_alone = channels_utils.count_coverage(connected, self.xp)
+        self.uav_covered_alone = self.to_numpy(uav_covered_alone)
+        self.gu_covered_flags = self.gu_cover_count > 0
+        self.gu_covered = int(self.xp.count_nonzero(self.gu_covered_flags))
 
     def get_observation(self) -> np.ndarray:
+        if self.padded_observation:
+            return self.get_padded_observation()
         self.observation_space = Box(low=self.low_observation,
                                      high=self.high_observation,
                                      shape=((self.UAV_NUMBER * 2) + self.gu_covered, 2),
                                      dtype=np.float64)
-        observation = [
-            normalizePositions(np.array([self.uav[0].position.x_coordinate, self.uav[0].position.y_coordinate]))]
-        observation = np.append(observation,
-                                [normalizeActions(np.array([self.uav[0].last_shift_x, self.uav[0].last_shift_y]))],
-                                axis=0)
-        for i in range(1, self.UAV_NUMBER):
-            observation = np.append(observation,
-                                    [normalizePositions(np.array(
-                                        [self.uav[i].position.x_coordinate, self.uav[i].position.y_coordinate]))],
-                                    axis=0)
-            observation = np.append(observation,
-                                    [normalizeActions(np.array([self.uav[i].last_shift_x, self.uav[i].last_shift_y]))],
-                                    axis=0)
-
-        for gu in self.gu:
-            if gu.covered:
-                observation = np.append(observation,
-                                        [normalizePositions(
-                                            np.array([gu.position.x_coordinate, gu.position.y_coordinate]))],
-                                        axis=0)
+        observation = np.empty(((self.UAV_NUMBER * 2) + self.gu_covered, 2), dtype=np.float64)
+        observation[0:self.UAV_NUMBER * 2:2] = normalizePositions(self.uav_positions)
+        observation[1:self.UAV_NUMBER * 2:2] = normalizeActions(self.uav_last_shifts)
+        observation[self.UAV_NUMBER * 2:] = normalizePositions(self.gu_positions[self.gu_covered_flags])
+        return observation
+
+    def get_padded_observation(self) -> np.ndarray:
+        if self.gu_covered > self.max_gu:
+            raise ValueError(f"{self.gu_covered} covered GUs do not fit in the max_gu={self.max_gu} observation rows")
+        self.observation_index = 1 - self.observation_index
+        observation = self.observation_buffers[self.observation_index]
+        observation_mask = self.observation_masks[self.observation_index]
+        observation.fill(0.0)
+        observation_mask.fill(False)
+        normalizePositions(self.uav_positions, out=observation[0:self.UAV_NUMBER * 2:2])
+        normalizeActions(self.uav_last_shifts, out=observation[1:self.UAV_NUMBER * 2:2])
+        observation_mask[:self.UAV_NUMBER * 2] = True
+        covered_rows = observation[self.max_uav * 2:self.max_uav * 2 + self.gu_covered]
+        np.compress(self.gu_covered_flags, self.gu_positions, axis=0, out=covered_rows)
+        normalizePositions(covered_rows, out=covered_rows)
+        observation_mask[self.max_uav * 2:self.max_uav * 2 + self.gu_covered] = True
         return observation
 
     def check_if_terminated(self):
-        terminated_matrix = []
         area = self.np_random.choice(self.track.spawn_area)
-        for i, uav in enumerate(self.uav):
-            if not uav.position.is_in_area(area) or self.collision(i, uav):
-                terminated_matrix.append(True)
-            else:
-                terminated_matrix.append(False)
-        return terminated_matrix
-
-    def collision(self, current_uav_index, uav) -> bool:
-        collision = False
-        for j, other_uav in enumerate(self.uav):
-            if j != current_uav_index:
-                if uav.position.calculate_distance(other_uav.position) <= self.COLLISION_DISTANCE:
-                    collision = True
-                    break
-        return collision
+        in_area = positions_in_area(self.uav_positions, area)
+        return (~in_area | find_close_positions(self.uav_positions, self.COLLISION_DISTANCE)).tolist()
 
     def check_if_truncated(self) -> bool:
         return False
 
     def RCR_without_uav_i(self, i):
-        tmp_matrix = np.delete(self.connectivity_matrix, i, axis=1)  # Remove i-th column
-        return np.sum(np.any(tmp_matrix, axis=1))
+        return self.gu_covered - self.uav_covered_alone[i]
 
     def calculate_reward(self, terminated):
-        current_rewards = []
-        for i in range(len(self.uav)):
-            if terminated[i]:
-                current_rewards.append(-2.0)
-            else:
-                current_rewards.append((self.gu_covered - self.RCR_without_uav_i(i)) / len(self.gu))
+        terminated = np.asarray(terminated, dtype=bool)
+        # (gu_covered - RCR_without_uav_i(i)) / gu_number for every UAV at once
+        current_rewards = np.where(terminated, -2.0, self.uav_covered_alone / max(self.gu_number, 1))
         if self.last_RCR is None:
             self.last_RCR = current_rewards
-            return [r * 100.0 for r in current_rewards]
-        delta_RCR_smorzato = []
-        for i in range(len(self.uav)):
-            if not terminated[i]:
-                delta_RCR_smorzato.append(self.reward_gamma * (current_rewards[i] - self.last_RCR[i]))
-            else:
-                delta_RCR_smorzato.append(0.0)
+            return (current_rewards * 100.0).tolist()
+        delta_RCR_smorzato = np.where(terminated, 0.0, self.reward_gamma * (current_rewards - self.last_RCR))
         self.last_RCR = current_rewards
-        reward_smorzato = np.add(current_rewards, delta_RCR_smorzato)
-        return [r * 100.0 for r in reward_smorzato]
+        reward_smorzato = current_rewards + delta_RCR_smorzato
+        return (reward_smorzato * 100.0).tolist()
 
     def init_environment(self, options: Optional[dict] = None) -> None:
+        if "scenario_id" in options:
+            self._load_state(self.scenario_bank.get_state(options["scenario_id"]))
+            return
         self.init_uav()
         if options['clustered'] == 0:
             self.init_gu()
@@ -299,88 +496,47 @@ class CruiseUAV(Cruise):
 
     def init_uav(self) -> None:
         area = self.np_random.choice(self.track.spawn_area)
-        # x_coordinate = self.np_random.uniform(area[0][0] + 800, area[0][1] - 800)
-        x_coordinate = self.np_random.uniform(area[0][0], area[0][1])
-        y_coordinate = self.np_random.uniform(area[1][0], area[1][1])
-        self.uav.append(UAV(Point(x_coordinate, y_coordinate)))
-        for i in range(1, self.UAV_NUMBER):
-            x_coordinate = self.np_random.uniform(area[0][0], area[0][1])
-            y_coordinate = self.np_random.uniform(area[1][0], area[1][1])
-            position = Point(x_coordinate, y_coordinate)
-            while self.are_too_close(i, position):
-                x_coordinate = self.np_random.uniform(area[0][0], area[0][1])
-                y_coordinate = self.np_random.uniform(area[1][0], area[1][1])
-                position = Point(x_coordinate, y_coordinate)
-            self.uav.append(UAV(position))
-
-    def are_too_close(self, uav_index, position):
-        too_close = False
-        for j in range(uav_index):
-            if self.uav[j].position.calculate_distance(position) <= self.MINIMUM_STARTING_DISTANCE_BETWEEN_UAV:
-                too_close = True
-                break
-        return too_close
+        self.uav_positions = sample_separated_positions(self.np_random, area, self.UAV_NUMBER,
+                                                        self.MINIMUM_STARTING_DISTANCE_BETWEEN_UAV)
+        self.uav_previous_positions = self.uav_positions.copy()
 
     def init_gu(self) -> None:
         area = self.np_random.choice(self.track.spawn_area)
-        for _ in range(self.gu_number):
-            x_coordinate = self.np_random.uniform(area[0][0], area[0][1])
-            y_coordinate = self.np_random.uniform(area[1][0], area[1][1])
-            gu = GU(Point(x_coordinate, y_coordinate))
-            self.initialize_channel(gu)
-            self.gu.append(gu)
+        # x and y are drawn alternately for every GU
+        positions = self.np_random.uniform(area[:, 0], area[:, 1], size=(self.gu_number, 2))
+        self.add_GU(positions, area)
 
     def init_gu_clustered(self, options: Optional[dict] = None) -> None:
         area = self.np_random.choice(self.track.spawn_area)
         std_dev = np.sqrt(options['variance'])
         number_of_clusters = options['clusters_number']
         gu_for_cluster = int(self.STARTING_GU_NUMBER / number_of_clusters)
-        for i in range(number_of_clusters):
-            mean_x = self.np_random.uniform(area[0][0] + 250, area[0][1] - 250)
-            mean_y = self.np_random.uniform(area[0][0] + 250, area[0][1] - 250)
-            for j in range(gu_for_cluster):
-                repeat = True
-                while repeat:
-                    # Generazione del numero casuale
-                    x_coordinate = np.random.normal(mean_x, std_dev)
-                    y_coordinate = np.random.normal(mean_y, std_dev)
-                    position = Point(x_coordinate, y_coordinate)
-                    if position.is_in_area(area):
-                        repeat = False
-                gu = GU(position)
-                self.initialize_channel(gu)
-                self.gu.append(gu)
-
-    def initialize_channel(self, gu):
-        for uav in self.uav:
-            distance = channels_utils.calculate_distance_uav_gu(uav.position, gu.position)
-            initial_channel_PLoS = channels_utils.get_PLoS(distance)
-            sample = random.random()
-            if sample <= initial_channel_PLoS:
-                gu.channels_state.append(0)  # 0 = LoS
-            else:
-                gu.channels_state.append(1)  # 1 = NLoS
-
-    def draw(self, canvas: Surface) -> None:
-        # CANVAS
-        canvas.fill(Color.WHITE.value)
-
-        # WALL
-        for wall in self.world:
-            pygame.draw.line(canvas,
-                             Color.BLACK.value,
-                             self.convert_point(wall.start),
-                             self.convert_point(wall.end),
-                             self.WIDTH)
+        # both coordinates of the cluster centers are drawn in the x range of the area
+        means = self.np_random.uniform(area[0][0] + 250, area[0][1] - 250, size=(number_of_clusters, 2))
+        self.add_GU(sample_clustered_positions(self.np_random, means, std_dev, gu_for_cluster, area), area)
+
+    def initialize_channel(self, gu_positions: np.ndarray) -> np.ndarray:
+        # 0 = LoS, 1 = NLoS
+        return channels_utils.get_initial_channels_state(self.uav_positions, gu_positions, self.random_uniform,
+                                                         self.xp)
+
+    def draw(self, canvas: "Surface") -> None:
+        # CANVAS and WALL do not change, the renderer draws them once and then copies them back
+        self.renderer.draw_background(canvas, Color.WHITE.value,
+                                      [(Color.BLACK.value,
+                                        self.convert_point(wall.start),
+                                        self.convert_point(wall.end),
+                                        self.WIDTH) for wall in self.world])
 
         # GU image
-        for gu in self.gu:
-            canvas.blit(pygame.image.load(gu.getImage()), self.image_convert_point(gu.position))
+        gu_images = ('white30.png', 'green30.png')
+        gu_pixels = self.image_convert_positions(self.gu_positions)
+        self.renderer.draw_sprites(canvas, [(gu_images[covered], pixel)
+                                            for covered, pixel in zip(self.gu_covered_flags.tolist(), gu_pixels)])
 
         # UAV image
-        icon_drone = pygame.image.load('./gym_cruising/images/drone30.png')
-        for uav in self.uav:
-            canvas.blit(icon_drone, self.image_convert_point(uav.position))
+        self.renderer.draw_sprites(canvas, [('drone30.png', pixel)
+                                            for pixel in self.image_convert_positions(self.uav_positions)])
 
     def convert_point(self, point: Point) -> Tuple[int, int]:
         pygame_x = (round(point.x_coordinate * self.RESOLUTION)
@@ -397,10 +553,23 @@ class CruiseUAV(Cruise):
         pygame_y = (self.window_size - round(point.y_coordinate * self.RESOLUTION) - shiftY + self.Y_OFFSET)
         return pygame_x, pygame_y
 
+    def image_convert_positions(self, positions: np.ndarray) -> List[Tuple[int, int]]:
+        """ Vectorized image_convert_point over an (N, 2) array of positions. """
+        shift = 15
+        pygame_x = np.round(positions[:, 0] * self.RESOLUTION).astype(np.int64) - shift + self.X_OFFSET
+        pygame_y = (self.window_size - np.round(positions[:, 1] * self.RESOLUTION).astype(np.int64)
+                    - shift + self.Y_OFFSET)
+        return list(zip(pygame_x.tolist(), pygame_y.tolist()))
+
     def create_info(self, terminated) -> dict:
         if sum(terminated) >= 2:
             RCR = str(0.0)
         else:
-            RCR = str(self.gu_covered/self.gu_number)
-        return {"GU coperti": str(self.gu_covered), "Ground Users": str(
+            RCR = str(self.gu_covered / max(self.gu_number, 1))
+        info = {"GU coperti": str(self.gu_covered), "Ground Users": str(
             self.gu_number), "RCR": RCR, "terminated": sum(terminated)}
+        if self.padded_observation:
+            info["observation_mask"] = self.observation_masks[self.observation_index]
+        if self.profile_in_info:
+            info["profile"] = self.get_profile()
+        return info
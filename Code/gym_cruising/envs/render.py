@@ -0,0 +1,95 @@
+""" This module contains the pygame renderer of the Cruising environments, imported only to render """
+import os
+from functools import lru_cache
+from typing import Callable, Iterable, Optional, Sequence, Tuple
+
+import numpy as np
+
+os.environ.setdefault("PYGAME_HIDE_SUPPORT_PROMPT", "1")
+import pygame  # pylint: disable=wrong-import-position
+from pygame import Surface  # pylint: disable=wrong-import-position
+
+IMAGES_PATH = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), 'images')
+FRAME_COPY_ROWS = 64  # rows of frame_buffer copied into an rgb_array frame at a time
+
+
+@lru_cache(maxsize=None)
+def load_sprite(file_name: str) -> Surface:
+    """ Load a sprite once per process, with the RGBA byte order of the RGBX canvas for fast alpha blits. """
+    image = pygame.image.load(os.path.join(IMAGES_PATH, file_name))
+    return pygame.image.frombytes(pygame.image.tobytes(image, "RGBA"), image.get_size(), "RGBA")
+
+
+class Renderer:
+    """
+    This class owns the pygame window of the human mode and the canvas drawn by the environments.
+    The canvas draws directly into frame_buffer, so no display is needed for the rgb_array mode.
+    rgb_array frames are copies of frame_buffer, with frame_view they are views of it overwritten by the next render.
+    """
+
+    canvas: Surface  # reused drawing surface over frame_buffer
+    frame_buffer: np.ndarray  # (window_size, window_size, 4) RGBX pixels
+    background: Optional[bytes]  # raw pixels of the static part of the canvas
+
+    def __init__(self, render_mode: str, window_size: int, render_fps: int, frame_view: bool = False) -> None:
+        self.render_mode = render_mode
+        self.frame_view = frame_view
+        self.window_size = window_size
+        self.render_fps = render_fps
+        self.window = None
+        self.clock = None
+        self.frame_buffer = np.zeros((window_size, window_size, 4), dtype=np.uint8)
+        self.canvas = pygame.image.frombuffer(self.frame_buffer, (window_size, window_size), "RGBX")
+        self.background = None
+
+    def render_frame(self, draw: Callable[[Surface], None]) -> Optional[np.ndarray]:
+        if self.window is None and self.render_mode == "human":
+            pygame.init()
+            pygame.display.init()
+            self.window = pygame.display.set_mode((self.window_size, self.window_size))
+        if self.clock is None and self.render_mode == "human":
+            self.clock = pygame.time.Clock()
+
+        # Draw the canvas
+        draw(self.canvas)
+
+        if self.render_mode == "human":
+            # The following line copies our drawings from canvas to the visible window
+            self.window.blit(self.canvas, self.canvas.get_rect())
+            pygame.event.pump()
+            pygame.display.update()
+            # We need to ensure that human-rendering occurs at the predefined framerate.
+            self.clock.tick(self.render_fps)
+            return None
+        if self.frame_view:
+            # (window_size, window_size, 3) view of the frame buffer, overwritten by the next render
+            return self.frame_buffer[:, :, :3]
+        frame = np.empty((self.window_size, self.window_size, 3), dtype=np.uint8)
+        # one channel at a time over blocks of rows still in cache, the copy of the whole strided
+        # RGB view is about 5 times slower
+        for row in range(0, self.window_size, FRAME_COPY_ROWS):
+            rows = slice(row, row + FRAME_COPY_ROWS)
+            for channel in range(3):
+                frame[rows, :, channel] = self.frame_buffer[rows, :, channel]
+        return frame
+
+    def draw_background(self, canvas: Surface, color: Tuple[int, int, int],
+                        lines: Sequence[Tuple[Tuple[int, int, int], Tuple[int, int], Tuple[int, int], int]]) -> None:
+        """ Fill canvas with color and draw lines (color, start, end, width), drawn once and then copied back. """
+        if self.background is None or len(self.background) != canvas.get_pitch() * canvas.get_height():
+            canvas.fill(color)
+            for line_color, start, end, width in lines:
+                pygame.draw.line(canvas, line_color, start, end, width)
+            self.background = canvas.get_buffer().raw
+        else:
+            canvas.get_buffer().write(self.background)
+
+    @staticmethod
+    def draw_sprites(canvas: Surface, sprites: Iterable[Tuple[str, Tuple[int, int]]]) -> None:
+        """ Blit the (image file name, top left pixel) sprites in order. """
+        canvas.blits([(load_sprite(file_name), pixel) for file_name, pixel in sprites], doreturn=False)
+
+    def close(self) -> None:
+        if self.window is not None:
+            pygame.display.quit()
+            pygame.quit()
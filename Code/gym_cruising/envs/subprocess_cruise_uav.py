@@ -0,0 +1,210 @@
+""" This module contains the process-pool vector version of the Cruising environment """
+import ctypes
+import multiprocessing
+from typing import Optional, Sequence, Tuple, Union
+
+import numpy as np
+from gymnasium.spaces import Box
+
+from gym_cruising.enums.track import Track
+from gym_cruising.envs.cruise_uav import CruiseUAV, normalized_observation_bounds
+
+INFO_KEYS = ("GU coperti", "Ground Users", "RCR", "terminated")
+
+
+def shared_array(raw_array, shape: tuple, dtype) -> np.ndarray:
+    return np.frombuffer(raw_array, dtype=dtype).reshape(shape)
+
+
+class SharedBuffers:
+    """
+    Preallocated shared-memory arrays written by the workers and read by the main process.
+    Observations are the (max_uav * 2 + max_gu, 2) padded observations of CruiseUAV.
+    """
+
+    def __init__(self, context, num_envs: int, max_uav: int, max_gu: int) -> None:
+        self.num_envs = num_envs
+        self.max_uav = max_uav
+        self.max_gu = max_gu
+        rows = max_uav * 2 + max_gu
+        self.specs = {
+            "observation": ((num_envs, rows, 2), np.float64, ctypes.c_double),
+            "observation_mask": ((num_envs, rows), bool, ctypes.c_bool),
+            "final_observation": ((num_envs, rows, 2), np.float64, ctypes.c_double),
+            "final_observation_mask": ((num_envs, rows), bool, ctypes.c_bool),
+            "actions": ((num_envs, max_uav, 2), np.float64, ctypes.c_double),
+            "reward": ((num_envs, max_uav), np.float64, ctypes.c_double),
+            "terminated": ((num_envs,), bool, ctypes.c_bool),
+            "truncated": ((num_envs,), bool, ctypes.c_bool),
+            "info": ((num_envs, len(INFO_KEYS)), np.float64, ctypes.c_double),
+        }
+        self.raw_arrays = {name: context.RawArray(ctype, int(np.prod(shape)))
+                           for name, (shape, _, ctype) in self.specs.items()}
+        self.attach()
+
+    def attach(self) -> None:
+        """ Create the NumPy views over the shared memory, called again in every worker. """
+        for name, (shape, dtype, _) in self.specs.items():
+            setattr(self, name, shared_array(self.raw_arrays[name], shape, dtype))
+
+    def __getstate__(self) -> dict:
+        return {key: value for key, value in self.__dict__.items() if key in (
+            "num_envs", "max_uav", "max_gu", "specs", "raw_arrays")}
+
+    def __setstate__(self, state: dict) -> None:
+        self.__dict__.update(state)
+        self.attach()
+
+    def write_observation(self, index: int, observation: np.ndarray, observation_mask: np.ndarray,
+                          final: bool = False) -> None:
+        if final:
+            self.final_observation[index] = observation
+            self.final_observation_mask[index] = observation_mask
+        else:
+            self.observation[index] = observation
+            self.observation_mask[index] = observation_mask
+
+    def write_info(self, index: int, info: dict) -> None:
+        self.info[index] = [float(info[key]) for key in INFO_KEYS]
+
+
+def worker(index: int, pipe, buffers: SharedBuffers, track_id: int, max_episode_steps: Optional[int]) -> None:
+    env = CruiseUAV(track_id=track_id, padded_observation=True, max_uav=buffers.max_uav, max_gu=buffers.max_gu)
+    options = None
+    steps = 0
+    try:
+        while True:
+            command, data = pipe.recv()
+            if command == "reset":
+                seed, options = data
+                observation, info = env.reset(seed=seed, options=options)
+                steps = 0
+                buffers.write_observation(index, observation, info["observation_mask"])
+                buffers.write_info(index, info)
+                pipe.send((True, None))
+            elif command == "step":
+                actions = buffers.actions[index, :env.UAV_NUMBER]
+                observation, reward, terminated, truncated, info = env.step(actions)
+                steps += 1
+                if max_episode_steps is not None and steps >= max_episode_steps:
+                    truncated = True
+                buffers.reward[index] = 0.0
+                buffers.reward[index, :env.UAV_NUMBER] = reward
+                buffers.terminated[index] = terminated
+                buffers.truncated[index] = truncated
+                buffers.write_info(index, info)
+                if terminated or truncated:
+                    # auto-reset, the Generator of the environment keeps the sequence of the worker seed
+                    buffers.write_observation(index, observation, info["observation_mask"], final=True)
+                    observation, info = env.reset(options=options)
+                    steps = 0
+                buffers.write_observation(index, observation, info["observation_mask"])
+                pipe.send((True, None))
+            elif command == "close":
+                pipe.send((True, None))
+                break
+    except Exception as error:  # pylint: disable=broad-except
+        pipe.send((False, error))
+    finally:
+        env.close()
+
+
+class SubprocessCruiseUAV:
+    """
+    This class steps num_envs Cruising environments in worker processes.
+    Actions, padded observations, coverage masks, rewards and info scalars are exchanged
+    through preallocated shared memory, the pipes only carry the commands.
+    """
+
+    observation_space: Box  # (num_envs, max_uav * 2 + max_gu, 2)
+    action_space: Box  # (num_envs, max_uav, 2)
+
+    def __init__(self,
+                 num_envs: int,
+                 max_uav: int,
+                 max_gu: int,
+                 track_id: int = 1,
+                 max_episode_steps: Optional[int] = None,
+                 context: Optional[str] = None,
+                 copy: bool = True) -> None:
+        self.num_envs = num_envs
+        self.copy = copy
+        low_observation, high_observation = normalized_observation_bounds(Track(track_id))
+        self.observation_space = Box(low=low_observation, high=high_observation,
+                                     shape=(num_envs, max_uav * 2 + max_gu, 2), dtype=np.float64)
+        self.action_space = Box(low=(-1) * CruiseUAV.MAX_SPEED_UAV, high=CruiseUAV.MAX_SPEED_UAV,
+                                shape=(num_envs, max_uav, 2), dtype=np.float64)
+        ctx = multiprocessing.get_context(context)
+        self.buffers = SharedBuffers(ctx, num_envs, max_uav, max_gu)
+        self.pipes = []
+        self.processes = []
+        for index in range(num_envs):
+            parent_pipe, child_pipe = ctx.Pipe()
+            process = ctx.Process(target=worker,
+                                  args=(index, child_pipe, self.buffers, track_id, max_episode_steps),
+                                  daemon=True)
+            process.start()
+            child_pipe.close()
+            self.pipes.append(parent_pipe)
+            self.processes.append(process)
+        self.closed = False
+
+    def reset(self, seed: Optional[int] = None,
+              options: Union[dict, Sequence[dict]] = None) -> Tuple[np.ndarray, dict]:
+        """ Reset every worker, worker i is seeded with seed + i. """
+        if isinstance(options, dict):
+            options = [options] * self.num_envs
+        assert len(options) == self.num_envs
+        for index, pipe in enumerate(self.pipes):
+            pipe.send(("reset", (None if seed is None else seed + index, options[index])))
+        self.wait()
+        return self.get(self.buffers.observation), self.get_info()
+
+    def step(self, actions) -> Tuple[np.ndarray, np.ndarray, np.ndarray, np.ndarray, dict]:
+        """ actions has shape (num_envs, max_uav, 2), the rows of missing UAVs are ignored. """
+        self.buffers.actions[:] = actions
+        for pipe in self.pipes:
+            pipe.send(("step", None))
+        self.wait()
+        info = self.get_info()
+        done = self.buffers.terminated | self.buffers.truncated
+        info["done"] = done.copy()
+        if np.any(done):
+            info["final_observation"] = self.buffers.final_observation.copy()
+            info["final_observation_mask"] = self.buffers.final_observation_mask.copy()
+        return (self.get(self.buffers.observation), self.get(self.buffers.reward),
+                self.get(self.buffers.terminated), self.get(self.buffers.truncated), info)
+
+    def wait(self) -> None:
+        for pipe in self.pipes:
+            success, error = pipe.recv()
+            if not success:
+                self.close()
+                raise error
+
+    def get(self, array: np.ndarray) -> np.ndarray:
+        return array.copy() if self.copy else array
+
+    def get_info(self) -> dict:
+        info = {key: self.buffers.info[:, i].copy() for i, key in enumerate(INFO_KEYS)}
+        info["GU coperti"] = info["GU coperti"].astype(np.int64)
+        info["Ground Users"] = info["Ground Users"].astype(np.int64)
+        info["terminated"] = info["terminated"].astype(np.int64)
+        info["observation_mask"] = self.get(self.buffers.observation_mask)
+        return info
+
+    def close(self) -> None:
+        if self.closed:
+            return
+        self.closed = True
+        for pipe, process in zip(self.pipes, self.processes):
+            if process.is_alive():
+                try:
+                    pipe.send(("close", None))
+                    pipe.recv()
+                except (BrokenPipeError, EOFError):
+                    pass
+            process.join(timeout=1)
+            if process.is_alive():
+                process.terminate()
+            pipe.close()
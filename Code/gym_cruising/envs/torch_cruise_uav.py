@@ -0,0 +1,240 @@
+""" This module contains the Cruising environment with the actors arrays stored as torch tensors """
+from typing import List, Optional, Tuple, Union
+
+import numpy as np
+import torch
+from gymnasium.spaces import Box
+
+from gym_cruising.envs.cruise_uav import MAX_POSITION, MAX_SPEED_UAV, CruiseUAV
+from gym_cruising.geometry.spacing import sample_separated_positions
+from gym_cruising.utils.mobility import MobilityModel
+
+Size = Union[int, Tuple[int, ...]]
+
+
+def normalize_positions(positions: torch.Tensor) -> torch.Tensor:  # Normalize in [-1,1]
+    return positions / MAX_POSITION * 2 - 1
+
+
+def normalize_actions(actions: torch.Tensor) -> torch.Tensor:  # Normalize in [-1,1]
+    return (actions + MAX_SPEED_UAV) / (2 * MAX_SPEED_UAV) * 2 - 1
+
+
+def positions_in_area(positions: torch.Tensor, area: np.ndarray) -> torch.Tensor:
+    """ Row-wise version of Point.is_in_area for an (n, 2) tensor of positions. """
+    return ((positions[:, 0] > float(area[0, 0])) & (positions[:, 0] < float(area[0, 1]))
+            & (positions[:, 1] > float(area[1, 0])) & (positions[:, 1] < float(area[1, 1])))
+
+
+class TorchGenerator:
+    """
+    The methods of np.random.Generator used by the environment and by the GU mobility models, drawing
+    float64 and int64 tensors on device from a torch.Generator.
+    """
+
+    def __init__(self, device: torch.device) -> None:
+        self.device = device
+        self.generator = torch.Generator(device=device)
+
+    def manual_seed(self, seed: int) -> None:
+        self.generator.manual_seed(seed)
+
+    def get_state(self) -> torch.Tensor:
+        return self.generator.get_state()
+
+    def set_state(self, state: torch.Tensor) -> None:
+        self.generator.set_state(state)
+
+    def random(self, size: Size) -> torch.Tensor:
+        return torch.rand(size, generator=self.generator, dtype=torch.float64, device=self.device)
+
+    def uniform(self, low=0.0, high=1.0, size: Size = 1) -> torch.Tensor:
+        return low + (high - low) * self.random(size)
+
+    def standard_normal(self, size: Size) -> torch.Tensor:
+        return torch.randn(size, generator=self.generator, dtype=torch.float64, device=self.device)
+
+    def normal(self, loc=0.0, scale=1.0, size: Size = 1) -> torch.Tensor:
+        return loc + scale * self.standard_normal(size)
+
+    def integers(self, high: int, size: Size) -> torch.Tensor:
+        return torch.randint(high, size if isinstance(size, tuple) else (size,), generator=self.generator,
+                             device=self.device)
+
+    def choice(self, a: int, size: int, replace: bool = True) -> torch.Tensor:
+        if replace:
+            return self.integers(a, size)
+        return torch.randperm(a, generator=self.generator, device=self.device)[:size]
+
+
+class TorchCruiseUAV(CruiseUAV):
+    """
+    CruiseUAV with the UAV and GU arrays, the channel states and the coverage stored as torch
+    tensors on device. Observations are float32 tensors on device and actions may be tensors,
+    so a torch policy steps the environment without numpy conversions.
+
+    The per-GU random numbers, of the channels, of the GU mobility models and of the GU spawns and
+    disappearances, are drawn on device by torch_random, a torch.Generator seeded from np_random at
+    every reset, and the GU mobility models move the tensors through xp. np_random draws the UAV
+    start, the spawn areas and the numbers of GUs spawning and disappearing, on the host. The channel
+    model of channels_utils is evaluated in float64 as on Cruising-v0, but with the same seed the
+    episodes of the two environments differ. get_state returns NumPy arrays and the state of
+    torch_random, the scenario banks are shared by the two environments: a reset from the bank seeds
+    torch_random from the restored np_random.
+    """
+
+    xp = torch
+    torch_random: TorchGenerator
+
+    def __init__(self, render_mode=None, track_id: int = 1, device: Union[str, torch.device] = "cpu",
+                 **kwargs) -> None:
+        self.device = torch.device(device)
+        self.torch_random = TorchGenerator(self.device)
+        super().__init__(render_mode, track_id, **kwargs)
+        self.coverage_distances = torch.as_tensor(self.coverage_distances, device=self.device)
+        self.spawn_areas = torch.as_tensor(np.array(self.track.spawn_area, dtype=np.float64), device=self.device)
+        if self.padded_observation:
+            self.observation_space = Box(low=self.low_observation, high=self.high_observation,
+                                         shape=self.observation_buffers.shape[1:], dtype=np.float32)
+            self.observation_buffers = torch.zeros(self.observation_buffers.shape, dtype=torch.float32,
+                                                   device=self.device)
+            self.observation_masks = torch.zeros(self.observation_masks.shape, dtype=torch.bool, device=self.device)
+
+    def to_numpy(self, array: torch.Tensor) -> np.ndarray:
+        return array.cpu().numpy().copy()
+
+    def from_numpy(self, array: np.ndarray, dtype=None) -> torch.Tensor:
+        return torch.from_numpy(np.array(array, dtype=dtype)).to(self.device)
+
+    def random_uniform(self, shape: Tuple[int, ...]) -> torch.Tensor:
+        return self.torch_random.random(shape)
+
+    def make_gu_mobility(self, spec) -> MobilityModel:
+        return super().make_gu_mobility(spec).to(torch, self.device)
+
+    def get_state(self) -> dict:
+        return {**super().get_state(), "torch_random_state": self.torch_random.get_state().numpy()}
+
+    def _load_state(self, state: dict) -> None:
+        super()._load_state(state)
+        if "torch_random_state" in state:
+            self.torch_random.set_state(torch.from_numpy(np.array(state["torch_random_state"], dtype=np.uint8)))
+        else:  # a state of the NumPy environment or of a scenario bank
+            self.seed_torch_random()
+
+    def seed_torch_random(self) -> None:
+        self.torch_random.manual_seed(int(self.np_random.integers(2 ** 63 - 1)))
+
+    def init_environment(self, options: Optional[dict] = None) -> None:
+        if "scenario_id" not in options:
+            self.seed_torch_random()
+        super().init_environment(options)
+
+    def choose_spawn_area(self) -> torch.Tensor:
+        return self.spawn_areas[self.np_random.integers(len(self.spawn_areas))]
+
+    def reset_actors_state(self):
+        self.uav_positions = torch.zeros((self.UAV_NUMBER, 2), dtype=torch.float64, device=self.device)
+        self.uav_previous_positions = torch.zeros((self.UAV_NUMBER, 2), dtype=torch.float64, device=self.device)
+        self.uav_last_shifts = torch.zeros((self.UAV_NUMBER, 2), dtype=torch.float64, device=self.device)
+        self.gu_positions = torch.zeros((0, 2), dtype=torch.float64, device=self.device)
+        self.gu_previous_positions = torch.zeros((0, 2), dtype=torch.float64, device=self.device)
+        self.gu_covered_flags = torch.zeros(0, dtype=torch.bool, device=self.device)
+        self.gu_channels_state = torch.zeros((0, self.UAV_NUMBER), dtype=torch.int64, device=self.device)
+
+    def contains_action(self, actions) -> bool:
+        actions = torch.as_tensor(actions)
+        return actions.shape == (self.UAV_NUMBER, 2) and bool(torch.all(torch.abs(actions) <= self.MAX_SPEED_UAV))
+
+    def move_UAV(self, actions):
+        actions = torch.as_tensor(actions, dtype=torch.float64, device=self.device).reshape(self.UAV_NUMBER, 2)
+        self.uav_previous_positions = self.uav_positions
+        self.uav_positions = self.uav_positions + actions
+        self.uav_last_shifts = actions.clone()
+
+    def move_GU(self):
+        area = self.choose_spawn_area()
+        previous_positions = self.gu_positions
+        self.gu_positions = self.gu_mobility.move(self.torch_random, previous_positions, area)
+        self.gu_previous_positions = previous_positions
+
+    def check_if_disappear_GU(self):
+        # each GU disappears with disappear_gu_prob: draw how many do, then which ones
+        disappearing = self.np_random.binomial(self.gu_number, self.disappear_gu_prob)
+        if disappearing == 0:
+            return
+        remaining = torch.ones(self.gu_number, dtype=torch.bool, device=self.device)
+        remaining[self.torch_random.choice(self.gu_number, size=disappearing, replace=False)] = False
+        self.gu_positions = self.gu_positions[remaining]
+        self.gu_previous_positions = self.gu_previous_positions[remaining]
+        self.gu_covered_flags = self.gu_covered_flags[remaining]
+        self.gu_channels_state = self.gu_channels_state[remaining]
+        self.gu_mobility.remove(remaining)
+        self.gu_number = len(self.gu_positions)
+
+    def check_if_spawn_new_GU(self):
+        spawning = self.np_random.binomial(self.SPAWN_GU_ATTEMPTS, self.SPAWN_GU_PROB)
+        if spawning > 0:
+            area = self.choose_spawn_area()
+            self.add_GU(self.torch_random.uniform(area[:, 0], area[:, 1], size=(spawning, 2)), area)
+        self.update_disappear_gu_prob()
+
+    def add_GU(self, positions: Union[np.ndarray, torch.Tensor], area: Union[np.ndarray, torch.Tensor]):
+        # init_gu and init_gu_clustered sample the starting GUs with np_random
+        gu_positions = torch.as_tensor(positions, dtype=torch.float64, device=self.device)
+        self.gu_positions = torch.cat((self.gu_positions, gu_positions))
+        self.gu_previous_positions = torch.cat((self.gu_previous_positions, gu_positions))
+        self.gu_covered_flags = torch.cat((self.gu_covered_flags,
+                                           torch.zeros(len(positions), dtype=torch.bool, device=self.device)))
+        self.gu_channels_state = torch.cat((self.gu_channels_state, self.initialize_channel(gu_positions)))
+        self.gu_mobility.add(self.torch_random, gu_positions,
+                             torch.as_tensor(area, dtype=torch.float64, device=self.device))
+        self.gu_number = len(self.gu_positions)
+
+    def get_observation(self) -> torch.Tensor:
+        if self.padded_observation:
+            return self.get_padded_observation()
+        self.observation_space = Box(low=self.low_observation,
+                                     high=self.high_observation,
+                                     shape=((self.UAV_NUMBER * 2) + self.gu_covered, 2),
+                                     dtype=np.float32)
+        observation = torch.empty(((self.UAV_NUMBER * 2) + self.gu_covered, 2), dtype=torch.float32,
+                                  device=self.device)
+        observation[0:self.UAV_NUMBER * 2:2] = normalize_positions(self.uav_positions)
+        observation[1:self.UAV_NUMBER * 2:2] = normalize_actions(self.uav_last_shifts)
+        observation[self.UAV_NUMBER * 2:] = normalize_positions(self.gu_positions[self.gu_covered_flags])
+        return observation
+
+    def get_padded_observation(self) -> torch.Tensor:
+        if self.gu_covered > self.max_gu:
+            raise ValueError(f"{self.gu_covered} covered GUs do not fit in the max_gu={self.max_gu} observation rows")
+        self.observation_index = 1 - self.observation_index
+        observation = self.observation_buffers[self.observation_index]
+        observation_mask = self.observation_masks[self.observation_index]
+        observation.fill_(0.0)
+        observation_mask.fill_(False)
+        observation[0:self.UAV_NUMBER * 2:2] = normalize_positions(self.uav_positions)
+        observation[1:self.UAV_NUMBER * 2:2] = normalize_actions(self.uav_last_shifts)
+        observation_mask[:self.UAV_NUMBER * 2] = True
+        covered_rows = slice(self.max_uav * 2, self.max_uav * 2 + self.gu_covered)
+        observation[covered_rows] = normalize_positions(self.gu_positions[self.gu_covered_flags])
+        observation_mask[covered_rows] = True
+        return observation
+
+    def check_if_terminated(self):
+        area = self.np_random.choice(self.track.spawn_area)
+        in_area = positions_in_area(self.uav_positions, area)
+        differences = self.uav_positions[:, None, :] - self.uav_positions[None, :, :]
+        squared_distances = torch.sum(differences * differences, dim=2)
+        squared_distances.fill_diagonal_(float("inf"))
+        collision = torch.any(squared_distances <= self.COLLISION_DISTANCE ** 2, dim=1)
+        return (~in_area | collision).tolist()
+
+    def init_uav(self) -> None:
+        area = self.np_random.choice(self.track.spawn_area)
+        self.uav_positions = self.from_numpy(sample_separated_positions(
+            self.np_random, area, self.UAV_NUMBER, self.MINIMUM_STARTING_DISTANCE_BETWEEN_UAV))
+        self.uav_previous_positions = self.uav_positions.clone()
+
+    def image_convert_positions(self, positions: torch.Tensor) -> List[Tuple[int, int]]:
+        return super().image_convert_positions(positions.cpu().numpy())
@@ -0,0 +1,111 @@
+""" This module contains the vectorized minimum distance checks and placement of many actors. """
+import numpy as np
+
+DENSE_PAIRS_LIMIT = 256  # above this number of positions the close pairs are searched on a grid
+PLACEMENT_BLOCK_LIMIT = 1024  # largest block of candidate positions drawn at once
+PLACEMENT_MAX_CANDIDATES = 1_000_000  # candidates drawn before the placement is considered infeasible
+
+
+def positions_in_area(positions: np.ndarray, area: np.ndarray) -> np.ndarray:
+    """ Row-wise version of Point.is_in_area for an (n, 2) array of positions. """
+    return ((positions[:, 0] > area[0, 0]) & (positions[:, 0] < area[0, 1])
+            & (positions[:, 1] > area[1, 0]) & (positions[:, 1] < area[1, 1]))
+
+
+def find_close_positions(positions: np.ndarray, distance: float) -> np.ndarray:
+    """ Return for each row of the (n, 2) positions whether another row is within distance. """
+    if len(positions) <= DENSE_PAIRS_LIMIT:
+        return _find_close_positions_dense(positions, distance)
+    return _find_close_positions_grid(positions, distance)
+
+
+def _find_close_positions_dense(positions: np.ndarray, distance: float) -> np.ndarray:
+    x_differences = positions[:, np.newaxis, 0] - positions[np.newaxis, :, 0]
+    y_differences = positions[:, np.newaxis, 1] - positions[np.newaxis, :, 1]
+    squared_distances = x_differences * x_differences
+    squared_distances += y_differences * y_differences
+    np.fill_diagonal(squared_distances, np.inf)
+    return np.any(squared_distances <= distance * distance, axis=1)
+
+
+def _find_close_positions_grid(positions: np.ndarray, distance: float) -> np.ndarray:
+    """ Compare each position with the positions in its 3x3 block of distance sized cells, O(n log n). """
+    number = len(positions)
+    close = np.zeros(number, dtype=bool)
+    if number < 2:
+        return close
+    # cells start from 1 so that the keys of the neighbour cells are never negative
+    cells = np.floor((positions - positions.min(axis=0)) / distance).astype(np.int64) + 1
+    width = int(cells[:, 1].max()) + 2
+    keys = cells[:, 0] * width + cells[:, 1]
+    order = np.argsort(keys, kind="stable")
+    sorted_keys = keys[order]
+    for shift in (-width - 1, -width, -width + 1, -1, 0, 1, width - 1, width, width + 1):
+        neighbour_keys = keys + shift
+        first = np.searchsorted(sorted_keys, neighbour_keys, side="left")
+        counts = np.searchsorted(sorted_keys, neighbour_keys, side="right") - first
+        total = int(counts.sum())
+        if total == 0:
+            continue
+        owners = np.repeat(np.arange(number), counts)
+        # position of each candidate pair inside the run of its neighbour cell
+        offsets = np.arange(total) - np.repeat(np.cumsum(counts) - counts, counts)
+        others = order[np.repeat(first, counts) + offsets]
+        hits = (owners != others) & (np.linalg.norm(positions[owners] - positions[others], axis=1) <= distance)
+        close[owners[hits]] = True
+    return close
+
+
+def sample_separated_positions(np_random: np.random.Generator, area: np.ndarray, number: int,
+                               minimum_distance: float) -> np.ndarray:
+    """
+    Draw number uniform positions in area, each farther than minimum_distance from all the others.
+
+    Dart throwing Poisson-disk sampling: blocks of uniform candidates are checked against the accepted
+    positions through a background grid with at most one position per cell, then accepted in order.
+    Each position is uniform over the part of area not yet excluded, as when the candidates are drawn
+    one at a time, and ValueError is raised if the positions do not fit after PLACEMENT_MAX_CANDIDATES.
+    """
+    positions = np.empty((number, 2), dtype=np.float64)
+    if number == 0:
+        return positions
+    cell_size = minimum_distance / np.sqrt(2)
+    grid_shape = np.ceil((area[:, 1] - area[:, 0]) / cell_size).astype(np.int64)
+    # index of the position in each cell, the grid is padded by 2 cells for the 5x5 neighbourhoods
+    grid = np.full(grid_shape + 4, -1, dtype=np.int64)
+    neighbourhood = np.stack(np.meshgrid(np.arange(-2, 3), np.arange(-2, 3), indexing="ij"), axis=-1).reshape(-1, 2)
+    squared_minimum_distance = minimum_distance * minimum_distance
+    accepted = 0
+    drawn = 0
+    while accepted < number:
+        if drawn >= PLACEMENT_MAX_CANDIDATES:
+            raise ValueError(f"{number} positions farther than {minimum_distance} apart do not fit in the area")
+        remaining = number - accepted
+        # the block is sized on the fraction of candidates accepted so far, with a margin
+        acceptance_rate = max(accepted / drawn, 1.0 / PLACEMENT_BLOCK_LIMIT) if drawn > 0 else 1.0
+        block = int(min(PLACEMENT_BLOCK_LIMIT, np.ceil(remaining / acceptance_rate * 1.25) + 4))
+        candidates = np_random.uniform(area[:, 0], area[:, 1], size=(block, 2))
+        drawn += block
+        candidate_cells = np.minimum(((candidates - area[:, 0]) / cell_size).astype(np.int64), grid_shape - 1) + 2
+        neighbours = grid[tuple((candidate_cells[:, np.newaxis, :] + neighbourhood).transpose(2, 0, 1))]
+        differences = positions[np.maximum(neighbours, 0)] - candidates[:, np.newaxis, :]
+        neighbour_squared_distances = np.einsum("ijk,ijk->ij", differences, differences)
+        free = ~np.any((neighbours >= 0) & (neighbour_squared_distances <= squared_minimum_distance), axis=1)
+        # the candidates after the first ones needed are discarded, as if they were never drawn
+        free_indices = np.flatnonzero(free)[:remaining * 2 + 4]
+        candidates = candidates[free_indices]
+        candidate_cells = candidate_cells[free_indices]
+        # candidates of the same block are accepted in order, each one excludes the following ones
+        differences = candidates[:, np.newaxis, :] - candidates[np.newaxis, :, :]
+        conflicts = np.einsum("ijk,ijk->ij", differences, differences) <= squared_minimum_distance
+        available = np.ones(len(candidates), dtype=bool)
+        for k in range(len(candidates)):
+            if not available[k]:
+                continue
+            positions[accepted] = candidates[k]
+            grid[tuple(candidate_cells[k])] = accepted
+            accepted += 1
+            if accepted == number:
+                break
+            available &= ~conflicts[k]
+    return positions
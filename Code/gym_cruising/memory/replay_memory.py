@@ -1,20 +1,135 @@
-from collections import namedtuple, deque
-import random
+from collections import namedtuple
+from typing import Optional, Sequence, Tuple
+
+import numpy as np
+import torch
 
 Transition = namedtuple('Transition', ('states', 'actions', 'next_states', 'rewards', 'terminated'))
 
+# batch of states: uav_info (B, uav_slots, 4) position and last shift of each UAV slot,
+# gu_positions (B, L, 2) connected GU positions padded with zeros to the longest of the batch,
+# gu_lengths (B,) number of connected GUs of each state and gu_padding_mask (B, L) True on the
+# padding rows, the key padding mask of the attention over the GUs
+StateBatch = namedtuple('StateBatch', ('uav_info', 'gu_positions', 'gu_lengths', 'gu_padding_mask'))
+
+
+def collate_states(parts: Sequence[Tuple["ReplayMemory", np.ndarray]], next_states: bool, device=None) -> StateBatch:
+    arrays = [(memory.state_arrays(next_states), indices) for memory, indices in parts]
+    uav_info = np.concatenate([uav_info[indices] for (uav_info, _, _), indices in arrays])
+    gu_lengths = np.concatenate([gu_lengths[indices] for (_, _, gu_lengths), indices in arrays])
+    width = max(int(gu_lengths.max(initial=0)), 1)
+    gu_positions = np.zeros((len(gu_lengths), width, 2), dtype=np.float32)
+    start = 0
+    for (_, memory_gu_positions, _), indices in arrays:
+        rows = memory_gu_positions[indices, :width]
+        gu_positions[start:start + len(indices), :rows.shape[1]] = rows
+        start += len(indices)
+    gu_padding_mask = np.arange(width) >= gu_lengths[:, np.newaxis]
+    # the first row is a key even without connected GUs, a query with every key masked has no attention weights
+    gu_padding_mask[:, 0] = False
+    return StateBatch(*(torch.from_numpy(array).to(device)
+                        for array in (uav_info, gu_positions, gu_lengths, gu_padding_mask)))
+
+
+def collate(parts: Sequence[Tuple["ReplayMemory", np.ndarray]], device=None) -> Transition:
+    """
+    Gather the transitions at the indices of each (memory, indices) of parts into one Transition of
+    batched tensors on device, in the order of parts, see ReplayMemory for the shapes.
+    """
+    def gather(name: str) -> torch.Tensor:
+        return torch.from_numpy(np.concatenate([getattr(memory, name)[indices] for memory, indices in parts])) \
+            .to(device)
+
+    return Transition(collate_states(parts, False, device), gather("actions"), collate_states(parts, True, device),
+                      gather("rewards"), gather("terminated"))
+
 
 class ReplayMemory(object):
+    """
+    Ring buffer of transitions stored in preallocated float32 arrays, one row per transition.
+    A state is an observation of the environment with uav_slots * 2 UAV rows, where uav_slots is
+    the number of actions of the first transition pushed, followed by the connected GU rows.
+    The GU positions are stored padded to the widest state pushed so far, with their number,
+    and the GU axis grows when a wider state is pushed.
 
-    def __init__(self, capacity):
-        self.memory = deque([], maxlen=capacity)
+    sample_batch returns a Transition of batched tensors: StateBatch states and next_states,
+    actions (B, uav_slots, 2), rewards (B, uav_slots) and terminated (B,). The batches of
+    several memories are drawn with sample_indices and gathered together by collate. The indices
+    are drawn by a np.random.Generator seeded with seed.
+    The former sample, which returned a list of Transitions, is gone, so a caller of the list
+    fails with an AttributeError instead of iterating over the fields of a batch.
+    """
+
+    GU_WIDTH_MARGIN = 8  # minimum growth of the GU axis
+
+    def __init__(self, capacity, seed: Optional[int] = None):
+        self.capacity = capacity
+        self.rng = np.random.default_rng(seed)
+        self.position = 0  # row of the next push
+        self.size = 0
+        self.uav_slots = 0
+        self.actions = None
+
+    def allocate(self, uav_slots: int) -> None:
+        self.uav_slots = uav_slots
+        self.uav_info = np.zeros((self.capacity, uav_slots, 4), dtype=np.float32)
+        self.next_uav_info = np.zeros((self.capacity, uav_slots, 4), dtype=np.float32)
+        self.gu_positions = np.zeros((self.capacity, 0, 2), dtype=np.float32)
+        self.next_gu_positions = np.zeros((self.capacity, 0, 2), dtype=np.float32)
+        self.gu_lengths = np.zeros(self.capacity, dtype=np.int64)
+        self.next_gu_lengths = np.zeros(self.capacity, dtype=np.int64)
+        self.actions = np.zeros((self.capacity, uav_slots, 2), dtype=np.float32)
+        self.rewards = np.zeros((self.capacity, uav_slots), dtype=np.float32)
+        self.terminated = np.zeros(self.capacity, dtype=np.float32)
+
+    def ensure_gu_width(self, gu_number: int) -> None:
+        """ Grow the padded GU axis so that a state can hold gu_number GUs. """
+        width = self.gu_positions.shape[1]
+        if gu_number <= width:
+            return
+        # the widest states are reached in the first episodes, a tight axis saves memory over the whole run
+        extra = max(gu_number - width, self.GU_WIDTH_MARGIN)
+        self.gu_positions = np.pad(self.gu_positions, ((0, 0), (0, extra), (0, 0)))
+        self.next_gu_positions = np.pad(self.next_gu_positions, ((0, 0), (0, extra), (0, 0)))
+
+    def write_state(self, row: int, state: np.ndarray, uav_info: np.ndarray, gu_positions: np.ndarray,
+                    gu_lengths: np.ndarray) -> None:
+        uav_rows = self.uav_slots * 2
+        gu_number = len(state) - uav_rows
+        uav_info[row] = state[:uav_rows].reshape(self.uav_slots, 4)
+        gu_positions[row, :gu_number] = state[uav_rows:]
+        gu_positions[row, gu_number:] = 0.0
+        gu_lengths[row] = gu_number
 
     def push(self, *args):
         """ Save a transition """
-        self.memory.append(Transition(*args))
+        states, actions, next_states, rewards, terminated = Transition(*args)
+        if self.actions is None:
+            self.allocate(len(actions))
+        self.ensure_gu_width(max(len(states), len(next_states)) - self.uav_slots * 2)
+        row = self.position
+        self.write_state(row, np.asarray(states), self.uav_info, self.gu_positions, self.gu_lengths)
+        self.write_state(row, np.asarray(next_states), self.next_uav_info, self.next_gu_positions,
+                         self.next_gu_lengths)
+        self.actions[row] = actions
+        self.rewards[row] = rewards
+        self.terminated[row] = terminated
+        self.position = (row + 1) % self.capacity
+        self.size = min(self.size + 1, self.capacity)
+
+    def state_arrays(self, next_states: bool) -> Tuple[np.ndarray, np.ndarray, np.ndarray]:
+        """ UAV info, padded GU positions and GU numbers of the states or of the next states. """
+        if next_states:
+            return self.next_uav_info, self.next_gu_positions, self.next_gu_lengths
+        return self.uav_info, self.gu_positions, self.gu_lengths
+
+    def sample_indices(self, batch_size) -> np.ndarray:
+        """ Indices of batch_size distinct transitions drawn uniformly. """
+        return self.rng.choice(self.size, size=batch_size, replace=False)
 
-    def sample(self, batch_size):
-        return random.sample(self.memory, batch_size)
+    def sample_batch(self, batch_size, device=None) -> Transition:
+        """ Return batch_size distinct transitions drawn uniformly as batched tensors on device. """
+        return collate([(self, self.sample_indices(batch_size))], device)
 
     def __len__(self):
-        return len(self.memory)
+        return self.size
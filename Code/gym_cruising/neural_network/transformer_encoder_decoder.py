@@ -18,9 +18,10 @@ class TransformerEncoderDecoder(nn.Module):
 
         self.transformer_enocder_decoder = nn.Transformer(d_model=embed_dim, batch_first=True, num_encoder_layers=2, num_decoder_layers=2)
 
-    def forward(self, GU_positions, UAV_info):
+    def forward(self, GU_positions, UAV_info, GU_padding_mask=None):
         # GU_positions shape: batch * (n, 2), n = current max connected GU
         # UAV_info shape: batch * (m, 4), m = UAV number
+        # GU_padding_mask shape: batch * n, True on the padding rows of GU_positions, that are not attended
 
         # Embedding delle sequenze di input
         source = self.embedding_encoder(GU_positions)  # shape: batch * (n, embed_dim)
@@ -31,7 +32,9 @@ class TransformerEncoderDecoder(nn.Module):
         target = self.layernorm_decoder(target)
 
         # RAPPRESENTAZIONE DELLO STATO PER OGNI UAV
-        tokens = self.transformer_enocder_decoder(source, target)  # shape: batch * (m, embed_dim)
+        # shape: batch * (m, embed_dim)
+        tokens = self.transformer_enocder_decoder(source, target, src_key_padding_mask=GU_padding_mask,
+                                                  memory_key_padding_mask=GU_padding_mask)
 
         # Normalizzazione dell'output
         tokens = self.layernorm_output(tokens)
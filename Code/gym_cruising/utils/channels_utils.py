@@ -1,8 +1,13 @@
+from typing import Callable, Tuple
+
 import numpy as np
 
 from gym_cruising.geometry.point import Point
 import math
 
+# The array functions take the array namespace xp of their inputs, numpy or torch, and evaluate the
+# same operations in the same order on both, so the NumPy and torch environments draw the same channels
+
 UAV_ALTITUDE = 500
 a = 12.08  # in the dense urban case
 b = 0.11  # in the dense urban case
@@ -12,6 +17,7 @@ RATE_OF_GROWTH = -0.05
 TRASMISSION_POWER = 23  # 30 dBm
 CHANNEL_BANDWIDTH = 2e6  # 2 MHz
 POWER_SPECTRAL_DENSITY_OF_NOISE = -174  # -174 dBm/Hz
+FRIIS_CONSTANT = 38.4684  # [dB] Friis equation with carrier frequency fc = 2GHz
 
 
 # calculate distance between one UAV and one GU in air line
@@ -21,14 +27,39 @@ def calculate_distance_uav_gu(uav: Point, gu: Point):
                      UAV_ALTITUDE ** 2)
 
 
-# calculate the Probability of LoS link between one UAV and one GU
-def get_PLoS(distance_uav_gu: float):
-    elevation_angle = math.degrees(math.asin(UAV_ALTITUDE / distance_uav_gu))
-    return 1 / (1 + a * math.exp((-1) * b * (elevation_angle - a)))
+# calculate distances in air line between every GU and every UAV, shape (..., GU number, UAV number)
+def calculate_distances_uav_gu(uav_positions: np.ndarray, gu_positions: np.ndarray, xp=np) -> np.ndarray:
+    return xp.sqrt(calculate_squared_distances_uav_gu(uav_positions, gu_positions))
+
+
+# calculate squared distances in air line between every GU and every UAV, shape (..., GU number, UAV number)
+def calculate_squared_distances_uav_gu(uav_positions: np.ndarray, gu_positions: np.ndarray) -> np.ndarray:
+    # one coordinate at a time, in place, avoids the (..., GU number, UAV number, 2) temporary
+    squared_distances = gu_positions[..., :, np.newaxis, 0] - uav_positions[..., np.newaxis, :, 0]
+    squared_distances *= squared_distances
+    y_difference = gu_positions[..., :, np.newaxis, 1] - uav_positions[..., np.newaxis, :, 1]
+    y_difference *= y_difference
+    squared_distances += y_difference
+    squared_distances += UAV_ALTITUDE ** 2
+    return squared_distances
+
+
+# calculate the Probability of LoS link between one UAV and one GU, element-wise on arrays
+def get_PLoS(distance_uav_gu, xp=np):
+    elevation_angle = xp.rad2deg(xp.arcsin(UAV_ALTITUDE / distance_uav_gu))
+    return 1 / (1 + a * xp.exp((-1) * b * (elevation_angle - a)))
+
+
+# calculate the LoS -> NLoS (g1) and NLoS -> LoS (g2) probabilities, element-wise on arrays
+def get_transition_probabilities(relative_shift, PLoS, xp=np):
+    growth = 1 + xp.exp(RATE_OF_GROWTH * relative_shift)
+    PLoS2NLoS = 2 * ((1 - PLoS) / growth - (1 - PLoS) / 2)  # g1
+    PNLoS2LoS = 2 * (PLoS / growth - PLoS / 2)  # g2
+    return PLoS2NLoS, PNLoS2LoS
+
 
 def get_transition_matrix(relative_shift: float, PLoS: float):
-    PLoS2NLoS = 2 * ((1 - PLoS) / (1 + math.exp(RATE_OF_GROWTH * relative_shift)) - (1 - PLoS) / 2)  # g1
-    PNLoS2LoS = 2 * (PLoS / (1 + math.exp(RATE_OF_GROWTH * relative_shift)) - PLoS / 2)  # g2
+    PLoS2NLoS, PNLoS2LoS = get_transition_probabilities(relative_shift, PLoS)
     return np.array([
         [1 - PLoS2NLoS, PLoS2NLoS],
         [PNLoS2LoS, 1 - PNLoS2LoS]
@@ -37,46 +68,133 @@ def get_transition_matrix(relative_shift: float, PLoS: float):
 
 # calculate the Free Space PathLoss of the link between one UAV and one GU in dB
 # 38.4684 is according to Friis equation with carrier frequency fc = 2GHz
-def get_free_space_PathLoss(distance_uav_gu: float):
-    return 20 * math.log(distance_uav_gu, 10) + 38.4684
+def get_free_space_PathLoss(distance_uav_gu, xp=np):
+    return 20 * xp.log10(distance_uav_gu) + FRIIS_CONSTANT
+
+
+# calculate PathLoss of the link between one UAV and one GU in dB, element-wise on arrays
+def get_PathLoss(distance_uav_gu, current_state, xp=np):
+    return get_PathLoss_from_free_space(get_free_space_PathLoss(distance_uav_gu, xp), current_state, xp)
+
+
+# add to the Free Space PathLoss in dB the excess PathLoss of the LoS (0) or NLoS (1) state, the state is
+# cast first since torch would round a Python float times an integer tensor to float32
+def get_PathLoss_from_free_space(free_space_path_loss, current_state, xp=np):
+    return free_space_path_loss + (nLos + (nNLos - nLos) * xp.asarray(current_state,
+                                                                     dtype=free_space_path_loss.dtype))
+
+
+# calculate the length of the shift of every actor from its previous position, shape (..., actors number)
+def calculate_shifts(positions, previous_positions, xp=np):
+    differences = positions - previous_positions
+    return xp.sqrt(xp.sum(differences * differences, axis=-1))
+
 
+# calculate the relative shift of every link, GU shift plus UAV shift, shape (..., GU number, UAV number)
+def calculate_relative_shifts(uav_positions, uav_previous_positions, gu_positions, gu_previous_positions, xp=np):
+    uav_shifts = calculate_shifts(uav_positions, uav_previous_positions, xp)
+    gu_shifts = calculate_shifts(gu_positions, gu_previous_positions, xp)
+    return gu_shifts[..., :, np.newaxis] + uav_shifts[..., np.newaxis, :]
 
-# calculate PathLoss of the link between one UAV and one GU in dB
-def get_PathLoss(distance_uav_gu: float, current_state: int):
-    FSPL = get_free_space_PathLoss(distance_uav_gu)
-    if current_state == 0:
-        return FSPL + nLos
-    return FSPL + nNLos
 
-# def getSINR(path_loss: float, interference_path_loss: []):
-#     return W2dB((dBm2Watt(TRASMISSION_POWER) * getChannelGain(path_loss)) / (
-#                 getInterference(interference_path_loss) + dBm2Watt(
-#             POWER_SPECTRAL_DENSITY_OF_NOISE) * CHANNEL_BANDWIDTH))
+# draw the initial LoS (0) or NLoS (1) state of every link from uniform samples in [0, 1)
+def get_initial_channels_state(uav_positions, gu_positions, random_uniform: Callable, xp=np):
+    initial_channels_PLoS = get_PLoS(calculate_distances_uav_gu(uav_positions, gu_positions, xp), xp)
+    samples = random_uniform(tuple(initial_channels_PLoS.shape))
+    return xp.where(samples > initial_channels_PLoS, 1, 0)
 
 
-def getSINR(path_loss: float, interference_path_loss: []):
-    return W2dB((dBm2Watt(TRASMISSION_POWER) * getChannelGain(path_loss)) / (dBm2Watt(
-            POWER_SPECTRAL_DENSITY_OF_NOISE) * CHANNEL_BANDWIDTH))
+# draw the next LoS (0) or NLoS (1) state of every link from uniform samples in [0, 1)
+def get_next_channels_state(channels_state, PLoS2NLoS, PNLoS2LoS, samples, xp=np):
+    # probability of a LoS channel at this step given the current state of each link
+    LoS_probability = xp.where(channels_state == 0, 1 - PLoS2NLoS, PNLoS2LoS)
+    return xp.where(samples >= LoS_probability, 1, 0)
 
 
-def getChannelGain(path_loss: float) -> float:
+# advance the LoS/NLoS Markov chain of every link by one step and return the distances in air line, the next
+# channels state and the PathLoss in dB of the links, shape (..., GU number, UAV number): random_uniform(shape)
+# draws the uniform samples in [0, 1)
+def step_channels(uav_positions, uav_previous_positions, gu_positions, gu_previous_positions, channels_state,
+                  random_uniform: Callable, xp=np) -> Tuple:
+    distances = calculate_distances_uav_gu(uav_positions, gu_positions, xp)
+    channels_PLoS = get_PLoS(distances, xp)
+    free_space_path_loss = get_free_space_PathLoss(distances, xp)
+    relative_shifts = calculate_relative_shifts(uav_positions, uav_previous_positions, gu_positions,
+                                                gu_previous_positions, xp)
+    PLoS2NLoS, PNLoS2LoS = get_transition_probabilities(relative_shifts, channels_PLoS, xp)
+    samples = random_uniform(tuple(distances.shape))
+    channels_state = get_next_channels_state(channels_state, PLoS2NLoS, PNLoS2LoS, samples, xp)
+    return distances, channels_state, get_PathLoss_from_free_space(free_space_path_loss, channels_state, xp)
+
+
+# calculate SINR in dB of the links, element-wise on arrays of path loss
+def getSINR(path_loss, interference_path_loss=(), xp=np):
+    return W2dB((TRASMISSION_POWER_WATT * getChannelGain(path_loss)) / NOISE_POWER_WATT, xp)
+
+
+# calculate SINR in dB of the links with co-channel interference, path_loss has shape (..., UAV number):
+# the interference of a link is the power received from all the UAVs minus the power of the link itself
+def getSINR_with_interference(path_loss, xp=np):
+    received_power = TRASMISSION_POWER_WATT * getChannelGain(path_loss)
+    total_received_power = xp.sum(received_power, axis=-1, keepdims=True)
+    interference = xp.clip(total_received_power - received_power, 0.0, None)
+    return W2dB(received_power / (interference + NOISE_POWER_WATT), xp)
+
+
+# calculate SINR in dB of the links with the sinr_model "noise" or "interference" of the environments
+def calculate_SINR(path_loss, sinr_model: str, xp=np):
+    if sinr_model == "interference":
+        return getSINR_with_interference(path_loss, xp)
+    return getSINR(path_loss, xp=xp)
+
+
+# decide the links with SINR >= threshold, shape (..., GU number, UAV number): SINR is the SINR with
+# co-channel interference, or None for the noise-only SINR, decided by the coverage distances of
+# get_coverage_distances(threshold) of the channels state without evaluating the SINR
+def get_connected_links(distances, channels_state, coverage_distances, SINR, threshold: float):
+    if SINR is not None:
+        return SINR >= threshold
+    return distances <= coverage_distances[channels_state]
+
+
+# count the UAVs covering each GU, shape (..., GU number), and the GUs covered by each UAV alone,
+# shape (..., UAV number), that are lost without that UAV
+def count_coverage(connected, xp=np):
+    gu_cover_count = xp.count_nonzero(connected, axis=-1)
+    uav_covered_alone = xp.count_nonzero(connected & (gu_cover_count == 1)[..., np.newaxis], axis=-2)
+    return gu_cover_count, uav_covered_alone
+
+
+# calculate the largest distance in air line of a LoS (index 0) and of a NLoS (index 1) link with
+# SINR >= threshold [dB], inverting the path loss in closed form: it holds for the noise-only getSINR
+def get_coverage_distances(threshold: float) -> np.ndarray:
+    noise = W2dB(dBm2Watt(POWER_SPECTRAL_DENSITY_OF_NOISE) * CHANNEL_BANDWIDTH)
+    max_path_loss = W2dB(dBm2Watt(TRASMISSION_POWER)) - noise - threshold
+    max_free_space_path_loss = max_path_loss - np.array([nLos, nNLos])
+    return np.power(10.0, (max_free_space_path_loss - FRIIS_CONSTANT) / 20)
+
+
+def getChannelGain(path_loss):
     return 1 / dB2Linear(path_loss)
 
 
-def getInterference(interference_path_loss: []) -> float:
-    interference = 0.0
-    for path_loss in interference_path_loss:
-        interference += dBm2Watt(TRASMISSION_POWER) * getChannelGain(path_loss)
-    return interference
+# calculate the interference power in Watt, summing over the last axis of the path loss of the other links
+def getInterference(interference_path_loss):
+    interference_path_loss = np.asarray(interference_path_loss, dtype=np.float64)
+    return np.sum(dBm2Watt(TRASMISSION_POWER) * getChannelGain(interference_path_loss), axis=-1)
+
+
+def dB2Linear(decibel_value):
+    return 10.0 ** (decibel_value / 10)
 
 
-def dB2Linear(decibel_value: float):
-    return 10 ** (decibel_value / 10)
+def dBm2Watt(dBm_value):
+    return np.power(10.0, np.divide(np.subtract(dBm_value, 30), 10))
 
 
-def dBm2Watt(dBm_value: float):
-    return math.pow(10, (dBm_value - 30) / 10)
+def W2dB(watt_value, xp=np):
+    return xp.log10(watt_value) * 10
 
 
-def W2dB(watt_value: float):
-    return math.log(watt_value, 10) * 10
+TRASMISSION_POWER_WATT = float(dBm2Watt(TRASMISSION_POWER))
+NOISE_POWER_WATT = float(dBm2Watt(POWER_SPECTRAL_DENSITY_OF_NOISE)) * CHANNEL_BANDWIDTH
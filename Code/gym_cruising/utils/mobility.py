@@ -0,0 +1,350 @@
+""" This module contains the GU mobility models, each one moves all the GUs with array operations """
+import math
+from abc import ABC, abstractmethod
+from typing import Callable, Dict, Optional, Tuple, Union
+
+import numpy as np
+
+from gym_cruising.geometry.spacing import positions_in_area
+
+# unit shift for the 'up', 'down', 'left' and 'right' GU random walk directions
+GU_DIRECTIONS = np.array([[0.0, 1.0], [0.0, -1.0], [-1.0, 0.0], [1.0, 0.0]])
+
+BOUNDARIES = ("resample", "reflect")  # draw again the moves that exit from the area or mirror them inside
+
+# The functions take the array namespace xp of the positions, numpy or torch, as in channels_utils.
+
+
+def flatnonzero(flags: np.ndarray, xp=np) -> np.ndarray:
+    """ Indices of the true values of the 1-D flags. """
+    return xp.argwhere(flags)[:, 0]
+
+
+def reflect_positions(positions: np.ndarray, area: np.ndarray, xp=np) -> Tuple[np.ndarray, np.ndarray]:
+    """
+    Mirror in place the (n, 2) positions out of area across its sides until they are inside, return
+    the positions and the (n, 2) flags of the coordinates whose direction of motion is reversed.
+    """
+    reversed_coordinates = xp.zeros_like(positions, dtype=bool)
+    outside = ~positions_in_area(positions, area)
+    if bool(xp.any(outside)):
+        low = area[:, 0]
+        width = area[:, 1] - area[:, 0]
+        folded = xp.remainder(positions[outside] - low, 2 * width)
+        reversed_coordinates[outside] = folded > width
+        positions[outside] = low + xp.where(reversed_coordinates[outside], 2 * width - folded, folded)
+    return positions, reversed_coordinates
+
+
+def resample_outside(area: np.ndarray, candidates: np.ndarray,
+                     draw: Callable[[np.ndarray], np.ndarray], xp=np) -> np.ndarray:
+    """ Replace the candidates out of area with draw(rows) of their rows until every candidate is inside. """
+    pending = flatnonzero(~positions_in_area(candidates, area), xp)
+    while len(pending) > 0:
+        retry = draw(pending)
+        inside = positions_in_area(retry, area)
+        candidates[pending[inside]] = retry[inside]
+        pending = pending[~inside]
+    return candidates
+
+
+def polar_shifts(speed: np.ndarray, direction: np.ndarray, xp=np) -> np.ndarray:
+    return xp.stack((speed * xp.cos(direction), speed * xp.sin(direction)), axis=1)
+
+
+def reverse_directions(direction: np.ndarray, reversed_coordinates: np.ndarray, xp=np) -> np.ndarray:
+    """ Angles after the reversal of the x and/or y component of the motion. """
+    direction = xp.where(reversed_coordinates[:, 0], np.pi - direction, direction)
+    return xp.where(reversed_coordinates[:, 1], -direction, direction)
+
+
+class MobilityModel(ABC):
+    """
+    Base class of the GU mobility models. move returns the positions of all the GUs after one step,
+    add and remove keep the state of the model aligned with the rows of the GU arrays of the
+    environment. Every random number is drawn from the np_random of the environment.
+
+    GU_ARRAYS are the per-GU arrays of the state, STATE_ARRAYS every array of the state.
+    The positions and the state are NumPy arrays, after to(torch, device) they are tensors on device
+    and np_random is a generator with the methods of np.random.Generator that draws tensors.
+    """
+    name = ""
+    GU_ARRAYS: Tuple[str, ...] = ()
+    STATE_ARRAYS: Tuple[str, ...] = ()
+    xp = np  # array namespace of the positions and of the state
+
+    def __init__(self, mean_speed: float, speed_standard_deviation: float, boundary: str = "resample") -> None:
+        if boundary not in BOUNDARIES:
+            raise ValueError(f"unknown boundary {boundary}, the boundaries are {BOUNDARIES}")
+        self.mean_speed = mean_speed
+        self.speed_standard_deviation = speed_standard_deviation
+        self.boundary = boundary
+
+    @property
+    def spec(self) -> dict:
+        """ The name and parameters of the model, make_mobility_model(spec) makes the same model. """
+        return {"model": self.name, "mean_speed": self.mean_speed,
+                "speed_standard_deviation": self.speed_standard_deviation, "boundary": self.boundary}
+
+    def to(self, xp, device) -> "MobilityModel":
+        """ Move the state to the array namespace xp on device, return the model. """
+        self.xp = xp
+        for name in self.STATE_ARRAYS:
+            setattr(self, name, xp.asarray(getattr(self, name), device=device))
+        return self
+
+    def draw_speeds(self, np_random: np.random.Generator, number: int) -> np.ndarray:
+        return self.xp.clip(np_random.normal(self.mean_speed, self.speed_standard_deviation, size=number), 0.0, None)
+
+    @abstractmethod
+    def move(self, np_random: np.random.Generator, positions: np.ndarray, area: np.ndarray) -> np.ndarray:
+        pass
+
+    def add(self, np_random: np.random.Generator, positions: np.ndarray, area: np.ndarray) -> None:
+        """ Extend the state with the GUs at positions, appended after the existing GUs. """
+
+    def remove(self, remaining: np.ndarray) -> None:
+        """ Keep the state of the GUs flagged in the boolean remaining. """
+        for name in self.GU_ARRAYS:
+            setattr(self, name, getattr(self, name)[remaining])
+
+    def get_state(self) -> Dict[str, np.ndarray]:
+        """ The state arrays, not copied: the environment copies them into its states. """
+        return {name: getattr(self, name) for name in self.STATE_ARRAYS}
+
+    def set_state(self, state: Dict[str, np.ndarray]) -> None:
+        """ Take the arrays of state, copies in the namespace of the model made by the environment. """
+        for name in self.STATE_ARRAYS:
+            setattr(self, name, state[name])
+
+
+class RandomWalk(MobilityModel):
+    """ Every step each GU moves up, down, left or right by a Gaussian distance. """
+    name = "walk"
+    unit_shifts = GU_DIRECTIONS
+
+    def to(self, xp, device) -> "MobilityModel":
+        self.unit_shifts = xp.asarray(GU_DIRECTIONS, device=device)
+        return super().to(xp, device)
+
+    def draw_shifts(self, np_random: np.random.Generator, number: int) -> np.ndarray:
+        distance = self.draw_speeds(np_random, number)
+        direction = np_random.integers(len(GU_DIRECTIONS), size=number)
+        return self.unit_shifts[direction] * distance[:, np.newaxis]
+
+    def move(self, np_random: np.random.Generator, positions: np.ndarray, area: np.ndarray) -> np.ndarray:
+        candidates = positions + self.draw_shifts(np_random, len(positions))
+        if self.boundary == "reflect":
+            return reflect_positions(candidates, area, self.xp)[0]
+        return resample_outside(area, candidates,
+                                lambda rows: positions[rows] + self.draw_shifts(np_random, len(rows)), self.xp)
+
+
+class RandomWaypoint(MobilityModel):
+    """
+    Each GU goes straight to a uniform waypoint of the area at a Gaussian speed, then pauses for up to
+    pause_steps steps and draws the next waypoint and speed. The waypoints are inside the area, so the
+    GUs never reach its sides and boundary has no effect. Speeds are at least minimum_speed, so that
+    no GU stops forever.
+    """
+    name = "waypoint"
+    GU_ARRAYS = ("waypoints", "speeds", "pauses")
+    STATE_ARRAYS = GU_ARRAYS
+
+    def __init__(self, mean_speed: float, speed_standard_deviation: float, boundary: str = "resample",
+                 pause_steps: int = 0, minimum_speed: float = 0.5) -> None:
+        super().__init__(mean_speed, speed_standard_deviation, boundary)
+        self.pause_steps = pause_steps
+        self.minimum_speed = minimum_speed
+        self.waypoints = np.zeros((0, 2), dtype=np.float64)
+        self.speeds = np.zeros(0, dtype=np.float64)
+        self.pauses = np.zeros(0, dtype=np.int64)
+
+    @property
+    def spec(self) -> dict:
+        return {**super().spec, "pause_steps": self.pause_steps, "minimum_speed": self.minimum_speed}
+
+    def draw_speeds(self, np_random: np.random.Generator, number: int) -> np.ndarray:
+        return self.xp.clip(np_random.normal(self.mean_speed, self.speed_standard_deviation, size=number),
+                            self.minimum_speed, None)
+
+    def add(self, np_random: np.random.Generator, positions: np.ndarray, area: np.ndarray) -> None:
+        xp = self.xp
+        self.waypoints = xp.concatenate((self.waypoints,
+                                         np_random.uniform(area[:, 0], area[:, 1], size=(len(positions), 2))))
+        self.speeds = xp.concatenate((self.speeds, self.draw_speeds(np_random, len(positions))))
+        self.pauses = xp.concatenate((self.pauses, xp.zeros_like(positions[:, 0], dtype=xp.int64)))
+
+    def move(self, np_random: np.random.Generator, positions: np.ndarray, area: np.ndarray) -> np.ndarray:
+        xp = self.xp
+        moving = self.pauses == 0
+        self.pauses = xp.where(moving, 0, self.pauses - 1)
+        differences = self.waypoints - positions
+        distances = xp.hypot(differences[:, 0], differences[:, 1])
+        arrived = moving & (distances <= self.speeds)
+        # fraction of the way to the waypoint covered in this step
+        fractions = xp.where(moving, xp.clip(self.speeds / xp.clip(distances, 1e-12, None), None, 1.0), 0.0)
+        new_positions = positions + differences * fractions[:, np.newaxis]
+        new_positions[arrived] = self.waypoints[arrived]
+        arrived_rows = flatnonzero(arrived, xp)
+        if len(arrived_rows) > 0:
+            self.waypoints[arrived_rows] = np_random.uniform(area[:, 0], area[:, 1], size=(len(arrived_rows), 2))
+            self.speeds[arrived_rows] = self.draw_speeds(np_random, len(arrived_rows))
+            if self.pause_steps > 0:
+                self.pauses[arrived_rows] = np_random.integers(self.pause_steps + 1, size=len(arrived_rows))
+        return new_positions
+
+
+def gauss_markov_step(np_random: np.random.Generator, speed: np.ndarray, direction: np.ndarray,
+                      mean_speed: float, mean_direction: np.ndarray, speed_standard_deviation: float,
+                      direction_standard_deviation: float, alpha: float, xp=np) -> Tuple[np.ndarray, np.ndarray]:
+    """ Next speeds and directions of the Gauss-Markov process with memory alpha in [0, 1]. """
+    noise = np_random.standard_normal(size=(2, len(speed)))
+    memory = math.sqrt(1 - alpha * alpha)
+    speed = alpha * speed + (1 - alpha) * mean_speed + memory * speed_standard_deviation * noise[0]
+    direction = alpha * direction + (1 - alpha) * mean_direction + memory * direction_standard_deviation * noise[1]
+    return xp.clip(speed, 0.0, None), direction
+
+
+class GaussMarkov(MobilityModel):
+    """
+    The speed and direction of each GU follow a Gauss-Markov process: with memory alpha they keep
+    their previous value and move towards the mean speed and a mean direction drawn for each GU.
+    Directions are angles in radians, reflect reverses the direction of the GUs mirrored at a side,
+    with resample a GU whose move would exit from the area turns to a new uniform mean direction.
+    """
+    name = "gauss_markov"
+    GU_ARRAYS = ("speeds", "directions", "mean_directions")
+    STATE_ARRAYS = GU_ARRAYS
+
+    def __init__(self, mean_speed: float, speed_standard_deviation: float, boundary: str = "resample",
+                 alpha: float = 0.75, direction_standard_deviation: float = np.pi / 4) -> None:
+        super().__init__(mean_speed, speed_standard_deviation, boundary)
+        self.alpha = alpha
+        self.direction_standard_deviation = direction_standard_deviation
+        self.speeds = np.zeros(0, dtype=np.float64)
+        self.directions = np.zeros(0, dtype=np.float64)
+        self.mean_directions = np.zeros(0, dtype=np.float64)
+
+    @property
+    def spec(self) -> dict:
+        return {**super().spec, "alpha": self.alpha, "direction_standard_deviation": self.direction_standard_deviation}
+
+    def add(self, np_random: np.random.Generator, positions: np.ndarray, area: np.ndarray) -> None:
+        xp = self.xp
+        mean_directions = np_random.uniform(-np.pi, np.pi, size=len(positions))
+        self.speeds = xp.concatenate((self.speeds, self.draw_speeds(np_random, len(positions))))
+        self.directions = xp.concatenate((self.directions, mean_directions))
+        self.mean_directions = xp.concatenate((self.mean_directions, mean_directions))
+
+    def move(self, np_random: np.random.Generator, positions: np.ndarray, area: np.ndarray) -> np.ndarray:
+        xp = self.xp
+        speeds, directions = gauss_markov_step(
+            np_random, self.speeds, self.directions, self.mean_speed, self.mean_directions,
+            self.speed_standard_deviation, self.direction_standard_deviation, self.alpha, xp)
+        candidates = positions + polar_shifts(speeds, directions, xp)
+        if self.boundary == "reflect":
+            candidates, reversed_coordinates = reflect_positions(candidates, area, xp)
+            directions = reverse_directions(directions, reversed_coordinates, xp)
+            self.mean_directions = reverse_directions(self.mean_directions, reversed_coordinates, xp)
+        else:
+            def turn(rows: np.ndarray) -> np.ndarray:
+                self.mean_directions[rows] = np_random.uniform(-np.pi, np.pi, size=len(rows))
+                directions[rows] = self.mean_directions[rows]
+                return positions[rows] + polar_shifts(speeds[rows], directions[rows], xp)
+
+            candidates = resample_outside(area, candidates, turn, xp)
+        self.speeds = speeds
+        self.directions = directions
+        return candidates
+
+
+class GroupDrift(MobilityModel):
+    """
+    Reference point group mobility: the GUs follow the reference point of their group, which moves
+    with the Gauss-Markov process of GaussMarkov and is always reflected at the sides of the area,
+    plus a Gaussian displacement of standard deviation member_standard_deviation for each GU.
+    The reference points are the positions of groups random GUs of the first GUs added, and each GU
+    joins the group of the closest reference point. With resample, a GU whose move would exit from
+    the area draws again its own displacement without the one of its group.
+    """
+    name = "group"
+    GU_ARRAYS = ("groups_of_gu",)
+    STATE_ARRAYS = ("groups_of_gu", "references", "speeds", "directions", "mean_directions")
+
+    def __init__(self, mean_speed: float, speed_standard_deviation: float, boundary: str = "resample",
+                 groups: int = 4, alpha: float = 0.75, direction_standard_deviation: float = np.pi / 4,
+                 member_standard_deviation: float = 1.0) -> None:
+        super().__init__(mean_speed, speed_standard_deviation, boundary)
+        self.groups = groups
+        self.alpha = alpha
+        self.direction_standard_deviation = direction_standard_deviation
+        self.member_standard_deviation = member_standard_deviation
+        self.groups_of_gu = np.zeros(0, dtype=np.int64)
+        self.references = np.zeros((0, 2), dtype=np.float64)
+        self.speeds = np.zeros(0, dtype=np.float64)
+        self.directions = np.zeros(0, dtype=np.float64)
+        self.mean_directions = np.zeros(0, dtype=np.float64)
+
+    @property
+    def spec(self) -> dict:
+        return {**super().spec, "groups": self.groups, "alpha": self.alpha,
+                "direction_standard_deviation": self.direction_standard_deviation,
+                "member_standard_deviation": self.member_standard_deviation}
+
+    def add(self, np_random: np.random.Generator, positions: np.ndarray, area: np.ndarray) -> None:
+        xp = self.xp
+        if len(self.references) == 0 and len(positions) > 0:
+            number = min(self.groups, len(positions))
+            # the advanced indexing copies the positions
+            self.references = positions[np_random.choice(len(positions), size=number, replace=False)]
+            self.speeds = self.draw_speeds(np_random, number)
+            self.mean_directions = np_random.uniform(-np.pi, np.pi, size=number)
+            # the same draws, move replaces both arrays without updating them in place
+            self.directions = self.mean_directions
+        if len(self.references) == 0:
+            return
+        x_differences = positions[:, np.newaxis, 0] - self.references[np.newaxis, :, 0]
+        y_differences = positions[:, np.newaxis, 1] - self.references[np.newaxis, :, 1]
+        squared_distances = x_differences * x_differences
+        squared_distances += y_differences * y_differences
+        self.groups_of_gu = xp.concatenate((self.groups_of_gu, xp.argmin(squared_distances, axis=1)))
+
+    def draw_displacements(self, np_random: np.random.Generator, number: int) -> np.ndarray:
+        return np_random.normal(0.0, self.member_standard_deviation, size=(number, 2))
+
+    def move(self, np_random: np.random.Generator, positions: np.ndarray, area: np.ndarray) -> np.ndarray:
+        xp = self.xp
+        if len(self.references) == 0:
+            return positions[:]  # no GU was ever added, positions is empty
+        self.speeds, self.directions = gauss_markov_step(
+            np_random, self.speeds, self.directions, self.mean_speed, self.mean_directions,
+            self.speed_standard_deviation, self.direction_standard_deviation, self.alpha, xp)
+        references, reversed_coordinates = reflect_positions(
+            self.references + polar_shifts(self.speeds, self.directions, xp), area, xp)
+        self.directions = reverse_directions(self.directions, reversed_coordinates, xp)
+        self.mean_directions = reverse_directions(self.mean_directions, reversed_coordinates, xp)
+        group_shifts = references - self.references
+        self.references = references
+        candidates = positions + group_shifts[self.groups_of_gu] + self.draw_displacements(np_random, len(positions))
+        if self.boundary == "reflect":
+            return reflect_positions(candidates, area, xp)[0]
+        return resample_outside(area, candidates,
+                                lambda rows: positions[rows] + self.draw_displacements(np_random, len(rows)), xp)
+
+
+MOBILITY_MODELS = {model.name: model for model in (RandomWalk, RandomWaypoint, GaussMarkov, GroupDrift)}
+
+
+def make_mobility_model(spec: Optional[Union[str, dict]], **defaults) -> MobilityModel:
+    """
+    Make the model of spec, a name of MOBILITY_MODELS or {"model": name, **parameters}, the random walk
+    if spec is None. The parameters missing from spec are taken from defaults.
+    """
+    if spec is None:
+        spec = RandomWalk.name
+    parameters = {"model": spec} if isinstance(spec, str) else dict(spec)
+    name = parameters.pop("model", RandomWalk.name)
+    if name not in MOBILITY_MODELS:
+        raise ValueError(f"unknown GU mobility model {name}, the models are {tuple(MOBILITY_MODELS)}")
+    return MOBILITY_MODELS[name](**{**defaults, **parameters})
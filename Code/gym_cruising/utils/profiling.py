@@ -0,0 +1,48 @@
+""" This module contains the per-phase wall time profiler of the environments """
+import time
+from typing import Dict, Iterable
+
+
+class PhaseProfiler:
+    """
+    Accumulates wall time and call count of the instrumented methods of an object.
+    instrument replaces each method with a timed wrapper stored on the instance, so an
+    object that is never instrumented runs its methods with no overhead at all.
+    Nested phases are timed on their own and also inside the phase that calls them.
+    """
+
+    def __init__(self) -> None:
+        self.total_time: Dict[str, float] = {}
+        self.calls: Dict[str, int] = {}
+
+    def instrument(self, obj, phases: Iterable[str]) -> None:
+        for phase in phases:
+            setattr(obj, phase, self.timed(phase, getattr(obj, phase)))
+
+    def timed(self, phase: str, method):
+        self.total_time[phase] = 0.0
+        self.calls[phase] = 0
+        total_time = self.total_time
+        calls = self.calls
+
+        def timed_method(*args, **kwargs):
+            start = time.perf_counter()
+            try:
+                return method(*args, **kwargs)
+            finally:
+                total_time[phase] += time.perf_counter() - start
+                calls[phase] += 1
+
+        return timed_method
+
+    def reset(self) -> None:
+        for phase in self.total_time:
+            self.total_time[phase] = 0.0
+            self.calls[phase] = 0
+
+    def get_profile(self) -> Dict[str, dict]:
+        """ Return {phase: {"calls", "total_s", "mean_ms"}} of the phases called at least once. """
+        return {phase: {"calls": self.calls[phase],
+                        "total_s": self.total_time[phase],
+                        "mean_ms": self.total_time[phase] / self.calls[phase] * 1e3}
+                for phase in self.total_time if self.calls[phase] > 0}
@@ -0,0 +1,178 @@
+""" This module contains the bank of precomputed initial states of the Cruising environment """
+import hashlib
+import json
+import os
+from typing import Dict, List, Sequence, Tuple
+
+import numpy as np
+
+# one row per scenario, the offsets address the rows of the per-actor arrays of the bank
+SCENARIO_DTYPE = np.dtype([
+    ("seed", np.int64),
+    ("options", np.int64),  # index of the options dict in metadata.json
+    ("uav_offset", np.int64),
+    ("uav_count", np.int64),
+    ("gu_offset", np.int64),
+    ("gu_count", np.int64),
+    ("channels_offset", np.int64),
+    ("starting_gu_number", np.int64),
+    ("gu_covered", np.int64),
+    ("disappear_gu_prob", np.float64),
+    # PCG64 state of np_random after the reset, the 128 bit state and increment as high and low words
+    ("rng_state", np.uint64, (4,)),
+    ("rng_has_uint32", np.int64),
+    ("rng_uinteger", np.uint64),
+])
+
+# per-actor arrays of the bank, the channels state of each scenario is flattened (gu_count * uav_count,)
+BANK_ARRAYS = {
+    "uav_positions": np.float64,  # (uav rows, 2)
+    "gu_positions": np.float64,  # (gu rows, 2)
+    "gu_covered_flags": bool,  # (gu rows,)
+    "gu_channels_state": np.uint8,  # (channels rows,)
+}
+
+WORD_MASK = (1 << 64) - 1
+
+# version of the files of the bank, a bank with another version is rejected by ScenarioBank
+BANK_FORMAT_VERSION = 1
+
+
+def split_words(value: int) -> Tuple[int, int]:
+    return value >> 64, value & WORD_MASK
+
+
+def read_scenarios(file_name: str) -> List[Tuple[dict, int]]:
+    """ Read a JSON list of {"options": {...}, "seeds": [...]} as the (options, seed) of each scenario. """
+    with open(file_name, encoding="utf-8") as scenarios_file:
+        return [(entry["options"], seed) for entry in json.load(scenarios_file) for seed in entry["seeds"]]
+
+
+def hash_scenarios(track_id: int, scenarios: Sequence[Tuple[dict, int]]) -> str:
+    """ SHA-256 of the track and of the options and seed of each scenario, in order. """
+    content = json.dumps({"track_id": track_id, "scenarios": [[options, seed] for options, seed in scenarios]},
+                         sort_keys=True)
+    return hashlib.sha256(content.encode("utf-8")).hexdigest()
+
+
+def is_scenario_bank_current(directory: str, track_id: int, scenarios: Sequence[Tuple[dict, int]]) -> bool:
+    """ Return whether directory has a bank of this format built from scenarios on track_id. """
+    try:
+        with open(os.path.join(directory, "metadata.json"), encoding="utf-8") as metadata_file:
+            metadata = json.load(metadata_file)
+    except FileNotFoundError:
+        return False
+    return (metadata.get("format_version") == BANK_FORMAT_VERSION
+            and metadata.get("scenarios_hash") == hash_scenarios(track_id, scenarios))
+
+
+def build_scenario_bank(env, directory: str, scenarios: Sequence[Tuple[dict, int]]) -> "ScenarioBank":
+    """
+    Reset env, an unwrapped CruiseUAV, with each (options, seed) of scenarios and write the states
+    after the resets into directory, scenario k of the bank is the k-th of scenarios.
+    """
+    options_list: List[dict] = []
+    index = np.zeros(len(scenarios), dtype=SCENARIO_DTYPE)
+    arrays: Dict[str, list] = {name: [] for name in BANK_ARRAYS}
+    rows = {"uav": 0, "gu": 0, "channels": 0}
+    for k, (options, seed) in enumerate(scenarios):
+        env.reset(seed=seed, options=options)
+        state = env.get_state()
+        rng_state = state["np_random_state"]
+        if rng_state["bit_generator"] != "PCG64":
+            raise ValueError(f"the {rng_state['bit_generator']} state of np_random cannot be stored in the bank")
+        if state["gu_mobility_state"]:
+            raise ValueError(f"the state of the {state['mobility']['model']} GU mobility model "
+                             f"cannot be stored in the bank")
+        if options not in options_list:
+            options_list.append(options)
+        uav_count = len(state["uav_positions"])
+        gu_count = len(state["gu_positions"])
+        index[k] = (seed, options_list.index(options), rows["uav"], uav_count, rows["gu"], gu_count,
+                    rows["channels"], state["starting_gu_number"], state["gu_covered"],
+                    state["disappear_gu_prob"],
+                    split_words(rng_state["state"]["state"]) + split_words(rng_state["state"]["inc"]),
+                    rng_state["has_uint32"], rng_state["uinteger"])
+        for name in BANK_ARRAYS:
+            arrays[name].append(state[name].reshape(-1, 2) if name.endswith("positions") else state[name].ravel())
+        rows["uav"] += uav_count
+        rows["gu"] += gu_count
+        rows["channels"] += gu_count * uav_count
+    os.makedirs(directory, exist_ok=True)
+    for name, dtype in BANK_ARRAYS.items():
+        np.save(os.path.join(directory, f"{name}.npy"), np.concatenate(arrays[name]).astype(dtype, copy=False))
+    np.save(os.path.join(directory, "scenarios.npy"), index)
+    with open(os.path.join(directory, "metadata.json"), "w", encoding="utf-8") as metadata_file:
+        json.dump({"format_version": BANK_FORMAT_VERSION, "track_id": env.track.value,
+                   "scenarios_hash": hash_scenarios(env.track.value, scenarios), "options": options_list},
+                  metadata_file)
+    return ScenarioBank(directory)
+
+
+class ScenarioBank:
+    """
+    This class reads a bank written by build_scenario_bank. The arrays are memory-mapped, so
+    get_state reads the rows of one scenario without loading the bank, and the initial states
+    are the same on every machine that reads the bank, whatever the machine that built it.
+    """
+
+    def __init__(self, directory: str) -> None:
+        self.directory = directory
+        with open(os.path.join(self.directory, "metadata.json"), encoding="utf-8") as metadata_file:
+            self.metadata = json.load(metadata_file)
+        if self.metadata.get("format_version") != BANK_FORMAT_VERSION:
+            raise ValueError(f"the bank in {directory} has format {self.metadata.get('format_version')}, "
+                             f"not {BANK_FORMAT_VERSION}: build it again with build_scenario_bank")
+        self.scenarios = np.load(os.path.join(self.directory, "scenarios.npy"))
+        # plain ndarray views of the memory maps, slicing them is cheaper than slicing np.memmap objects
+        self.arrays = {name: np.asarray(np.load(os.path.join(self.directory, f"{name}.npy"), mmap_mode="r"))
+                       for name in BANK_ARRAYS}
+
+    @property
+    def track_id(self) -> int:
+        return self.metadata["track_id"]
+
+    def __len__(self) -> int:
+        return len(self.scenarios)
+
+    def get_options(self, scenario_id: int) -> dict:
+        return dict(self.metadata["options"][self.scenarios[scenario_id]["options"]])
+
+    def get_state(self, scenario_id: int) -> dict:
+        """ Return the state of scenario_id in the format of CruiseUAV.get_state, arrays are read-only views. """
+        scenario = self.scenarios[scenario_id]
+        uav_rows = slice(scenario["uav_offset"], scenario["uav_offset"] + scenario["uav_count"])
+        gu_rows = slice(scenario["gu_offset"], scenario["gu_offset"] + scenario["gu_count"])
+        channels_rows = slice(scenario["channels_offset"],
+                              scenario["channels_offset"] + scenario["gu_count"] * scenario["uav_count"])
+        uav_positions = self.arrays["uav_positions"][uav_rows]
+        gu_positions = self.arrays["gu_positions"][gu_rows]
+        state_high, state_low, inc_high, inc_low = (int(word) for word in scenario["rng_state"])
+        options = self.get_options(scenario_id)
+        return {
+            "track_id": self.track_id,
+            "uav_number": int(scenario["uav_count"]),
+            "starting_gu_number": int(scenario["starting_gu_number"]),
+            "gu_number": int(scenario["gu_count"]),
+            "gu_covered": int(scenario["gu_covered"]),
+            "disappear_gu_prob": float(scenario["disappear_gu_prob"]),
+            "last_RCR": None,
+            # right after a reset the previous positions are the positions and no UAV has moved yet
+            "uav_positions": uav_positions,
+            "uav_previous_positions": uav_positions,
+            "uav_last_shifts": np.zeros((int(scenario["uav_count"]), 2), dtype=np.float64),
+            "gu_positions": gu_positions,
+            "gu_previous_positions": gu_positions,
+            "gu_covered_flags": self.arrays["gu_covered_flags"][gu_rows],
+            "gu_channels_state": self.arrays["gu_channels_state"][channels_rows].reshape(
+                int(scenario["gu_count"]), int(scenario["uav_count"])),
+            # only the models without state are stored, see build_scenario_bank
+            "mobility": options.get("mobility"),
+            "gu_mobility_state": {},
+            "np_random_state": {
+                "bit_generator": "PCG64",
+                "state": {"state": (state_high << 64) | state_low, "inc": (inc_high << 64) | inc_low},
+                "has_uint32": int(scenario["rng_has_uint32"]),
+                "uinteger": int(scenario["rng_uinteger"]),
+            },
+        }
@@ -0,0 +1,165 @@
+""" This module contains the episode trajectory recorder of the Cruising environment and its reader """
+import json
+import os
+from typing import Dict, List
+
+import gymnasium as gym
+import numpy as np
+
+# one row per recorded step, the offsets address the rows of the per-actor arrays of the shard
+INDEX_DTYPE = np.dtype([
+    ("episode", np.int64),
+    ("step", np.int64),
+    ("shard", np.int64),
+    ("uav_offset", np.int64),
+    ("uav_count", np.int64),
+    ("gu_offset", np.int64),
+    ("gu_count", np.int64),
+    ("terminated", bool),
+    ("truncated", bool),
+])
+
+# arrays of every shard, rows of the UAV arrays and of the GU arrays are addressed by the index
+SHARD_ARRAYS = {
+    "uav_positions": np.float32,  # (uav rows, 2)
+    "rewards": np.float32,  # (uav rows,)
+    "gu_positions": np.float32,  # (gu rows, 2)
+    "gu_covered": bool,  # (gu rows,)
+}
+
+
+def shard_path(directory: str, shard: int, name: str) -> str:
+    return os.path.join(directory, f"shard_{shard:05d}", f"{name}.npy")
+
+
+class TrajectoryRecorder(gym.Wrapper):
+    """
+    This wrapper records UAV positions, GU positions, GU covered flags and UAV rewards of every
+    reset and step of a Cruising environment into directory. Steps are buffered in memory and
+    written every shard_steps steps as one shard of .npy files with its own index.npy of the steps
+    of the shard, and metadata.json holds the track. A flush writes only the new shard, and the
+    index of a shard is written last, so that TrajectoryReader can read a recording while it is
+    still growing. The reset of an episode is recorded as step 0 with zero rewards.
+    """
+
+    def __init__(self, env: gym.Env, directory: str, shard_steps: int = 1000) -> None:
+        super().__init__(env)
+        self.directory = directory
+        self.shard_steps = shard_steps
+        os.makedirs(self.directory, exist_ok=True)
+        with open(os.path.join(self.directory, "metadata.json"), "w", encoding="utf-8") as metadata_file:
+            json.dump({"track_id": self.env.unwrapped.track.value, "shard_arrays": list(SHARD_ARRAYS)},
+                      metadata_file)
+        self.index: List[tuple] = []  # index rows of the buffered steps
+        self.shard = 0
+        self.buffers: Dict[str, list] = {name: [] for name in SHARD_ARRAYS}
+        self.uav_rows = 0
+        self.gu_rows = 0
+        self.episode = -1
+        self.steps = 0
+
+    def reset(self, **kwargs):
+        observation, info = self.env.reset(**kwargs)
+        self.episode += 1
+        self.steps = 0
+        self.record(np.zeros(len(self.env.unwrapped.uav_positions)), False, False)
+        return observation, info
+
+    def step(self, action):
+        observation, reward, terminated, truncated, info = self.env.step(action)
+        self.steps += 1
+        self.record(np.asarray(reward), terminated, truncated)
+        return observation, reward, terminated, truncated, info
+
+    def record(self, reward: np.ndarray, terminated: bool, truncated: bool) -> None:
+        env = self.env.unwrapped
+        uav_count = len(env.uav_positions)
+        gu_count = len(env.gu_positions)
+        self.index.append((self.episode, self.steps, self.shard, self.uav_rows, uav_count,
+                           self.gu_rows, gu_count, terminated, truncated))
+        self.buffers["uav_positions"].append(env.uav_positions.astype(np.float32))
+        self.buffers["rewards"].append(reward.astype(np.float32))
+        self.buffers["gu_positions"].append(env.gu_positions.astype(np.float32))
+        self.buffers["gu_covered"].append(env.gu_covered_flags.copy())
+        self.uav_rows += uav_count
+        self.gu_rows += gu_count
+        if len(self.index) >= self.shard_steps:
+            self.flush()
+
+    def flush(self) -> None:
+        """ Write the buffered steps as a new shard, its index last. """
+        if not self.index:
+            return
+        index_path = shard_path(self.directory, self.shard, "index")
+        os.makedirs(os.path.dirname(index_path), exist_ok=True)
+        for name, dtype in SHARD_ARRAYS.items():
+            np.save(shard_path(self.directory, self.shard, name),
+                    np.concatenate(self.buffers[name]).astype(dtype, copy=False))
+            self.buffers[name] = []
+        # a reader never sees a partial index: it is written to a temporary file and renamed
+        with open(index_path + ".tmp", "wb") as index_file:
+            np.save(index_file, np.array(self.index, dtype=INDEX_DTYPE))
+        os.replace(index_path + ".tmp", index_path)
+        self.index = []
+        self.shard += 1
+        self.uav_rows = 0
+        self.gu_rows = 0
+
+    def close(self) -> None:
+        self.flush()
+        super().close()
+
+
+class TrajectoryReader:
+    """
+    This class reads a recording of TrajectoryRecorder. The index is the concatenation of the
+    indexes of the shards written when the reader is made. Shards are memory-mapped when first
+    accessed, so any step can be read without loading the whole recording.
+    """
+
+    def __init__(self, directory: str) -> None:
+        self.directory = directory
+        with open(os.path.join(self.directory, "metadata.json"), encoding="utf-8") as metadata_file:
+            self.metadata = json.load(metadata_file)
+        shard_indexes = []
+        while os.path.exists(shard_path(self.directory, len(shard_indexes), "index")):
+            shard_indexes.append(np.load(shard_path(self.directory, len(shard_indexes), "index")))
+        self.index = np.concatenate(shard_indexes) if shard_indexes else np.zeros(0, dtype=INDEX_DTYPE)
+        self.shards: Dict[int, Dict[str, np.ndarray]] = {}
+
+    @property
+    def track_id(self) -> int:
+        return self.metadata["track_id"]
+
+    def __len__(self) -> int:
+        return len(self.index)
+
+    def episodes(self) -> np.ndarray:
+        return np.unique(self.index["episode"])
+
+    def episode_rows(self, episode: int) -> np.ndarray:
+        """ Return the rows of the index of the steps of episode, in step order. """
+        return np.flatnonzero(self.index["episode"] == episode)
+
+    def get_shard(self, shard: int) -> Dict[str, np.ndarray]:
+        if shard not in self.shards:
+            self.shards[shard] = {name: np.load(shard_path(self.directory, shard, name), mmap_mode="r")
+                                  for name in SHARD_ARRAYS}
+        return self.shards[shard]
+
+    def __getitem__(self, row: int) -> dict:
+        """ Return the recorded arrays of the step at row of the index, as read-only views. """
+        entry = self.index[row]
+        shard = self.get_shard(int(entry["shard"]))
+        uav_rows = slice(int(entry["uav_offset"]), int(entry["uav_offset"] + entry["uav_count"]))
+        gu_rows = slice(int(entry["gu_offset"]), int(entry["gu_offset"] + entry["gu_count"]))
+        return {
+            "episode": int(entry["episode"]),
+            "step": int(entry["step"]),
+            "terminated": bool(entry["terminated"]),
+            "truncated": bool(entry["truncated"]),
+            "uav_positions": shard["uav_positions"][uav_rows],
+            "rewards": shard["rewards"][uav_rows],
+            "gu_positions": shard["gu_positions"][gu_rows],
+            "gu_covered": shard["gu_covered"][gu_rows],
+        }
@@ -0,0 +1,61 @@
+""" Throughput of the channel model evaluated link by link on scalars and on whole arrays. """
+import os
+import sys
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import argparse
+import time
+
+import numpy as np
+
+from gym_cruising.geometry.point import Point
+from gym_cruising.utils import channels_utils
+
+UAV_NUMBER = 10
+AREA_SIDE = 4000.0
+
+
+def scalar_links(uav_positions: np.ndarray, gu_positions: np.ndarray, channels_state: np.ndarray) -> None:
+    uav_points = [Point(x_coordinate, y_coordinate) for x_coordinate, y_coordinate in uav_positions]
+    for i, (x_coordinate, y_coordinate) in enumerate(gu_positions):
+        gu_point = Point(x_coordinate, y_coordinate)
+        for j, uav_point in enumerate(uav_points):
+            distance = channels_utils.calculate_distance_uav_gu(uav_point, gu_point)
+            channels_utils.get_PLoS(distance)
+            path_loss = channels_utils.get_PathLoss(distance, channels_state[i, j])
+            channels_utils.getSINR(path_loss, [])
+
+
+def array_links(uav_positions: np.ndarray, gu_positions: np.ndarray, channels_state: np.ndarray) -> None:
+    distances = channels_utils.calculate_distances_uav_gu(uav_positions, gu_positions)
+    channels_utils.get_PLoS(distances)
+    path_loss = channels_utils.get_PathLoss(distances, channels_state)
+    channels_utils.getSINR(path_loss)
+
+
+def throughput(function, links: int, rng: np.random.Generator) -> float:
+    """ Return links per second of function on a random scenario with UAV_NUMBER UAVs. """
+    gu_number = max(links // UAV_NUMBER, 1)
+    uav_positions = rng.uniform(0.0, AREA_SIDE, size=(UAV_NUMBER, 2))
+    gu_positions = rng.uniform(0.0, AREA_SIDE, size=(gu_number, 2))
+    channels_state = rng.integers(0, 2, size=(gu_number, UAV_NUMBER))
+    start = time.perf_counter()
+    function(uav_positions, gu_positions, channels_state)
+    return gu_number * UAV_NUMBER / (time.perf_counter() - start)
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument('--links', type=int, nargs='+', default=[10 ** 3, 10 ** 4, 10 ** 5, 10 ** 6])
+    parser.add_argument('--max-scalar-links', type=int, default=10 ** 5,
+                        help='the scalar loop is timed on at most this many links')
+    parser.add_argument('--seed', type=int, default=42)
+    args = parser.parse_args()
+
+    rng = np.random.default_rng(args.seed)
+    for links in args.links:
+        scalar = throughput(scalar_links, min(links, args.max_scalar_links), rng)
+        array = throughput(array_links, links, rng)
+        print(f"links: {links:>8}  scalar: {scalar:12.0f} links/s  array: {array:12.0f} links/s  "
+              f"speedup: {array / scalar:7.1f}x")
@@ -0,0 +1,53 @@
+""" Import and gym.make time of the Cruising environment in fresh processes, as paid by every worker. """
+import os
+import subprocess
+import sys
+
+import argparse
+import json
+
+import numpy as np
+
+CODE_PATH = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+WORKER = """
+import json
+import sys
+import time
+
+start = time.perf_counter()
+import gymnasium as gym
+gymnasium_loaded = time.perf_counter()
+import gym_cruising.envs.cruise_uav
+imported = time.perf_counter()
+env = gym.make('gym_cruising:Cruising-v0', track_id=2)
+made = time.perf_counter()
+print(json.dumps({"gymnasium_ms": (gymnasium_loaded - start) * 1e3,
+                  "import_ms": (imported - gymnasium_loaded) * 1e3,
+                  "make_ms": (made - imported) * 1e3,
+                  "pygame_imported": "pygame" in sys.modules}))
+"""
+
+
+def measure(processes: int) -> dict:
+    """ Return the median of every time over processes fresh interpreters. """
+    environment = dict(os.environ, PYTHONPATH=CODE_PATH + os.pathsep + os.environ.get("PYTHONPATH", ""))
+    samples = []
+    for _ in range(processes):
+        output = subprocess.run([sys.executable, "-c", WORKER], capture_output=True, text=True, check=True,
+                                env=environment).stdout
+        samples.append(json.loads(output.strip().splitlines()[-1]))
+    result = {key: float(np.median([sample[key] for sample in samples]))
+              for key in ("gymnasium_ms", "import_ms", "make_ms")}
+    result["pygame_imported"] = any(sample["pygame_imported"] for sample in samples)
+    return result
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument('--processes', type=int, default=10)
+    args = parser.parse_args()
+
+    times = measure(args.processes)
+    print(f"gymnasium import: {times['gymnasium_ms']:7.1f} ms  gym_cruising import: {times['import_ms']:7.1f} ms  "
+          f"gym.make: {times['make_ms']:7.1f} ms  pygame imported: {times['pygame_imported']}")
@@ -0,0 +1,39 @@
+""" Throughput of one step of each GU mobility model and boundary, for a large number of GUs. """
+import os
+import sys
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import argparse
+import time
+
+import numpy as np
+
+from gym_cruising.enums.track import Track
+from gym_cruising.envs.cruise_uav import CruiseUAV
+from gym_cruising.utils.mobility import BOUNDARIES, MOBILITY_MODELS, make_mobility_model
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument('--gu', type=int, default=100_000)
+    parser.add_argument('--steps', type=int, default=50)
+    parser.add_argument('--track-id', type=int, default=2)
+    parser.add_argument('--mean-speed', type=float, default=CruiseUAV.GU_MEAN_SPEED)
+    args = parser.parse_args()
+
+    area = np.array(Track(args.track_id).spawn_area[0], dtype=np.float64)
+    print(f"{args.gu} GUs, mean speed {args.mean_speed} m/s")
+    print(f"{'model':>13} {'boundary':>9} {'ms/step':>9} {'M GU moves/s':>13}")
+    for name in MOBILITY_MODELS:
+        for boundary in BOUNDARIES:
+            rng = np.random.default_rng(0)
+            model = make_mobility_model({"model": name, "boundary": boundary}, mean_speed=args.mean_speed,
+                                        speed_standard_deviation=CruiseUAV.GU_STANDARD_DEVIATION)
+            positions = rng.uniform(area[:, 0], area[:, 1], size=(args.gu, 2))
+            model.add(rng, positions, area)
+            positions = model.move(rng, positions, area)  # warm up
+            start = time.perf_counter()
+            for _ in range(args.steps):
+                positions = model.move(rng, positions, area)
+            step_time = (time.perf_counter() - start) / args.steps
+            print(f"{name:>13} {boundary:>9} {step_time * 1e3:>9.2f} {args.gu / step_time / 1e6:>13.1f}")
@@ -0,0 +1,141 @@
+"""
+Memory, push and sample times of the array-backed ReplayMemory against the previous deque of Transitions
+with the collation of script/main.py, on synthetic transitions shaped like the padded observations of main.py.
+The batches of the two memories are checked to be the same for the same transitions.
+"""
+import os
+import sys
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import argparse
+import random
+import time
+import tracemalloc
+from collections import deque
+
+import numpy as np
+import torch
+import torch.nn.functional as F
+
+from gym_cruising.memory.replay_memory import ReplayMemory, Transition, collate
+
+UAV_SLOTS = 3
+
+
+class DequeReplayMemory(object):
+    """ The previous replay memory, a deque of Transitions sampled with random.sample. """
+
+    def __init__(self, capacity):
+        self.memory = deque([], maxlen=capacity)
+
+    def push(self, *args):
+        self.memory.append(Transition(*args))
+
+    def sample(self, batch_size):
+        return random.sample(self.memory, batch_size)
+
+    def __len__(self):
+        return len(self.memory)
+
+
+def collate_deque(transitions: list) -> tuple:
+    """ Collation of optimize_model in script/main.py before the array-backed memory. """
+    batch = Transition(*zip(*transitions))
+    actions = tuple([torch.tensor(array, dtype=torch.float32) for array in sublist] for sublist in batch.actions)
+    rewards = torch.tensor(batch.rewards, dtype=torch.float32).unsqueeze(1)
+    terminated = torch.tensor(batch.terminated, dtype=torch.float32).unsqueeze(1)
+
+    def collate_states(states: tuple) -> tuple:
+        uav_info = tuple(np.split(array, [UAV_SLOTS * 2], axis=0)[0] for array in states)
+        uav_info = torch.stack(tuple(torch.from_numpy(array.reshape(UAV_SLOTS, 4)).float() for array in uav_info))
+        gu_positions = tuple(torch.from_numpy(np.split(array, [UAV_SLOTS * 2], axis=0)[1]).float()
+                             for array in states)
+        max_len = max(tensor.shape[0] for tensor in gu_positions)
+        gu_positions = torch.stack([F.pad(tensor, (0, 0, 0, max_len - tensor.shape[0]), "constant", 0)
+                                    for tensor in gu_positions])
+        return uav_info, gu_positions
+
+    return collate_states(batch.states), actions, collate_states(batch.next_states), rewards, terminated
+
+
+def make_transition(rng: np.random.Generator, max_gu: int) -> tuple:
+    states = rng.uniform(-1.0, 1.0, size=(UAV_SLOTS * 2 + rng.integers(max_gu + 1), 2))
+    next_states = rng.uniform(-1.0, 1.0, size=(UAV_SLOTS * 2 + rng.integers(max_gu + 1), 2))
+    actions = [rng.uniform(-55.6, 55.6, size=2) for _ in range(UAV_SLOTS - 1)] + [[100., 100.]]
+    rewards = list(rng.uniform(-200.0, 100.0, size=UAV_SLOTS - 1)) + [0.]
+    return states, actions, next_states, rewards, int(rng.random() < 0.01)
+
+
+def copy_transition(transition: tuple) -> tuple:
+    """ A new copy of the arrays of the transition, as the observations of consecutive steps. """
+    return tuple(np.array(item) if isinstance(item, np.ndarray) else item for item in transition)
+
+
+def fill(memory, transitions: list) -> float:
+    """ Push the copies of transitions and return the push time. """
+    start = time.perf_counter()
+    for transition in transitions:
+        memory.push(*copy_transition(transition))
+    return time.perf_counter() - start
+
+
+def traced_fill(memory, transitions: list) -> int:
+    """ Push the copies of transitions and return the bytes still allocated by the memory. """
+    tracemalloc.start()
+    for transition in transitions:
+        memory.push(*copy_transition(transition))
+    size = tracemalloc.get_traced_memory()[0]
+    tracemalloc.stop()
+    return size
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--transitions', type=int, default=50_000)
+    parser.add_argument('--max-gu', type=int, default=80, help='largest number of connected GUs of a state')
+    parser.add_argument('--batch-size', type=int, default=256)
+    parser.add_argument('--samples', type=int, default=200)
+    args = parser.parse_args()
+
+    rng = np.random.default_rng(0)
+    halves = [[make_transition(rng, args.max_gu) for _ in range(args.transitions)] for _ in range(2)]
+
+    deque_bytes = sum(traced_fill(DequeReplayMemory(args.transitions), half) for half in halves)
+    array_bytes = sum(traced_fill(ReplayMemory(args.transitions), half) for half in halves)
+    deque_memories = [DequeReplayMemory(args.transitions), DequeReplayMemory(args.transitions)]
+    deque_push = sum(fill(memory, half) for memory, half in zip(deque_memories, halves))
+    array_memories = [ReplayMemory(args.transitions), ReplayMemory(args.transitions)]
+    array_push = sum(fill(memory, half) for memory, half in zip(array_memories, halves))
+
+    # same transitions in both memories
+    for _ in range(10):
+        indices = [sorted(random.sample(range(args.transitions), args.batch_size // 2)) for _ in range(2)]
+        deque_batch = collate_deque([deque_memories[half].memory[i] for half in range(2) for i in indices[half]])
+        array_batch = collate([(array_memories[half], np.array(indices[half])) for half in range(2)])
+        assert torch.equal(deque_batch[0][0], array_batch.states.uav_info)
+        assert torch.equal(deque_batch[0][1], array_batch.states.gu_positions)
+        assert torch.equal(deque_batch[2][0], array_batch.next_states.uav_info)
+        assert torch.equal(deque_batch[2][1], array_batch.next_states.gu_positions)
+        assert torch.equal(torch.stack([torch.stack(actions) for actions in deque_batch[1]]), array_batch.actions)
+        assert torch.equal(deque_batch[3], array_batch.rewards.unsqueeze(1))
+        assert torch.equal(deque_batch[4], array_batch.terminated.unsqueeze(1))
+        for states in (array_batch.states, array_batch.next_states):
+            assert torch.equal(states.gu_padding_mask,
+                               torch.arange(states.gu_positions.shape[1]) >= states.gu_lengths.clamp(min=1)[:, None])
+    print("the batches of the two memories are the same")
+
+    start = time.perf_counter()
+    for _ in range(args.samples):
+        collate_deque(deque_memories[0].sample(args.batch_size // 2) + deque_memories[1].sample(args.batch_size // 2))
+    deque_sample = (time.perf_counter() - start) / args.samples
+    start = time.perf_counter()
+    for _ in range(args.samples):
+        collate([(memory, memory.sample_indices(args.batch_size // 2)) for memory in array_memories])
+    array_sample = (time.perf_counter() - start) / args.samples
+
+    print(f"two memories of {args.transitions} transitions, up to {args.max_gu} connected GUs")
+    print(f"{'':>7} {'MB':>8} {'push us':>8} {'sample + collate ms':>20}")
+    for name, size, push, sample in (("deque", deque_bytes, deque_push, deque_sample),
+                                     ("arrays", array_bytes, array_push, array_sample)):
+        print(f"{name:>7} {size / 2 ** 20:>8.1f} {push / (2 * args.transitions) * 1e6:>8.2f} {sample * 1e3:>20.3f}")
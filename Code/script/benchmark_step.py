@@ -0,0 +1,112 @@
+""" Per-step time of the Cruising environment for a growing number of ground users. """
+import os
+import sys
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import argparse
+import time
+
+import gymnasium as gym
+import numpy as np
+
+from gym_cruising.envs.batched_cruise_uav import BatchedCruiseUAV
+from gym_cruising.envs.subprocess_cruise_uav import SubprocessCruiseUAV
+
+MAX_SPEED_UAV = 55.6  # m/s - about 20 Km/h x 10 steps
+
+
+def benchmark(gu_number: int, uav_number: int, steps: int, seed: int, render: bool = False,
+              profile: bool = False) -> float:
+    """ Return the time of one step of a single Cruising-v0, with render the time includes one rgb_array frame. """
+    env = gym.make('gym_cruising:Cruising-v0', track_id=2, render_mode="rgb_array" if render else None,
+                   profile=profile).unwrapped
+    options = {
+        "uav": uav_number,
+        "gu": gu_number,
+        "clustered": 0,
+        "clusters_number": 0,
+        "variance": 0
+    }
+    env.reset(seed=seed, options=options)
+    rng = np.random.default_rng(seed)
+    elapsed = 0.0
+    for _ in range(steps):
+        actions = rng.uniform(-1.0, 1.0, size=(uav_number, 2)) * MAX_SPEED_UAV * 0.1
+        start = time.perf_counter()
+        env.step(actions)
+        if render:
+            env.render()
+        elapsed += time.perf_counter() - start
+    for phase, phase_profile in env.get_profile().items():
+        print(f"    {phase:<40} {phase_profile['calls']:>6} calls  {phase_profile['mean_ms']:9.3f} ms")
+    env.close()
+    return elapsed / steps
+
+
+def benchmark_batched(batch_size: int, gu_number: int, uav_number: int, steps: int, seed: int) -> float:
+    """ Return the time of one step of a single scenario inside a BatchedCruiseUAV of batch_size scenarios. """
+    env = BatchedCruiseUAV(batch_size, track_id=2, max_episode_steps=300, max_gu=gu_number * 2)
+    options = {
+        "uav": uav_number,
+        "gu": gu_number,
+        "clustered": 0,
+        "clusters_number": 0,
+        "variance": 0
+    }
+    env.reset(seed=seed, options=options)
+    rng = np.random.default_rng(seed)
+    elapsed = 0.0
+    for _ in range(steps):
+        actions = rng.uniform(-1.0, 1.0, size=(batch_size, uav_number, 2)) * MAX_SPEED_UAV * 0.1
+        start = time.perf_counter()
+        env.step(actions)
+        elapsed += time.perf_counter() - start
+    env.close()
+    return elapsed / (steps * batch_size)
+
+
+def benchmark_subprocess(workers: int, gu_number: int, uav_number: int, steps: int, seed: int) -> float:
+    """ Return the time of one environment step collected by a SubprocessCruiseUAV of workers processes. """
+    env = SubprocessCruiseUAV(workers, max_uav=uav_number, max_gu=gu_number * 2, track_id=2, max_episode_steps=300)
+    options = {
+        "uav": uav_number,
+        "gu": gu_number,
+        "clustered": 0,
+        "clusters_number": 0,
+        "variance": 0
+    }
+    env.reset(seed=seed, options=options)
+    rng = np.random.default_rng(seed)
+    elapsed = 0.0
+    for _ in range(steps):
+        actions = rng.uniform(-1.0, 1.0, size=(workers, uav_number, 2)) * MAX_SPEED_UAV * 0.1
+        start = time.perf_counter()
+        env.step(actions)
+        elapsed += time.perf_counter() - start
+    env.close()
+    return elapsed / (steps * workers)
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument('--gu', type=int, nargs='+', default=[60, 1000, 10000])
+    parser.add_argument('--uav', type=int, default=3)
+    parser.add_argument('--steps', type=int, default=20)
+    parser.add_argument('--seed', type=int, default=42)
+    parser.add_argument('--batch', type=int, default=0,
+                        help='number of scenarios of a BatchedCruiseUAV, 0 steps a single Cruising-v0')
+    parser.add_argument('--workers', type=int, default=0,
+                        help='number of processes of a SubprocessCruiseUAV, 0 steps a single Cruising-v0')
+    parser.add_argument('--render', action='store_true', help='render an rgb_array frame after every step')
+    parser.add_argument('--profile', action='store_true', help='print the mean time of every phase of the step')
+    args = parser.parse_args()
+
+    for gu_number in args.gu:
+        if args.batch > 0:
+            step_time = benchmark_batched(args.batch, gu_number, args.uav, args.steps, args.seed)
+        elif args.workers > 0:
+            step_time = benchmark_subprocess(args.workers, gu_number, args.uav, args.steps, args.seed)
+        else:
+            step_time = benchmark(gu_number, args.uav, args.steps, args.seed, args.render, args.profile)
+        print(f"GU: {gu_number:>6}  UAV: {args.uav}  step: {step_time * 1e3:9.3f} ms  ({1.0 / step_time:8.1f} steps/s)")
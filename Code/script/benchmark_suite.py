@@ -0,0 +1,196 @@
+""" Step-throughput benchmark suite of the Cruising environment over a grid of configurations.
+
+Every configuration runs in a fresh process, so that its peak RSS is measured alone. Results are
+written as JSON, and compared with a baseline JSON of a previous run when --baseline is given:
+the exit status is 1 when the steps/s, the p50 latency or the peak RSS of a configuration are worse
+than the baseline beyond --tolerance. The default grid of 128 configurations takes about 10 minutes.
+"""
+import os
+import sys
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import argparse
+import itertools
+import json
+import multiprocessing
+import platform
+import time
+from datetime import datetime, timezone
+
+import numpy as np
+
+MAX_SPEED_UAV = 55.6  # m/s - about 20 Km/h x 10 steps
+CLUSTERS_NUMBER = 3
+CLUSTERS_VARIANCE = 100000
+# metric: True when a higher value is better
+METRICS = {"steps_per_s": True, "p50_ms": False, "p99_ms": False, "peak_rss_mb": False}
+# p99 of a few steps is too noisy to flag a regression, it is only reported
+GATED_METRICS = ("steps_per_s", "p50_ms", "peak_rss_mb")
+
+
+def configuration_key(result: dict) -> tuple:
+    return result["track"], result["uav"], result["gu"], result["distribution"]
+
+
+def run_configuration(configuration: dict, steps: int, warmup: int, max_seconds: float, seed: int) -> dict:
+    """ Step one environment of configuration, resetting it with a new seed when an episode ends. """
+    import gymnasium as gym  # pylint: disable=import-outside-toplevel
+
+    env = gym.make('gym_cruising:Cruising-v0', track_id=configuration["track"]).unwrapped
+    clustered = configuration["distribution"] == "clustered"
+    options = {
+        "uav": configuration["uav"],
+        "gu": configuration["gu"],
+        "clustered": int(clustered),
+        "clusters_number": CLUSTERS_NUMBER if clustered else 0,
+        "variance": CLUSTERS_VARIANCE if clustered else 0
+    }
+    rng = np.random.default_rng(seed)
+    reset_times = []
+    step_times = []
+    episode_seed = seed
+
+    start = time.perf_counter()
+    env.reset(seed=episode_seed, options=options)
+    reset_times.append(time.perf_counter() - start)
+    started = time.perf_counter()
+    for step in range(warmup + steps):
+        actions = rng.uniform(-1.0, 1.0, size=(configuration["uav"], 2)) * MAX_SPEED_UAV * 0.1
+        start = time.perf_counter()
+        _, _, terminated, _, _ = env.step(actions)
+        if step >= warmup:
+            step_times.append(time.perf_counter() - start)
+        if terminated:
+            episode_seed += 1
+            start = time.perf_counter()
+            env.reset(seed=episode_seed, options=options)
+            reset_times.append(time.perf_counter() - start)
+        if step >= warmup and time.perf_counter() - started > max_seconds and len(step_times) >= 5:
+            break
+    env.close()
+
+    step_times = np.array(step_times) * 1e3
+    result = dict(configuration)
+    result.update({
+        "steps": len(step_times),
+        "steps_per_s": float(1e3 / step_times.mean()),
+        "mean_ms": float(step_times.mean()),
+        "p50_ms": float(np.percentile(step_times, 50)),
+        "p99_ms": float(np.percentile(step_times, 99)),
+        "reset_ms": float(np.mean(reset_times) * 1e3),
+        "peak_rss_mb": peak_rss_mb(),
+    })
+    return result
+
+
+def peak_rss_mb():
+    try:
+        import resource  # pylint: disable=import-outside-toplevel
+    except ImportError:  # not available on Windows
+        return None
+    # ru_maxrss is in kilobytes on Linux and in bytes on macOS
+    scale = 1024 ** 2 if sys.platform == "darwin" else 1024
+    return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / scale
+
+
+def worker(connection, *args) -> None:
+    try:
+        connection.send((True, run_configuration(*args)))
+    except Exception as error:  # pylint: disable=broad-except
+        connection.send((False, repr(error)))
+    finally:
+        connection.close()
+
+
+def run_in_process(context, *args) -> dict:
+    parent_connection, child_connection = context.Pipe(duplex=False)
+    process = context.Process(target=worker, args=(child_connection,) + args)
+    process.start()
+    child_connection.close()
+    success, result = parent_connection.recv()
+    process.join()
+    if not success:
+        raise RuntimeError(f"configuration {args[0]} failed: {result}")
+    return result
+
+
+def compare(results: list, baseline: dict, tolerance: float) -> list:
+    """ Print the relative change of every metric against baseline, return the regressed configurations. """
+    baseline_results = {configuration_key(result): result for result in baseline["results"]}
+    regressions = []
+    for result in results:
+        reference = baseline_results.get(configuration_key(result))
+        if reference is None:
+            continue
+        changes = []
+        regressed = False
+        for metric, higher_is_better in METRICS.items():
+            if result.get(metric) is None or not reference.get(metric):
+                continue
+            change = result[metric] / reference[metric] - 1
+            worse = -change if higher_is_better else change
+            regressed |= metric in GATED_METRICS and worse > tolerance
+            changes.append(f"{metric} {change:+7.1%}")
+        print(f"{'REGRESSION' if regressed else 'ok':>10}  {format_configuration(result)}  " + "  ".join(changes))
+        if regressed:
+            regressions.append(configuration_key(result))
+    return regressions
+
+
+def format_configuration(result: dict) -> str:
+    return f"track {result['track']}  UAV {result['uav']:>3}  GU {result['gu']:>6}  {result['distribution']:>9}"
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--uav', type=int, nargs='+', default=[1, 3, 10, 50])
+    parser.add_argument('--gu', type=int, nargs='+', default=[30, 1000, 10000, 100000])
+    parser.add_argument('--distributions', nargs='+', choices=["uniform", "clustered"],
+                        default=["uniform", "clustered"])
+    parser.add_argument('--tracks', type=int, nargs='+', choices=[1, 2, 3, 4], default=[1, 2, 3, 4])
+    parser.add_argument('--steps', type=int, default=100, help='timed steps of every configuration')
+    parser.add_argument('--warmup', type=int, default=5, help='untimed steps before the timed ones')
+    parser.add_argument('--max-seconds', type=float, default=5.0,
+                        help='stop the timed steps of a configuration after this time (at least 5 steps)')
+    parser.add_argument('--seed', type=int, default=42)
+    parser.add_argument('--output', default='benchmark_suite.json')
+    parser.add_argument('--baseline', default=None, help='JSON of a previous run to compare with')
+    parser.add_argument('--tolerance', type=float, default=0.1,
+                        help='relative change of a metric counted as a regression')
+    args = parser.parse_args()
+
+    context = multiprocessing.get_context("spawn")
+    results = []
+    for track, uav_number, gu_number, distribution in itertools.product(args.tracks, args.uav, args.gu,
+                                                                         args.distributions):
+        configuration = {"track": track, "uav": uav_number, "gu": gu_number, "distribution": distribution}
+        result = run_in_process(context, configuration, args.steps, args.warmup, args.max_seconds, args.seed)
+        results.append(result)
+        peak_rss = "n/a" if result["peak_rss_mb"] is None else f"{result['peak_rss_mb']:8.1f} MB"
+        print(f"{format_configuration(result)}  {result['steps_per_s']:9.1f} steps/s  "
+              f"p50 {result['p50_ms']:9.3f} ms  p99 {result['p99_ms']:9.3f} ms  peak RSS {peak_rss}")
+
+    report = {
+        "metadata": {
+            "date": datetime.now(timezone.utc).isoformat(timespec="seconds"),
+            "python": platform.python_version(),
+            "numpy": np.__version__,
+            "platform": platform.platform(),
+            "processor": platform.processor(),
+            "steps": args.steps,
+            "warmup": args.warmup,
+            "seed": args.seed,
+        },
+        "results": results,
+    }
+    with open(args.output, "w", encoding="utf-8") as output_file:
+        json.dump(report, output_file, indent=2)
+    print(f"results written to {args.output}")
+
+    if args.baseline is not None:
+        with open(args.baseline, encoding="utf-8") as baseline_file:
+            regressed = compare(results, json.load(baseline_file), args.tolerance)
+        if regressed:
+            print(f"{len(regressed)} configurations regressed beyond {args.tolerance:.0%}")
+            sys.exit(1)
@@ -0,0 +1,111 @@
+"""
+Check that the torch backend of the Cruising environment is reproducible from the seed and shares the
+states of the NumPy one, then time the actor loop of script/main.py on both: the NumPy env with np.split,
+torch.from_numpy and .cpu().numpy() per UAV against the torch env, whose observations and actions stay tensors.
+"""
+import os
+import sys
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import argparse
+import time
+
+import gymnasium as gym
+import numpy as np
+import torch
+
+from gym_cruising.neural_network.MLP_policy_net import MLPPolicyNet
+from gym_cruising.neural_network.transformer_encoder_decoder import TransformerEncoderDecoder
+
+MAX_SPEED_UAV = 55.6  # m/s - about 20 Km/h x 10 steps
+EMBEDDED_DIM = 32
+CHECKED_STEPS = 200
+
+
+def check_reproducibility(options: dict, seed: int) -> None:
+    """ Two torch envs with the same seed and actions follow the same trajectory. """
+    envs = [gym.make('gym_cruising:CruisingTorch-v0', track_id=2).unwrapped for _ in range(2)]
+    observations = [env.reset(seed=seed, options=options)[0] for env in envs]
+    actions = np.random.default_rng(seed).uniform(-1.0, 1.0, size=(CHECKED_STEPS, options["uav"], 2)) \
+        * MAX_SPEED_UAV * 0.1
+    for step_actions in actions:
+        assert torch.equal(observations[0], observations[1]), f"observations differ with options {options}"
+        steps = [env.step(torch.from_numpy(step_actions)) for env in envs]
+        observations = [step[0] for step in steps]
+        assert steps[0][1:3] == steps[1][1:3], f"rewards differ with options {options}"
+        assert torch.equal(envs[0].gu_channels_state, envs[1].gu_channels_state), \
+            f"channels differ with options {options}"
+        if steps[0][2]:
+            break
+
+
+def check_shared_state(options: dict, seed: int) -> None:
+    """ A state of the NumPy env restored on the torch env gives the same observation. """
+    numpy_env = gym.make('gym_cruising:Cruising-v0', track_id=2).unwrapped
+    torch_env = gym.make('gym_cruising:CruisingTorch-v0', track_id=2).unwrapped
+    numpy_observation, _ = numpy_env.reset(seed=seed, options=options)
+    torch_env.reset(seed=seed, options=options)
+    torch_env.set_state(numpy_env.get_state())
+    assert np.array_equal(numpy_observation.astype(np.float32), torch_env.get_observation().numpy()), \
+        f"observations differ with options {options}"
+
+
+def numpy_actor_loop(env, transformer, mlp, options: dict, steps: int) -> None:
+    uav_number = options["uav"]
+    state, _ = env.reset(seed=0, options=options)
+    for _ in range(steps):
+        uav_info, connected_gu_positions = np.split(state, [uav_number * 2], axis=0)
+        uav_info = torch.from_numpy(uav_info.reshape(uav_number, 4)).float()
+        connected_gu_positions = torch.from_numpy(connected_gu_positions).float()
+        with torch.no_grad():
+            tokens = transformer(connected_gu_positions.unsqueeze(0), uav_info.unsqueeze(0)).squeeze(0)
+            actions = [mlp(tokens[i]).cpu().numpy().reshape(2) * MAX_SPEED_UAV for i in range(uav_number)]
+        state, _, terminated, _, _ = env.step(actions)
+        if terminated:
+            state, _ = env.reset(seed=0, options=options)
+
+
+def torch_actor_loop(env, transformer, mlp, options: dict, steps: int) -> None:
+    uav_number = options["uav"]
+    state, _ = env.reset(seed=0, options=options)
+    for _ in range(steps):
+        with torch.no_grad():
+            tokens = transformer(state[uav_number * 2:].unsqueeze(0),
+                                 state[:uav_number * 2].reshape(uav_number, 4).unsqueeze(0)).squeeze(0)
+            actions = mlp(tokens) * MAX_SPEED_UAV
+        state, _, terminated, _, _ = env.step(actions)
+        if terminated:
+            state, _ = env.reset(seed=0, options=options)
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--steps', type=int, default=100)
+    parser.add_argument('--uav', type=int, default=3)
+    parser.add_argument('--gu', type=int, nargs='+', default=[60, 1000])
+    args = parser.parse_args()
+
+    for seed, options in enumerate([
+        {"uav": 3, "gu": 60, "clustered": 0},
+        {"uav": 3, "gu": 60, "clustered": 1, "clusters_number": 2, "variance": 100000},
+        {"uav": 4, "gu": 120, "clustered": 0, "interference": True},
+    ]):
+        check_reproducibility(options, seed)
+        check_shared_state(options, seed)
+    print(f"torch backend reproduced for {CHECKED_STEPS} steps, NumPy states restored on it")
+
+    torch.manual_seed(0)
+    transformer = TransformerEncoderDecoder(embed_dim=EMBEDDED_DIM).eval()
+    mlp = MLPPolicyNet(token_dim=EMBEDDED_DIM).eval()
+    numpy_env = gym.make('gym_cruising:Cruising-v0', track_id=2).unwrapped
+    torch_env = gym.make('gym_cruising:CruisingTorch-v0', track_id=2).unwrapped
+    print(f"{'GU':>6} {'numpy ms/step':>14} {'torch ms/step':>14}")
+    for gu_number in args.gu:
+        options = {"uav": args.uav, "gu": gu_number, "clustered": 0}
+        times = []
+        for actor_loop, env in ((numpy_actor_loop, numpy_env), (torch_actor_loop, torch_env)):
+            start = time.perf_counter()
+            actor_loop(env, transformer, mlp, options, args.steps)
+            times.append((time.perf_counter() - start) / args.steps * 1e3)
+        print(f"{gu_number:>6} {times[0]:>14.3f} {times[1]:>14.3f}")
@@ -0,0 +1,122 @@
+"""
+Time per TD3 update of optimize_model in script/main.py, split into the collation of the batch sampled from
+the two replay memories and the forward and backward passes of the networks, on synthetic transitions.
+The collation of the previous deque memory is timed on the same transitions for comparison.
+"""
+import os
+import sys
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import argparse
+import time
+
+import numpy as np
+import torch
+from torch import nn, optim
+
+from benchmark_replay_memory import DequeReplayMemory, collate_deque, make_transition, UAV_SLOTS
+from gym_cruising.memory.replay_memory import ReplayMemory, collate
+from gym_cruising.neural_network.MLP_policy_net import MLPPolicyNet
+from gym_cruising.neural_network.deep_Q_net import DoubleDeepQNet
+from gym_cruising.neural_network.transformer_encoder_decoder import TransformerEncoderDecoder
+
+EMBEDDED_DIM = 32
+MAX_SPEED_UAV = 55.6
+GAMMA = 0.99
+SIGMA = 0.2
+C = 0.5
+
+
+def update(networks: dict, optimizers: dict, batch) -> None:
+    """ One update of the critic, the transformer and the policy as in optimize_model, without target updates. """
+    with torch.no_grad():
+        tokens_next_states_target = networks["transformer_target"](batch.next_states.gu_positions,
+                                                                   batch.next_states.uav_info,
+                                                                   batch.next_states.gu_padding_mask)
+        tokens_states_target = networks["transformer_target"](batch.states.gu_positions, batch.states.uav_info,
+                                                              batch.states.gu_padding_mask)
+    tokens_states = networks["transformer_policy"](batch.states.gu_positions, batch.states.uav_info,
+                                                   batch.states.gu_padding_mask)
+    rewards = batch.rewards.unsqueeze(1)
+    terminated = batch.terminated.unsqueeze(1)
+    loss_Q = loss_policy = loss_transformer = 0.0
+    for i in range(UAV_SLOTS):
+        index_mask = ~torch.all(batch.actions[:, i] == 100., dim=1)
+        with torch.no_grad():
+            next_tokens = tokens_next_states_target[index_mask, i]
+            noise = torch.clip(torch.randn((int(index_mask.sum()), 2)) * SIGMA, -C, C)
+            next_actions = torch.clip(networks["mlp_target"](next_tokens) + noise, -1.0, 1.0) * MAX_SPEED_UAV
+            Q1_values, Q2_values = networks["deep_Q_net_target"](next_tokens, next_actions)
+            y = rewards[..., i][index_mask] + GAMMA * (1.0 - terminated[index_mask]) * torch.min(Q1_values, Q2_values)
+        tokens = tokens_states[index_mask, i]
+        Q1_values, Q2_values = networks["deep_Q_net_policy"](tokens, batch.actions[index_mask, i])
+        loss_Q += nn.functional.huber_loss(Q1_values, y) + nn.functional.huber_loss(Q2_values, y)
+        tokens_target = tokens_states_target[index_mask, i]
+        Q1_values, _ = networks["deep_Q_net_policy"](tokens_target,
+                                                     networks["mlp_policy"](tokens_target) * MAX_SPEED_UAV)
+        loss_policy += -Q1_values.mean()
+        loss_transformer += nn.functional.mse_loss(tokens, tokens_target)
+
+    # both backward passes run before the steps, which modify the critic weights in place
+    for optimizer in optimizers.values():
+        optimizer.zero_grad()
+    loss_Q.backward()
+    loss_policy.backward()
+    for optimizer in optimizers.values():
+        optimizer.step()
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--transitions', type=int, default=10_000)
+    parser.add_argument('--max-gu', type=int, default=80, help='largest number of connected GUs of a state')
+    parser.add_argument('--batch-size', type=int, default=256)
+    parser.add_argument('--updates', type=int, default=5)
+    args = parser.parse_args()
+
+    torch.manual_seed(0)
+    rng = np.random.default_rng(0)
+    array_memories = [ReplayMemory(args.transitions), ReplayMemory(args.transitions)]
+    deque_memories = [DequeReplayMemory(args.transitions), DequeReplayMemory(args.transitions)]
+    for array_memory, deque_memory in zip(array_memories, deque_memories):
+        for _ in range(args.transitions):
+            transition = make_transition(rng, args.max_gu)
+            array_memory.push(*transition)
+            deque_memory.push(*transition)
+
+    networks = {"transformer_policy": TransformerEncoderDecoder(embed_dim=EMBEDDED_DIM),
+                "mlp_policy": MLPPolicyNet(token_dim=EMBEDDED_DIM),
+                "deep_Q_net_policy": DoubleDeepQNet(state_dim=EMBEDDED_DIM),
+                "transformer_target": TransformerEncoderDecoder(embed_dim=EMBEDDED_DIM),
+                "mlp_target": MLPPolicyNet(token_dim=EMBEDDED_DIM),
+                "deep_Q_net_target": DoubleDeepQNet(state_dim=EMBEDDED_DIM)}
+    for name in ("transformer", "mlp", "deep_Q_net"):
+        networks[name + "_target"].load_state_dict(networks[name + "_policy"].state_dict())
+    optimizers = {name: optim.Adam(networks[name + "_policy"].parameters(), lr=1e-4, weight_decay=1e-5)
+                  for name in ("transformer", "mlp", "deep_Q_net")}
+    optimizers["deep_Q"] = optimizers.pop("deep_Q_net")
+
+    deque_collation = 0.0
+    for _ in range(args.updates):
+        start = time.perf_counter()
+        collate_deque(deque_memories[0].sample(args.batch_size // 2) + deque_memories[1].sample(args.batch_size // 2))
+        deque_collation += time.perf_counter() - start
+
+    collation = network = 0.0
+    padding = 0.0
+    for _ in range(args.updates):
+        start = time.perf_counter()
+        batch = collate([(memory, memory.sample_indices(args.batch_size // 2)) for memory in array_memories])
+        middle = time.perf_counter()
+        update(networks, optimizers, batch)
+        collation += middle - start
+        network += time.perf_counter() - middle
+        padding += float(batch.states.gu_padding_mask.float().mean())
+        assert all(torch.isfinite(parameter).all() for parameter in networks["transformer_policy"].parameters())
+
+    print(f"{args.updates} updates of batch size {args.batch_size}, up to {args.max_gu} connected GUs, "
+          f"{padding / args.updates:.0%} of the GU rows masked as padding")
+    print(f"{'collation ms (deque)':>21} {'collation ms':>13} {'network ms':>11} {'collation share':>16}")
+    print(f"{deque_collation / args.updates * 1e3:>21.3f} {collation / args.updates * 1e3:>13.3f} "
+          f"{network / args.updates * 1e3:>11.1f} {collation / (collation + network):>16.1%}")
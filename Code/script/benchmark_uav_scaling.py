@@ -0,0 +1,82 @@
+""" Time of the UAV placement and of the collision check for growing swarms, one UAV at a time and vectorized. """
+import os
+import sys
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import argparse
+import time
+
+import numpy as np
+
+from gym_cruising.enums.track import Track
+from gym_cruising.envs.cruise_uav import CruiseUAV
+from gym_cruising.geometry import spacing
+
+TRACK_ID = 1  # the largest area, it fits about 500 UAVs at the minimum starting distance
+
+
+def scalar_placement(rng: np.random.Generator, area: np.ndarray, uav_number: int) -> np.ndarray:
+    """ Rejection sampling of one UAV at a time against all the UAVs already placed. """
+    positions = np.empty((uav_number, 2), dtype=np.float64)
+    for i in range(uav_number):
+        position = rng.uniform(area[:, 0], area[:, 1])
+        while np.any(np.linalg.norm(positions[:i] - position, axis=1)
+                     <= CruiseUAV.MINIMUM_STARTING_DISTANCE_BETWEEN_UAV):
+            position = rng.uniform(area[:, 0], area[:, 1])
+        positions[i] = position
+    return positions
+
+
+def vectorized_placement(rng: np.random.Generator, area: np.ndarray, uav_number: int) -> np.ndarray:
+    return spacing.sample_separated_positions(rng, area, uav_number, CruiseUAV.MINIMUM_STARTING_DISTANCE_BETWEEN_UAV)
+
+
+def scalar_collisions(positions: np.ndarray) -> list:
+    """ Distances of each UAV from all the others, one UAV at a time. """
+    collisions = []
+    for i in range(len(positions)):
+        distances = np.linalg.norm(positions - positions[i], axis=1)
+        distances[i] = np.inf
+        collisions.append(bool(np.any(distances <= CruiseUAV.COLLISION_DISTANCE)))
+    return collisions
+
+
+def dense_collisions(positions: np.ndarray) -> np.ndarray:
+    return spacing._find_close_positions_dense(positions, CruiseUAV.COLLISION_DISTANCE)
+
+
+def grid_collisions(positions: np.ndarray) -> np.ndarray:
+    return spacing._find_close_positions_grid(positions, CruiseUAV.COLLISION_DISTANCE)
+
+
+def mean_time_ms(function, repeats: int, *args) -> float:
+    start = time.perf_counter()
+    for _ in range(repeats):
+        function(*args)
+    return (time.perf_counter() - start) / repeats * 1e3
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument('--uav', type=int, nargs='+', default=[10, 50, 100, 200, 400])
+    parser.add_argument('--repeats', type=int, default=20)
+    parser.add_argument('--seed', type=int, default=42)
+    args = parser.parse_args()
+
+    rng = np.random.default_rng(args.seed)
+    area = np.array(Track(TRACK_ID).spawn_area[0], dtype=np.float64)
+    for uav_number in args.uav:
+        placement_scalar = mean_time_ms(scalar_placement, args.repeats, rng, area, uav_number)
+        placement_vectorized = mean_time_ms(vectorized_placement, args.repeats, rng, area, uav_number)
+        positions = vectorized_placement(rng, area, uav_number)
+        # move the swarm as in an episode so that some UAVs collide
+        positions += rng.normal(0.0, CruiseUAV.MINIMUM_STARTING_DISTANCE_BETWEEN_UAV, size=positions.shape)
+        assert np.array_equal(scalar_collisions(positions), dense_collisions(positions))
+        assert np.array_equal(dense_collisions(positions), grid_collisions(positions))
+        collision_scalar = mean_time_ms(scalar_collisions, args.repeats, positions)
+        collision_dense = mean_time_ms(dense_collisions, args.repeats, positions)
+        collision_grid = mean_time_ms(grid_collisions, args.repeats, positions)
+        print(f"UAV: {uav_number:>4}  placement scalar: {placement_scalar:8.2f} ms  "
+              f"poisson-disk: {placement_vectorized:6.2f} ms  |  collisions scalar: {collision_scalar:7.3f} ms  "
+              f"dense: {collision_dense:6.3f} ms  grid: {collision_grid:6.3f} ms")
@@ -0,0 +1,74 @@
+"""
+Build a scenario bank of initial states of the Cruising environment, then check that every reset from the
+bank and the steps after it are the same as after the seeded reset, and compare the reset times.
+
+The scenarios file is a JSON list of {"options": {...}, "seeds": [...]}, scenario ids follow its order.
+"""
+import os
+import sys
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import argparse
+import time
+
+import gymnasium as gym
+import numpy as np
+
+from gym_cruising.utils.scenario_bank import build_scenario_bank, is_scenario_bank_current, read_scenarios
+
+MAX_SPEED_UAV = 55.6  # m/s - about 20 Km/h x 10 steps
+CHECKED_STEPS = 20
+
+
+def run_steps(env, observation: np.ndarray, actions: np.ndarray) -> list:
+    trajectory = [observation]
+    for step_actions in actions:
+        observation, reward, terminated, _, _ = env.step(step_actions)
+        trajectory += [observation, np.array(reward), env.gu_channels_state.copy()]
+        if terminated:
+            break
+    return trajectory
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('directory', help='directory of the bank')
+    parser.add_argument('scenarios', help='JSON file of the scenarios')
+    parser.add_argument('--track-id', type=int, default=2)
+    args = parser.parse_args()
+
+    scenarios = read_scenarios(args.scenarios)
+    start = time.perf_counter()
+    bank = build_scenario_bank(gym.make('gym_cruising:Cruising-v0', track_id=args.track_id).unwrapped,
+                               args.directory, scenarios)
+    print(f"{len(bank)} scenarios written to {args.directory} in {time.perf_counter() - start:.2f} s")
+    assert is_scenario_bank_current(args.directory, args.track_id, scenarios)
+    changed_options, changed_seed = scenarios[-1]
+    assert not is_scenario_bank_current(args.directory, args.track_id,
+                                        scenarios[:-1] + [(changed_options, changed_seed + 1)]), \
+        "the bank is current for a changed seed"
+
+    seeded_env = gym.make('gym_cruising:Cruising-v0', track_id=args.track_id).unwrapped
+    bank_env = gym.make('gym_cruising:Cruising-v0', track_id=args.track_id, scenario_bank=args.directory).unwrapped
+    seeded_time = 0.0
+    bank_time = 0.0
+    for scenario_id, (options, seed) in enumerate(scenarios):
+        start = time.perf_counter()
+        seeded_observation, _ = seeded_env.reset(seed=seed, options=options)
+        seeded_time += time.perf_counter() - start
+        start = time.perf_counter()
+        bank_observation, _ = bank_env.reset(options={"scenario_id": scenario_id})
+        bank_time += time.perf_counter() - start
+        assert np.array_equal(seeded_env.SINR, bank_env.SINR), \
+            f"the SINR after the reset of scenario {scenario_id} differs from the reset with seed {seed}"
+        actions = np.random.default_rng(seed).uniform(-1.0, 1.0, size=(CHECKED_STEPS, options["uav"], 2)) \
+            * MAX_SPEED_UAV * 0.1
+        seeded_trajectory = run_steps(seeded_env, seeded_observation, actions)
+        bank_trajectory = run_steps(bank_env, bank_observation, actions)
+        assert len(seeded_trajectory) == len(bank_trajectory) and all(
+            np.array_equal(a, b) for a, b in zip(seeded_trajectory, bank_trajectory)), \
+            f"scenario {scenario_id} differs from the reset with seed {seed}"
+    print(f"every scenario matches its seeded reset for {CHECKED_STEPS} steps")
+    print(f"mean reset  seeded: {seeded_time / len(scenarios) * 1e3:.3f} ms  "
+          f"bank: {bank_time / len(scenarios) * 1e3:.3f} ms")
@@ -0,0 +1,81 @@
+"""
+Check that the vectorized channel Markov chain of CruiseUAV gives the LoS -> NLoS (g1) and NLoS -> LoS (g2)
+transition frequencies of the previous per-link rule, one np.random choice over the row of the transition
+matrix of each link, on links with different distances and relative shifts.
+"""
+import os
+import sys
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import argparse
+import math
+
+import gymnasium as gym
+import numpy as np
+
+from gym_cruising.utils.channels_utils import RATE_OF_GROWTH, UAV_ALTITUDE, a, b
+
+
+def scalar_transition_matrix(distance: float, relative_shift: float) -> np.ndarray:
+    """ Transition matrix of one link with the scalar formulas of the per-link loop. """
+    elevation_angle = math.degrees(math.asin(UAV_ALTITUDE / distance))
+    PLoS = 1 / (1 + a * math.exp((-1) * b * (elevation_angle - a)))
+    PLoS2NLoS = 2 * ((1 - PLoS) / (1 + math.exp(RATE_OF_GROWTH * relative_shift)) - (1 - PLoS) / 2)  # g1
+    PNLoS2LoS = 2 * (PLoS / (1 + math.exp(RATE_OF_GROWTH * relative_shift)) - PLoS / 2)  # g2
+    return np.array([
+        [1 - PLoS2NLoS, PLoS2NLoS],
+        [PNLoS2LoS, 1 - PNLoS2LoS]
+    ])
+
+
+def scalar_frequencies(rng: np.random.Generator, distances: np.ndarray, relative_shifts: np.ndarray,
+                       state: int, draws: int) -> np.ndarray:
+    """ Frequency of a change of state of every link from state with the per-link rule. """
+    changes = np.zeros(distances.shape)
+    for index in np.ndindex(distances.shape):
+        transition_matrix = scalar_transition_matrix(distances[index], relative_shifts[index])
+        next_states = rng.choice(range(len(transition_matrix)), size=draws, p=transition_matrix[state])
+        changes[index] = np.count_nonzero(next_states != state)
+    return changes / draws
+
+
+def array_frequencies(env, state: int, draws: int) -> np.ndarray:
+    """ Frequency of a change of state of every link from state with calculate_PathLoss_with_Markov_Chain. """
+    changes = np.zeros(env.gu_channels_state.shape)
+    for _ in range(draws):
+        env.gu_channels_state = np.full(changes.shape, state, dtype=np.int64)
+        env.calculate_PathLoss_with_Markov_Chain()
+        changes += env.gu_channels_state != state
+    return changes / draws
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--seed', type=int, default=42)
+    parser.add_argument('--gu', type=int, default=40)
+    parser.add_argument('--draws', type=int, default=4000, help='transitions drawn from each state of each link')
+    parser.add_argument('--max-z', type=float, default=5.0, help='largest accepted difference in standard errors')
+    args = parser.parse_args()
+
+    env = gym.make('gym_cruising:Cruising-v0', track_id=2).unwrapped
+    env.reset(seed=args.seed, options={"uav": 3, "gu": args.gu, "clustered": 0})
+    # GU and UAV shifts of 0 to 100 m give relative shifts over the whole range of the growth term
+    rng = np.random.default_rng(args.seed)
+    env.gu_previous_positions = env.gu_positions - rng.uniform(-50.0, 50.0, size=env.gu_positions.shape)
+    env.uav_previous_positions = env.uav_positions - rng.uniform(-50.0, 50.0, size=env.uav_positions.shape)
+    horizontal_differences = env.gu_positions[:, np.newaxis] - env.uav_positions[np.newaxis]
+    distances = np.sqrt(np.sum(horizontal_differences ** 2, axis=-1) + UAV_ALTITUDE ** 2)
+    relative_shifts = (np.linalg.norm(env.gu_positions - env.gu_previous_positions, axis=1)[:, np.newaxis]
+                       + np.linalg.norm(env.uav_positions - env.uav_previous_positions, axis=1)[np.newaxis])
+
+    for state, name in ((0, "g1 LoS -> NLoS"), (1, "g2 NLoS -> LoS")):
+        scalar = scalar_frequencies(rng, distances, relative_shifts, state, args.draws)
+        vectorized = array_frequencies(env, state, args.draws)
+        pooled = (scalar + vectorized) / 2
+        standard_error = np.sqrt(np.maximum(pooled * (1 - pooled), 1 / args.draws) * 2 / args.draws)
+        z = np.abs(scalar - vectorized) / standard_error
+        print(f"{name}: {scalar.size} links, frequencies {vectorized.min():.3f} to {vectorized.max():.3f}, "
+              f"largest difference {np.max(np.abs(scalar - vectorized)):.4f} ({z.max():.2f} standard errors)")
+        assert z.max() <= args.max_z, f"{name}: the vectorized and per-link frequencies differ"
+    env.close()
@@ -0,0 +1,54 @@
+""" Check that episodes of the Cruising environment are bit-reproducible from the reset seed. """
+import os
+import sys
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import argparse
+
+import gymnasium as gym
+import numpy as np
+
+MAX_SPEED_UAV = 55.6  # m/s - about 20 Km/h x 10 steps
+
+
+def run_episode(seed: int, options: dict, steps: int) -> list:
+    """ Return observation, reward and GU state of every step of one episode started with seed. """
+    env = gym.make('gym_cruising:Cruising-v0', track_id=2).unwrapped
+    observation, _ = env.reset(seed=seed, options=options)
+    actions_rng = np.random.default_rng(seed)
+    trajectory = [observation]
+    for _ in range(steps):
+        actions = actions_rng.uniform(-1.0, 1.0, size=(options["uav"], 2)) * MAX_SPEED_UAV * 0.1
+        observation, reward, terminated, _, _ = env.step(actions)
+        trajectory += [observation, np.array(reward), env.gu_positions.copy(), env.gu_channels_state.copy()]
+        if terminated:
+            break
+    env.close()
+    return trajectory
+
+
+def same_trajectory(first: list, second: list) -> bool:
+    return len(first) == len(second) and all(np.array_equal(a, b) for a, b in zip(first, second))
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument('--seed', type=int, default=42)
+    parser.add_argument('--steps', type=int, default=100)
+    args = parser.parse_args()
+
+    for clustered in (0, 1):
+        options = {
+            "uav": 3,
+            "gu": 120,
+            "clustered": clustered,
+            "clusters_number": 3,
+            "variance": 40000
+        }
+        reference = run_episode(args.seed, options, args.steps)
+        assert same_trajectory(reference, run_episode(args.seed, options, args.steps)), \
+            f"clustered={clustered}: two episodes with seed {args.seed} differ"
+        assert not same_trajectory(reference, run_episode(args.seed + 1, options, args.steps)), \
+            f"clustered={clustered}: episodes with seeds {args.seed} and {args.seed + 1} are identical"
+        print(f"clustered={clustered}: {len(reference)} arrays reproduced from seed {args.seed}")
@@ -0,0 +1,102 @@
+"""
+Check that the rewards of CruiseUAV, built from the GUs covered by each UAV alone, are the rewards of the
+previous formula, which removed the column of each UAV from the connectivity matrix with np.delete,
+over seeded episodes with 1 to 5 UAVs, uniform and clustered GUs and both SINR models.
+"""
+import os
+import sys
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import argparse
+
+import gymnasium as gym
+import numpy as np
+
+MAX_SPEED_UAV = 55.6  # m/s - about 20 Km/h x 10 steps
+
+
+class ReferenceReward:
+    """ The previous calculate_reward of CruiseUAV, on the connectivity matrix of env. """
+
+    def __init__(self, env) -> None:
+        self.env = env
+        self.last_RCR = None
+
+    def RCR_without_uav_i(self, i):
+        tmp_matrix = np.delete(self.env.connectivity_matrix, i, axis=1)  # Remove i-th column
+        return np.sum(np.any(tmp_matrix, axis=1))
+
+    def __call__(self, terminated) -> list:
+        current_rewards = []
+        for i in range(self.env.UAV_NUMBER):
+            if terminated[i]:
+                current_rewards.append(-2.0)
+            else:
+                current_rewards.append((self.env.gu_covered - self.RCR_without_uav_i(i)) / self.env.gu_number)
+        if self.last_RCR is None:
+            self.last_RCR = current_rewards
+            return [r * 100.0 for r in current_rewards]
+        delta_RCR_smorzato = []
+        for i in range(self.env.UAV_NUMBER):
+            if not terminated[i]:
+                delta_RCR_smorzato.append(self.env.reward_gamma * (current_rewards[i] - self.last_RCR[i]))
+            else:
+                delta_RCR_smorzato.append(0.0)
+        self.last_RCR = current_rewards
+        reward_smorzato = np.add(current_rewards, delta_RCR_smorzato)
+        return [r * 100.0 for r in reward_smorzato]
+
+
+def check_episode(sinr_model: str, seed: int, options: dict, steps: int) -> tuple:
+    """ Return the number of rewards compared and of terminated UAVs among them in one episode. """
+    env = gym.make('gym_cruising:Cruising-v0', track_id=2, sinr_model=sinr_model).unwrapped
+    env.reset(seed=seed, options=options)
+    reference = ReferenceReward(env)
+    calculate_reward = env.calculate_reward
+    counts = [0, 0]
+
+    def checked_calculate_reward(terminated):
+        rewards = calculate_reward(terminated)
+        expected = reference(terminated)
+        assert rewards == expected, f"{sinr_model} {options}, seed {seed}: rewards {rewards} != {expected}"
+        counts[0] += len(rewards)
+        counts[1] += sum(terminated)
+        return rewards
+
+    env.calculate_reward = checked_calculate_reward
+    actions_rng = np.random.default_rng(seed)
+    for _ in range(steps):
+        actions = actions_rng.uniform(-1.0, 1.0, size=(options["uav"], 2)) * MAX_SPEED_UAV
+        _, _, terminated, _, _ = env.step(actions)
+        if terminated:
+            break
+    env.close()
+    return tuple(counts)
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--seed', type=int, default=42)
+    parser.add_argument('--episodes', type=int, default=5, help='episodes of each configuration')
+    parser.add_argument('--steps', type=int, default=200)
+    args = parser.parse_args()
+
+    for sinr_model in ("noise", "interference"):
+        for uav_number in (1, 2, 3, 5):
+            for clustered in (0, 1):
+                options = {
+                    "uav": uav_number,
+                    "gu": 300,
+                    "clustered": clustered,
+                    "clusters_number": 3,
+                    "variance": 40000
+                }
+                rewards = terminated = 0
+                for episode in range(args.episodes):
+                    episode_rewards, episode_terminated = check_episode(sinr_model, args.seed + episode, options,
+                                                                        args.steps)
+                    rewards += episode_rewards
+                    terminated += episode_terminated
+                print(f"{sinr_model:>12} uav={uav_number} clustered={clustered}: "
+                      f"{rewards} rewards equal to the np.delete formula, {terminated} of terminated UAVs")
@@ -0,0 +1,78 @@
+""" Check that steps after set_state repeat the steps after get_state, and time restore against reset plus replay. """
+import os
+import sys
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import argparse
+import pickle
+import time
+
+import gymnasium as gym
+import numpy as np
+
+MAX_SPEED_UAV = 55.6  # m/s - about 20 Km/h x 10 steps
+
+
+def make_env():
+    return gym.make('gym_cruising:Cruising-v0', track_id=2).unwrapped
+
+
+def run_steps(env, actions: np.ndarray) -> list:
+    """ Return observation, reward, terminated and GU state of every step of actions. """
+    trajectory = []
+    for step_actions in actions:
+        observation, reward, terminated, _, _ = env.step(step_actions)
+        trajectory += [observation, np.array(reward), np.array(terminated), env.gu_positions.copy(),
+                       env.gu_channels_state.copy(), env.gu_covered_flags.copy()]
+    return trajectory
+
+
+def same_trajectory(first: list, second: list) -> bool:
+    return len(first) == len(second) and all(np.array_equal(a, b) for a, b in zip(first, second))
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument('--seed', type=int, default=42)
+    parser.add_argument('--gu', type=int, default=1000)
+    parser.add_argument('--fork-step', type=int, default=200, help='step at which the state is saved')
+    parser.add_argument('--steps', type=int, default=50, help='steps compared after the fork')
+    args = parser.parse_args()
+
+    options = {"uav": 3, "gu": args.gu, "clustered": 1, "clusters_number": 3, "variance": 100000}
+    actions_rng = np.random.default_rng(args.seed)
+    # small moves keep the UAVs in the area for the whole run
+    actions = actions_rng.uniform(-1.0, 1.0, size=(args.fork_step + args.steps, options["uav"], 2)) \
+        * MAX_SPEED_UAV * 0.05
+
+    env = make_env()
+    env.reset(seed=args.seed, options=options)
+    run_steps(env, actions[:args.fork_step])
+    start = time.perf_counter()
+    state = env.get_state()
+    get_state_ms = (time.perf_counter() - start) * 1e3
+    reference = run_steps(env, actions[args.fork_step:])
+
+    # the same environment, restored twice from the same state
+    for _ in range(2):
+        start = time.perf_counter()
+        env.set_state(state)
+        set_state_ms = (time.perf_counter() - start) * 1e3
+        assert same_trajectory(reference, run_steps(env, actions[args.fork_step:])), \
+            "the steps after set_state differ from the steps after get_state"
+
+    # a new environment that was never reset, through pickle as when a state is sent to another process
+    buffer = pickle.dumps(state)
+    other_env = make_env()
+    other_env.set_state(pickle.loads(buffer))
+    assert same_trajectory(reference, run_steps(other_env, actions[args.fork_step:])), \
+        "the steps after set_state on a new environment differ from the steps after get_state"
+
+    start = time.perf_counter()
+    env.reset(seed=args.seed, options=options)
+    run_steps(env, actions[:args.fork_step])
+    replay_ms = (time.perf_counter() - start) * 1e3
+    print(f"{args.steps} steps after the fork at step {args.fork_step} reproduced, state of {len(buffer)} bytes")
+    print(f"get_state: {get_state_ms:.3f} ms  set_state: {set_state_ms:.3f} ms  "
+          f"reset + replay of {args.fork_step} steps: {replay_ms:.1f} ms")
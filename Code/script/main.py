@@ -1,3 +1,4 @@
+import os
 import sys
 
 sys.path.append('/home/fantechi/tesi/5G_UAV_Intelligent_Coverage/5G_UAV_ICoverage')
@@ -9,13 +10,13 @@ import torch.optim as optim
 import torch.nn as nn
 import numpy as np
 import random
-import torch.nn.functional as F
 import wandb
 
-from gym_cruising.memory.replay_memory import ReplayMemory, Transition
+from gym_cruising.memory.replay_memory import ReplayMemory, collate
 from gym_cruising.neural_network.MLP_policy_net import MLPPolicyNet
 from gym_cruising.neural_network.deep_Q_net import DeepQNet, DoubleDeepQNet
 from gym_cruising.neural_network.transformer_encoder_decoder import TransformerEncoderDecoder
+from gym_cruising.utils.scenario_bank import build_scenario_bank, is_scenario_bank_current, read_scenarios
 
 UAV_NUMBER = 0
 
@@ -39,15 +40,32 @@ BEST_VALIDATION = 0.0
 MAX_LAST_RCR = 0.0
 EMBEDDED_DIM = 32
 
+# validation and test scenarios, their initial states are generated once into a scenario bank
+SCENARIOS_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'scenarios')
+
 # if gpu is to be used
 device = torch.device("cuda:0" if torch.cuda.is_available() else "cpu")
 print("DEVICE:", device)
 
+
+def get_scenario_bank(name: str) -> str:
+    """
+    Return the directory of the bank of scenarios/<name>.json, built at the first use and built again
+    when the scenarios or the format of the bank change.
+    """
+    directory = os.path.join(SCENARIOS_PATH, name + '_bank')
+    scenarios = read_scenarios(os.path.join(SCENARIOS_PATH, name + '.json'))
+    if not is_scenario_bank_current(directory, 2, scenarios):
+        build_scenario_bank(gym.make('gym_cruising:Cruising-v0', track_id=2).unwrapped, directory, scenarios)
+    return directory
+
+
 if TRAIN:
 
     wandb.init(project="mixlast")
 
-    env = gym.make('gym_cruising:Cruising-v0', render_mode='rgb_array', track_id=2)
+    env = gym.make('gym_cruising:Cruising-v0', render_mode='rgb_array', track_id=2,
+                   scenario_bank=get_scenario_bank('validation'))
     env.action_space.seed(42)
 
     # ACTOR POLICY NET policy
@@ -81,8 +99,8 @@ if TRAIN:
     optimizer_mlp = optim.Adam(mlp_policy.parameters(), lr=LEARNING_RATE, weight_decay=1e-5)
     optimizer_deep_Q = optim.Adam(deep_Q_net_policy.parameters(), lr=LEARNING_RATE, weight_decay=1e-5)
 
-    replay_buffer_uniform = ReplayMemory(100000)
-    replay_buffer_clustered = ReplayMemory(100000)
+    replay_buffer_uniform = ReplayMemory(100000, seed=0)
+    replay_buffer_clustered = ReplayMemory(100000, seed=1)
 
 
     def select_actions_epsilon(state, uav_number):
@@ -119,70 +137,34 @@ if TRAIN:
         if len(replay_buffer_uniform) < 5000 or len(replay_buffer_clustered) < 5000:
             return
 
-        transitions_uniform = replay_buffer_uniform.sample(int(BATCH_SIZE / 2))
-        # This converts batch-arrays of Transitions to Transition of batch-arrays.
-        batch_uniform = Transition(*zip(*transitions_uniform))
-
-        transitions_clustered = replay_buffer_clustered.sample(int(BATCH_SIZE / 2))
-        # This converts batch-arrays of Transitions to Transition of batch-arrays.
-        batch_clustered = Transition(*zip(*transitions_clustered))
-
-        states_batch = batch_uniform.states + batch_clustered.states
-        actions_batch = batch_uniform.actions + batch_clustered.actions
-        actions_batch = tuple(
-            [torch.tensor(array, dtype=torch.float32) for array in sublist] for sublist in actions_batch)
-        rewards_batch = batch_uniform.rewards + batch_clustered.rewards
-        rewards_batch = torch.tensor(rewards_batch, dtype=torch.float32).unsqueeze(1).to(device)
-        next_states_batch = batch_uniform.next_states + batch_clustered.next_states
-        terminated_batch = batch_uniform.terminated + batch_clustered.terminated
-        terminated_batch = torch.tensor(terminated_batch, dtype=torch.float32).unsqueeze(1).to(device)
-
-        # prepare the batch of states
-        state_uav_info_batch = tuple(np.split(array, [optimization_steps * 2], axis=0)[0] for array in states_batch)
-        state_uav_info_batch = tuple(array.reshape(optimization_steps, 4) for array in state_uav_info_batch)
-        state_uav_info_batch = tuple(torch.from_numpy(array).float().to(device) for array in state_uav_info_batch)
-        state_uav_info_batch = torch.stack(state_uav_info_batch)
-
-        state_connected_gu_positions_batch = tuple(
-            np.split(array, [optimization_steps * 2], axis=0)[1] for array in states_batch)
-        state_connected_gu_positions_batch = tuple(
-            torch.from_numpy(array).float().to(device) for array in state_connected_gu_positions_batch)
-        max_len = max(tensor.shape[0] for tensor in state_connected_gu_positions_batch)
-        padded_tensors = []
-        for tensor in state_connected_gu_positions_batch:
-            padding = (0, 0, 0, max_len - tensor.shape[0])  # Aggiungi il padding alla fine della prima dimensione
-            padded_tensor = F.pad(tensor, padding, "constant", 0)  # Padding con 0
-            padded_tensors.append(padded_tensor)
-        state_connected_gu_positions_batch = torch.stack(padded_tensors)
-
-        # prepare the batch of next states
-        next_state_uav_info_batch = tuple(
-            np.split(array, [optimization_steps * 2], axis=0)[0] for array in next_states_batch)
-        next_state_uav_info_batch = tuple(array.reshape(optimization_steps, 4) for array in next_state_uav_info_batch)
-        next_state_uav_info_batch = tuple(
-            torch.from_numpy(array).float().to(device) for array in next_state_uav_info_batch)
-        next_state_uav_info_batch = torch.stack(next_state_uav_info_batch)
-
-        next_state_connected_gu_positions_batch = tuple(
-            np.split(array, [optimization_steps * 2], axis=0)[1] for array in next_states_batch)
-        next_state_connected_gu_positions_batch = tuple(
-            torch.from_numpy(array).float().to(device) for array in next_state_connected_gu_positions_batch)
-        max_len = max(tensor.shape[0] for tensor in next_state_connected_gu_positions_batch)
-        padded_tensors = []
-        for tensor in next_state_connected_gu_positions_batch:
-            padding = (0, 0, 0, max_len - tensor.shape[0])  # Aggiungi il padding alla fine della prima dimensione
-            padded_tensor = F.pad(tensor, padding, "constant", 0)  # Padding con 0
-            padded_tensors.append(padded_tensor)
-        next_state_connected_gu_positions_batch = torch.stack(padded_tensors)
+        collation_start = time.perf_counter()
+        batch = collate([(replay_buffer_uniform, replay_buffer_uniform.sample_indices(int(BATCH_SIZE / 2))),
+                         (replay_buffer_clustered, replay_buffer_clustered.sample_indices(int(BATCH_SIZE / 2)))],
+                        device)
+        collation_time = time.perf_counter() - collation_start
+        actions_batch = batch.actions  # [BATCH_SIZE, optimization_steps, 2]
+        rewards_batch = batch.rewards.unsqueeze(1)  # [BATCH_SIZE, 1, optimization_steps]
+        terminated_batch = batch.terminated.unsqueeze(1)  # [BATCH_SIZE, 1]
+        # UAV info [BATCH_SIZE, optimization_steps, 4], connected GU positions padded with zeros
+        # and their key padding masks
+        state_uav_info_batch = batch.states.uav_info
+        state_connected_gu_positions_batch = batch.states.gu_positions
+        state_gu_padding_mask_batch = batch.states.gu_padding_mask
+        next_state_uav_info_batch = batch.next_states.uav_info
+        next_state_connected_gu_positions_batch = batch.next_states.gu_positions
+        next_state_gu_padding_mask_batch = batch.next_states.gu_padding_mask
 
         # get tokens from batch of states and next states
         with torch.no_grad():
             tokens_batch_next_states_target = transformer_target(next_state_connected_gu_positions_batch,
-                                                                 next_state_uav_info_batch)  # [BATCH_SIZE, optimization_steps, EMBEDDED_DIM]
+                                                                 next_state_uav_info_batch,
+                                                                 next_state_gu_padding_mask_batch)  # [BATCH_SIZE, optimization_steps, EMBEDDED_DIM]
             tokens_batch_states_target = transformer_target(state_connected_gu_positions_batch,
-                                                            state_uav_info_batch)  # [BATCH_SIZE, optimization_steps, EMBEDDED_DIM]
+                                                            state_uav_info_batch,
+                                                            state_gu_padding_mask_batch)  # [BATCH_SIZE, optimization_steps, EMBEDDED_DIM]
         tokens_batch_states = transformer_policy(state_connected_gu_positions_batch,
-                                                 state_uav_info_batch)  # [BATCH_SIZE, optimization_steps, EMBEDDED_DIM]
+                                                 state_uav_info_batch,
+                                                 state_gu_padding_mask_batch)  # [BATCH_SIZE, optimization_steps, EMBEDDED_DIM]
 
         loss_Q = 0.0
         loss_policy = 0.0
@@ -190,12 +172,9 @@ if TRAIN:
 
         for i in range(optimization_steps):
             # index mask for not padded current uav in batch
-            index_mask = [
-                k for k, lista in enumerate(actions_batch)
-                if not torch.equal(lista[i], torch.tensor([100., 100.]))
-            ]
+            index_mask = ~torch.all(actions_batch[:, i] == 100., dim=1)
 
-            masked_batch_size = len(index_mask)
+            masked_batch_size = int(index_mask.sum())
 
             # UPDATE Q-FUNCTION
             with torch.no_grad():
@@ -218,10 +197,8 @@ if TRAIN:
                                                                             Q2_values_batch)
             # slice i-th UAV's tokens [masked_batch_size, 1, EMBEDDED_DIM]
             current_batch_tensor_tokens_states = tokens_batch_states[index_mask, i:i + 1, :].squeeze(1)
-            # Concatenate i-th UAV's actions along the batch size [masked_batch_size, 2]
-            current_batch_actions = torch.cat(
-                [action[i].unsqueeze(0) for action in actions_batch],
-                dim=0).to(device)
+            # i-th UAV's actions along the batch size [BATCH_SIZE, 2]
+            current_batch_actions = actions_batch[:, i]
             Q1_values_batch, Q2_values_batch = deep_Q_net_policy(current_batch_tensor_tokens_states,
                                                                  current_batch_actions[index_mask])
             # criterion = nn.MSELoss()
@@ -241,7 +218,8 @@ if TRAIN:
             loss_transformer += criterion(current_batch_tensor_tokens_states, current_batch_tensor_tokens_states_target)
 
         # log metrics to wandb
-        wandb.log({"loss_Q": loss_Q, "loss_policy": loss_policy, "loss_transformer": loss_transformer})
+        wandb.log({"loss_Q": loss_Q, "loss_policy": loss_policy, "loss_transformer": loss_transformer,
+                   "collation_ms": collation_time * 1e3})
 
         optimizer_deep_Q.zero_grad()
         optimizer_transformer.zero_grad()
@@ -397,33 +375,11 @@ if TRAIN:
         reward_sum_uniform = 0.0
         reward_sum_clustered = 0.0
         sum_last_rcr = 0.0
-        options = ({
-                       "uav": 1,
-                       "gu": 30,
-                       "clustered": 1,
-                       "clusters_number": 1,
-                       "variance": 100000
-                   },
-                   {
-                       "uav": 2,
-                       "gu": 60,
-                       "clustered": 1,
-                       "clusters_number": 2,
-                       "variance": 100000
-                   },
-                   {
-                       "uav": 3,
-                       "gu": 90,
-                       "clustered": 1,
-                       "clusters_number": 3,
-                       "variance": 100000
-                   })
-
-        seeds = [42, 751, 853]
-        for i, seed in enumerate(seeds):
-            state, info = env.reset(seed=seed, options=options[i])
+        # scenarios 0-2 of the validation bank are clustered
+        for scenario_id in range(3):
+            state, info = env.reset(options={"scenario_id": scenario_id})
             steps = 1
-            uav_number = options[i]["uav"]
+            uav_number = env.unwrapped.UAV_NUMBER
             while True:
                 actions = select_actions(state, uav_number)
                 next_state, reward, terminated, truncated, info = env.step(actions)
@@ -442,33 +398,11 @@ if TRAIN:
 
         wandb.log({"reward_clustered": reward_sum_clustered})
 
-        options = ({
-                       "uav": 1,
-                       "gu": 30,
-                       "clustered": 0,
-                       "clusters_number": 0,
-                       "variance": 0
-                   },
-                   {
-                       "uav": 2,
-                       "gu": 60,
-                       "clustered": 0,
-                       "clusters_number": 0,
-                       "variance": 0
-                   },
-                   {
-                       "uav": 3,
-                       "gu": 90,
-                       "clustered": 0,
-                       "clusters_number": 0,
-                       "variance": 0
-                   })
-
-        seeds = [54321, 1181, 3475]
-        for i, seed in enumerate(seeds):
-            state, info = env.reset(seed=seed, options=options[i])
+        # scenarios 3-5 of the validation bank are uniform
+        for scenario_id in range(3, 6):
+            state, info = env.reset(options={"scenario_id": scenario_id})
             steps = 1
-            uav_number = options[i]["uav"]
+            uav_number = env.unwrapped.UAV_NUMBER
             while True:
                 actions = select_actions(state, uav_number)
                 next_state, reward, terminated, truncated, info = env.step(actions)
@@ -577,7 +511,8 @@ else:
         return action
 
     # for numerical test
-    env = gym.make('gym_cruising:Cruising-v0', render_mode='rgb_array', track_id=2)
+    env = gym.make('gym_cruising:Cruising-v0', render_mode='rgb_array', track_id=2,
+                   scenario_bank=get_scenario_bank('test'))
 
     env.action_space.seed(42)
 
@@ -590,27 +525,13 @@ else:
     PATH_MLP_POLICY = './neural_network/last1MLP.pth'
     mlp_policy.load_state_dict(torch.load(PATH_MLP_POLICY))
 
-    options = ({
-        "uav": 3,
-        "gu": 120,
-        "clustered": 0,
-        "clusters_number": 3,
-        "variance": 100000
-    })
-
-    seeds = [5522, 6004, 9648, 8707, 5930, 7411, 8761, 6748, 283, 4880, 7541, 2423, 9652, 4469, 3508, 8969, 8222, 6413,
-             3133, 273, 1431, 9688, 6940, 9998, 7097, 1130, 7583, 4018, 116, 1626, 9579, 2641, 8602, 3335, 7980, 3434,
-             1553, 4961, 2024, 2834, 6610, 979, 9405, 4866, 7437, 3827, 3735, 2038, 1360, 5202, 4870, 1945, 382, 7101,
-             2402, 7235, 8967, 2315, 5955, 4300, 1775, 8136, 1050, 6385, 1068, 5451, 9772, 2331, 6174, 4393, 4873, 7296,
-             1780, 5299, 4919, 625, 87, 2240, 2815, 5020, 43, 211, 17, 1243, 97, 23, 57, 1111, 2013, 571, 1729,
-             333, 907, 1025, 621162, 513527, 268574, 233097, 342217, 310673]
     tot_rewards = []
     terminanted = 0
-    for j, seed in enumerate(seeds):
+    for j in range(len(env.unwrapped.scenario_bank)):
         print("Test ", str(j))
-        state, info = env.reset(seed=seed, options=options)
+        state, info = env.reset(options={"scenario_id": j})
         steps = 1
-        uav_number = options["uav"]
+        uav_number = env.unwrapped.UAV_NUMBER
         while True:
             actions = select_actions(state, uav_number)
             next_state, reward, terminated, truncated, info = env.step(actions)
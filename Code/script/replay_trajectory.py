@@ -0,0 +1,94 @@
+""" Replay an episode recorded by TrajectoryRecorder without recomputing the simulation.
+
+Keys: SPACE pause/resume, LEFT/RIGHT previous/next step, PAGE UP/PAGE DOWN 100 steps back/forward,
+HOME/END first/last step, UP/DOWN double/halve the speed, P/N previous/next episode, ESC quit.
+"""
+import os
+import sys
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import argparse
+
+import numpy as np
+import pygame
+
+from gym_cruising.envs.cruise_uav import CruiseUAV
+from gym_cruising.wrappers.trajectory_recorder import TrajectoryReader
+
+
+class ReplayViewer:
+    """ Draws recorded steps with the renderer of CruiseUAV, the environment is never stepped. """
+
+    def __init__(self, reader: TrajectoryReader, speed: float) -> None:
+        self.reader = reader
+        self.speed = speed  # steps per second
+        self.scene = CruiseUAV(render_mode="rgb_array", track_id=reader.track_id, render_frame_view=True)
+        self.scene.world = self.scene.track.walls
+        self.window = None
+
+    def draw(self, row: int) -> None:
+        step = self.reader[row]
+        self.scene.uav_positions = np.asarray(step["uav_positions"], dtype=np.float64)
+        self.scene.gu_positions = np.asarray(step["gu_positions"], dtype=np.float64)
+        self.scene.gu_covered_flags = np.asarray(step["gu_covered"])
+        self.scene.render()
+        if self.window is None:
+            pygame.init()
+            self.window = pygame.display.set_mode(self.scene.renderer.canvas.get_size())
+        self.window.blit(self.scene.renderer.canvas, (0, 0))
+        covered = int(np.count_nonzero(step["gu_covered"]))
+        pygame.display.set_caption(
+            f"episode {step['episode']}  step {step['step']}  GU covered {covered}/{len(step['gu_covered'])}  "
+            f"rewards {np.round(step['rewards'], 3).tolist()}  speed {self.speed:g} steps/s")
+        pygame.display.update()
+
+    def run(self, episode: int, step: int) -> None:
+        episodes = self.reader.episodes().tolist()
+        rows = self.reader.episode_rows(episode)
+        position = min(step, len(rows) - 1)
+        playing = True
+        clock = pygame.time.Clock()
+        while True:
+            self.draw(int(rows[position]))
+            for event in pygame.event.get():
+                if event.type == pygame.QUIT or (event.type == pygame.KEYDOWN and event.key == pygame.K_ESCAPE):
+                    pygame.quit()
+                    return
+                if event.type != pygame.KEYDOWN:
+                    continue
+                if event.key == pygame.K_SPACE:
+                    playing = not playing
+                elif event.key in (pygame.K_LEFT, pygame.K_RIGHT, pygame.K_PAGEUP, pygame.K_PAGEDOWN):
+                    shift = {pygame.K_LEFT: -1, pygame.K_RIGHT: 1, pygame.K_PAGEUP: -100, pygame.K_PAGEDOWN: 100}
+                    position = int(np.clip(position + shift[event.key], 0, len(rows) - 1))
+                    playing = False
+                elif event.key == pygame.K_HOME:
+                    position = 0
+                elif event.key == pygame.K_END:
+                    position = len(rows) - 1
+                elif event.key == pygame.K_UP:
+                    self.speed *= 2
+                elif event.key == pygame.K_DOWN:
+                    self.speed /= 2
+                elif event.key in (pygame.K_p, pygame.K_n):
+                    episode_position = episodes.index(episode) + (1 if event.key == pygame.K_n else -1)
+                    episode = episodes[episode_position % len(episodes)]
+                    rows = self.reader.episode_rows(episode)
+                    position = 0
+            if playing and position < len(rows) - 1:
+                position += 1
+            clock.tick(self.speed)
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('directory', help='directory written by TrajectoryRecorder')
+    parser.add_argument('--episode', type=int, default=None, help='episode to replay, the first one by default')
+    parser.add_argument('--step', type=int, default=0, help='step to start from')
+    parser.add_argument('--speed', type=float, default=CruiseUAV.metadata["render_fps"], help='steps per second')
+    args = parser.parse_args()
+
+    trajectory = TrajectoryReader(args.directory)
+    ReplayViewer(trajectory, args.speed).run(
+        int(trajectory.episodes()[0]) if args.episode is None else args.episode, args.step)